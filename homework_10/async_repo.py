@@ -0,0 +1,231 @@
+"""
+Async Repository Module
+This module provides `AsyncMovieRepository`, an asyncio-facing wrapper around the moviebase SQL.
+Reads run on a dedicated thread pool where every worker owns one read-only connection, so
+concurrent readers share the WAL database without blocking the event loop; writes are serialized
+on a single writer thread that goes through `homework_10.models`.
+"""
+
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from homework_10 import models, queries
+from homework_10.db import open_connection, get_pool
+from homework_10.queries import GenreCount, MovieActors, MovieAge, MovieRow
+
+
+class AsyncMovieRepository:
+    """
+    Runs moviebase queries off the event loop.
+    At most `max_pending` operations are in flight; further callers wait for a free slot,
+    which applies backpressure instead of queueing unbounded work on the executor.
+    """
+
+    def __init__(self, database: Optional[str] = None, workers: int = 4, max_pending: int = 64) -> None:
+        """
+        Initializes the executors; reader connections are opened by each worker thread on start.
+        :param database: path to the database file. Defaults to the database of the module-wide pool,
+                         which is also the one writes go to.
+        :param workers: number of reader threads (and reader connections).
+        :param max_pending: maximum number of operations submitted at once.
+        :raises TypeError: If `workers` or `max_pending` is not an integer.
+        :raises ValueError: If `workers` or `max_pending` is less than 1.
+        """
+        if not isinstance(workers, int) or not isinstance(max_pending, int):
+            raise TypeError("Workers and max_pending must be integers")
+        if workers < 1 or max_pending < 1:
+            raise ValueError("Workers and max_pending must be positive")
+
+        self.database = database or get_pool().database
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._readers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="moviebase-reader",
+                                           initializer=self._open_reader)
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="moviebase-writer")
+        self._pending = asyncio.Semaphore(max_pending)
+
+    def _open_reader(self) -> None:
+        """
+        Executor initializer: opens the connection owned by the current worker thread.
+        """
+        conn = open_connection(self.database, read_only=True)
+        self._local.conn = conn
+        with self._connections_lock:
+            self._connections.append(conn)
+
+    def _read(self, sql: str, params: Sequence, make_row: Callable[[tuple], Any]) -> List[Any]:
+        """
+        Runs a query on the worker's own connection.
+        :param sql: query to run.
+        :param params: query parameters.
+        :param make_row: converts a raw row.
+        :return: list of converted rows.
+        """
+        cursor = self._local.conn.execute(sql, params)
+        try:
+            return [make_row(row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    async def _submit(self, executor: ThreadPoolExecutor, func: Callable, *args) -> Any:
+        """
+        Runs `func` on an executor once a pending slot is free.
+        :param executor: reader or writer executor.
+        :param func: function to run.
+        :param args: positional arguments for `func`.
+        :return: the function result.
+        """
+        async with self._pending:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+    async def _fetch(self, sql: str, params: Sequence = (), make_row: Callable[[tuple], Any] = tuple) -> List[Any]:
+        """
+        Runs a read query on the reader pool.
+        :param sql: query to run.
+        :param params: query parameters.
+        :param make_row: converts a raw row.
+        :return: list of converted rows.
+        """
+        return await self._submit(self._readers, self._read, sql, params, make_row)
+
+    async def get_movies_with_actors(self) -> List[MovieActors]:
+        """
+        Gets all movies with actors.
+        :return: list of MovieActors.
+        """
+        return await self._fetch(queries.MOVIES_WITH_ACTORS_SQL, make_row=MovieActors._make)
+
+    async def get_unique_genres(self) -> List[str]:
+        """
+        Gets all unique genres.
+        :return: list of genre names.
+        """
+        return await self._fetch(queries.UNIQUE_GENRES_SQL, make_row=queries.first_column)
+
+    async def get_movie_count_by_genre(self) -> List[GenreCount]:
+        """
+        Gets movie count by genre.
+        :return: list of GenreCount.
+        """
+        return await self._fetch(queries.MOVIE_COUNT_BY_GENRE_SQL, make_row=GenreCount._make)
+
+    async def get_average_age_by_genre(self, genre: str) -> Optional[float]:
+        """
+        Gets average age of actors in movies by genre.
+        :param genre: genre to check
+        :return: the average age, or None if unknown.
+        :raises TypeError: if genre is not a string.
+        """
+        if not isinstance(genre, str):
+            raise TypeError("Genre must be a string.")
+
+        rows = await self._fetch(queries.AVERAGE_AGE_BY_GENRE_SQL, (genre,), queries.first_column)
+        return rows[0] if rows else None
+
+    async def search_movies(self, title: str, limit: int = 20) -> List[str]:
+        """
+        Searches movie titles with the full-text index, falling back to LIKE, see `queries.search_statement`.
+        :param title: words (or beginnings of words) to search for
+        :param limit: maximum number of movies to return
+        :return: list of movie titles, best match first.
+        :raises TypeError: if title is not a string or limit is not an integer.
+        :raises ValueError: if limit is less than 1.
+        """
+        return await self._submit(self._readers, self._search, title, limit)
+
+    def _search(self, title: str, limit: int) -> List[str]:
+        """
+        Builds and runs the search query in one go on a reader thread.
+        :param title: words (or beginnings of words) to search for
+        :param limit: maximum number of movies to return
+        :return: list of movie titles.
+        """
+        sql, params = queries.search_statement(title, limit, self.database)
+        return self._read(sql, params, queries.first_column)
+
+    async def get_movies_page(self, limit: int, cursor: Optional[str] = None) \
+            -> Tuple[List[MovieRow], Optional[str]]:
+        """
+        Gets one page of movies using keyset pagination, see `queries.get_movies_page`.
+        :param limit: number of movies per page
+        :param cursor: cursor returned with the previous page, None for the first page
+        :return: tuple (rows, next_cursor).
+        :raises TypeError: if limit is not an integer or cursor is not a string.
+        :raises ValueError: if limit is less than 1 or cursor is malformed.
+        """
+        sql, params = queries.page_statement(limit, cursor)
+        return queries.split_page(await self._fetch(sql, params, MovieRow._make), limit)
+
+    async def get_all_movies_and_actors(self) -> List[str]:
+        """
+        Gets all movies and actors.
+        :return: list of movie titles and actor names.
+        """
+        return await self._fetch(queries.ALL_MOVIES_AND_ACTORS_SQL, make_row=queries.first_column)
+
+    async def get_movies_with_age(self, validate: bool = False) -> List[MovieAge]:
+        """
+        Gets all movies with their age, see `queries.iter_movies_with_age`.
+        :param validate: whether to compute ages with the validating Python function.
+        :return: list of MovieAge.
+        """
+        if validate:
+            return await self._fetch(queries.MOVIES_WITH_AGE_UDF_SQL, (datetime.now().year,), MovieAge._make)
+        return await self._fetch(queries.MOVIES_WITH_AGE_SQL, make_row=MovieAge._make)
+
+    async def add_actor(self, name: str, birth_year: int = 1970) -> None:
+        """
+        Inserts a new actor on the writer thread, see `models.add_actor`.
+        :param name: name of the actor.
+        :param birth_year: birth year of the actor.
+        """
+        await self._submit(self._writer, models.add_actor, name, birth_year)
+
+    async def add_movie(self, title: str, release_year: int, genre: str, actors: List[str]) -> None:
+        """
+        Adds a movie on the writer thread, see `models.add_movie`.
+        :param title: The title of the movie.
+        :param release_year: release year of the movie.
+        :param genre: genre of the movie.
+        :param actors: List of actors.
+        """
+        await self._submit(self._writer, models.add_movie, title, release_year, genre, actors)
+
+    async def add_movies_bulk(self, movies: Iterable[Dict[str, Any]], batch_size: int = 1000) -> Dict[str, float]:
+        """
+        Bulk-loads movies on the writer thread, see `models.add_movies_bulk`.
+        :param movies: iterable of movie dictionaries.
+        :param batch_size: number of movies per transaction.
+        :return: dictionary with `rows`, `seconds` and `rows_per_second`.
+        """
+        return await self._submit(self._writer, models.add_movies_bulk, movies, batch_size)
+
+    async def close(self) -> None:
+        """
+        Waits for submitted work, stops the executors and closes the reader connections.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._readers.shutdown)
+        await loop.run_in_executor(None, self._writer.shutdown)
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+    async def __aenter__(self) -> "AsyncMovieRepository":
+        """
+        Allows `async with AsyncMovieRepository() as repo:`.
+        :return: the repository.
+        """
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """
+        Closes the repository when leaving the `async with` block.
+        """
+        await self.close()
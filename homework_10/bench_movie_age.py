@@ -0,0 +1,76 @@
+"""
+Movie Age Benchmark
+Compares the ways of computing a movie's age over a large in-memory movies table:
+the per-row Python function, the deterministic Python function with the year bound once,
+and the pure SQL expression used by the movies_with_age view.
+Usage: python -m homework_10.bench_movie_age [rows]
+"""
+
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict
+
+from homework_10.db import register_functions
+
+VARIANTS = {
+    "python udf, now() per row": ("SELECT title, movie_age(release_year) FROM movies", ()),
+    "deterministic udf, bound year": ("SELECT title, movie_age(release_year, ?) FROM movies",
+                                      (datetime.now().year,)),
+    "sql expression": ("SELECT title, CAST(strftime('%Y', 'now') AS INTEGER) - release_year FROM movies", ()),
+}
+
+
+def build_database(rows: int) -> sqlite3.Connection:
+    """
+    Creates an in-memory movies table filled with random release years.
+    :param rows: number of movies to generate.
+    :return: connection to the populated database.
+    """
+    conn = sqlite3.connect(":memory:")
+    register_functions(conn)
+    conn.execute("CREATE TABLE movies (id INTEGER PRIMARY KEY, title TEXT NOT NULL, release_year INTEGER NOT NULL)")
+    conn.executemany("INSERT INTO movies (title, release_year) VALUES (?, ?)",
+                     ((f"Movie {i}", random.randint(1910, 2024)) for i in range(rows)))
+    conn.commit()
+    return conn
+
+
+def best_time(run: Callable[[], object], repeat: int = 3) -> float:
+    """
+    Runs a callable several times.
+    :param run: callable to time.
+    :param repeat: number of runs.
+    :return: the fastest run in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run_benchmark(rows: int = 1_000_000, repeat: int = 3) -> Dict[str, float]:
+    """
+    Times every variant in `VARIANTS` on the same data.
+    :param rows: number of movies to generate.
+    :param repeat: runs per variant; the best one is reported.
+    :return: dictionary variant name -> seconds.
+    """
+    conn = build_database(rows)
+    try:
+        return {name: best_time(lambda: conn.execute(sql, params).fetchall(), repeat)
+                for name, (sql, params) in VARIANTS.items()}
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    results = run_benchmark(row_count)
+    baseline = results["python udf, now() per row"]
+    for variant, seconds in results.items():
+        print(f"{variant:<32} {seconds:8.3f}s  {row_count / seconds:12,.0f} rows/s  x{baseline / seconds:.1f}")
@@ -0,0 +1,252 @@
+"""
+Benchmark Module
+Load-tests the moviebase: generates a synthetic catalogue (N movies, M actors, casts drawn from a
+Zipf distribution so a few actors appear in many movies), times every query and model function
+and reports p50/p95/p99 latencies. Results are saved as JSON together with the git commit and can
+be compared against a previous run, which makes the benchmark usable as a regression gate.
+
+Usage: python -m homework_10.benchmark --scales 10000 100000 1000000 --output bench.json \
+           [--baseline previous.json --threshold 0.25]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from homework_10 import db, models, queries
+from homework_10.cache import query_cache
+
+
+def generate_catalogue(movies: int, actors: int, cast_size: int = 4, zipf_s: float = 1.1,
+                       seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Generates synthetic movie records for `models.add_movies_bulk`.
+    :param movies: number of movies.
+    :param actors: number of distinct actors to draw casts from.
+    :param cast_size: number of actors drawn per movie (duplicates are dropped by the loader).
+    :param zipf_s: Zipf exponent; the k-th most popular actor is drawn with weight 1 / k**s.
+    :param seed: random seed, so runs on different commits use the same data.
+    :return: iterator of movie dictionaries.
+    """
+    rng = random.Random(seed)
+    names = [f"Actor {i}" for i in range(actors)]
+    cum_weights = list(itertools.accumulate(1 / rank ** zipf_s for rank in range(1, actors + 1)))
+    genres = ["Drama", "Comedy", "Action", "Thriller", "Horror", "Sci-Fi", "Romance", "Crime",
+              "Animation", "Documentary", "Western", "Fantasy"]
+    for i in range(movies):
+        yield {
+            "title": f"Movie {i} {rng.choice(['Rising', 'Returns', 'Forever', 'Origins', 'Night'])}",
+            "release_year": rng.randint(1910, 2024),
+            "genre": rng.choice(genres),
+            "actors": rng.choices(names, cum_weights=cum_weights, k=cast_size),
+        }
+
+
+def populate(database: str, movies: int, actors: int, seed: int = 0) -> Dict[str, float]:
+    """
+    Creates a fresh benchmark database and loads a synthetic catalogue into it.
+    :param database: path of the database file to create.
+    :param movies: number of movies.
+    :param actors: number of actors.
+    :param seed: random seed.
+    :return: loader statistics from `models.add_movies_bulk`.
+    """
+    db.configure_pool(database)
+    db.create_tables()
+    stats = models.add_movies_bulk(generate_catalogue(movies, actors, seed=seed), batch_size=5000)
+    with db.get_connection() as conn:
+        conn.execute("UPDATE actors SET birth_year = 1930 + abs(random()) % 80")
+        conn.execute("ANALYZE")
+    return stats
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile.
+    :param samples: measured values.
+    :param pct: percentile between 0 and 100.
+    :return: the value below which `pct` percent of the samples fall.
+    """
+    ordered = sorted(samples)
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    Calls `func` `repeat` times and summarizes its latency.
+    :param func: callable to time; iterators it returns are consumed.
+    :param repeat: number of calls.
+    :return: dictionary with p50/p95/p99/mean latencies in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        if isinstance(result, Iterator):
+            for _ in result:
+                pass
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "mean": sum(samples) / len(samples),
+    }
+
+
+def benchmark_cases(movies: int, actors: int) -> Dict[str, Callable[[], Any]]:
+    """
+    Builds the timed calls for every function in `queries` and `models`.
+    Arguments are varied between calls so the measurements are not dominated by a single row.
+    :param movies: number of movies in the database.
+    :param actors: number of actors in the database.
+    :return: dictionary case name -> zero-argument callable.
+    """
+    rng = random.Random(1)
+    counter = itertools.count()
+    deep_cursor = queries.encode_cursor(movies // 2)
+
+    def new_movie() -> Dict[str, Any]:
+        number = next(counter)
+        return {"title": f"Bench Movie {number}", "release_year": 2000, "genre": "Drama",
+                "actors": [f"Actor {rng.randrange(actors)}", f"Bench Actor {number}"]}
+
+    return {
+        "queries.get_movies_with_actors": queries.iter_movies_with_actors,
+        "queries.get_unique_genres": queries.get_unique_genres,
+        "queries.get_movie_count_by_genre": queries.get_movie_count_by_genre,
+        "queries.get_average_age_by_genre": lambda: queries.get_average_age_by_genre(rng.choice(["Drama", "Crime"])),
+        "queries.search_movies": lambda: queries.search_movies(f"movie {rng.randrange(movies)}"),
+        "queries.search_movies_with_like": lambda: queries.search_movies_with_like(f"Movie {rng.randrange(movies)} "),
+        "queries.get_movies_with_limit (deep page)": lambda: queries.get_movies_with_limit(20, max(1, movies // 40)),
+        "queries.get_movies_page (deep page)": lambda: queries.get_movies_page(20, deep_cursor),
+        "queries.get_all_movies_and_actors": queries.iter_all_movies_and_actors,
+        "queries.get_movies_with_age": queries.iter_movies_with_age,
+        "models.get_actor_id": lambda: models.get_actor_id(f"Actor {rng.randrange(actors)}"),
+        "models.add_actor": lambda: models.add_actor(f"Bench Solo Actor {next(counter)}", 1980),
+        "models.add_movie": lambda: models.add_movie(**new_movie()),
+        "models.add_movies_bulk (100 rows)": lambda: models.add_movies_bulk(new_movie() for _ in range(100)),
+    }
+
+
+def run_scale(movies: int, repeat: int, actors: Optional[int] = None, seed: int = 0,
+              use_cache: bool = False) -> Dict[str, Any]:
+    """
+    Benchmarks one catalogue size in a temporary database; the module-wide pool is pointed
+    back at its previous database and settings afterwards.
+    :param movies: number of movies.
+    :param repeat: calls per case.
+    :param actors: number of actors, defaults to a fifth of the movies.
+    :param seed: random seed of the generated catalogue.
+    :param use_cache: whether reads may be served by the query result cache; off by default,
+                      so the database work itself is measured.
+    :return: dictionary with the load statistics and per-case latencies.
+    """
+    actors = actors or max(1, movies // 5)
+    previous = db.get_pool()
+    cache_enabled, query_cache.enabled = query_cache.enabled, use_cache
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            load = populate(os.path.join(directory, "bench.db"), movies, actors, seed)
+            cases = {name: measure(func, repeat) for name, func in benchmark_cases(movies, actors).items()}
+        finally:
+            db.configure_pool(previous.database, previous.max_size, previous.timeout)
+            query_cache.enabled = cache_enabled
+    return {"movies": movies, "actors": actors, "load": load, "cases": cases}
+
+
+def current_commit() -> str:
+    """
+    Returns the git commit the benchmark runs on.
+    :return: commit hash, or "unknown" outside a git checkout.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.25,
+            metric: str = "p95") -> List[Tuple[str, str, float, float]]:
+    """
+    Finds cases that got slower than the baseline run.
+    :param baseline: previously saved report.
+    :param current: new report.
+    :param threshold: allowed relative slowdown, 0.25 means 25%.
+    :param metric: latency figure to compare.
+    :return: list of (scale, case, baseline ms, current ms) for every regression.
+    """
+    regressions = []
+    for scale, result in current["scales"].items():
+        previous = baseline.get("scales", {}).get(scale)
+        if previous is None:
+            continue
+        for case, latency in result["cases"].items():
+            before = previous["cases"].get(case)
+            if before and latency[metric] > before[metric] * (1 + threshold):
+                regressions.append((scale, case, before[metric], latency[metric]))
+    return regressions
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """
+    Prints latencies of every scale as a table.
+    :param report: report produced by `main`.
+    """
+    for scale, result in report["scales"].items():
+        load = result["load"]
+        print(f"\n{scale} movies / {result['actors']} actors "
+              f"(loaded at {load['rows_per_second']:.0f} rows/sec), commit {report['commit']}")
+        print(f"{'case':<45}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for case, latency in result["cases"].items():
+            print(f"{case:<45}{latency['p50']:>10.2f}{latency['p95']:>10.2f}{latency['p99']:>10.2f}")
+
+
+def main() -> int:
+    """
+    Entry point: runs the requested scales, saves the report and checks it against a baseline.
+    :return: process exit code, 1 if a regression was found.
+    """
+    parser = argparse.ArgumentParser(description="Moviebase load test and query benchmark.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="catalogue sizes (number of movies)")
+    parser.add_argument("--repeat", type=int, default=20, help="calls per case")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the catalogue")
+    parser.add_argument("--cache", action="store_true", help="serve repeated reads from the query cache")
+    parser.add_argument("--output", help="where to save the JSON report")
+    parser.add_argument("--baseline", help="JSON report of a previous commit to compare with")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p95 slowdown (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    report = {"commit": current_commit(), "repeat": args.repeat,
+              "scales": {str(scale): run_scale(scale, args.repeat, seed=args.seed, use_cache=args.cache) for scale in args.scales}}
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = compare(baseline, report, args.threshold)
+        for scale, case, before, after in regressions:
+            print(f"REGRESSION at {scale}: {case} p95 {before:.2f}ms -> {after:.2f}ms")
+        if regressions:
+            return 1
+        print(f"No regressions against commit {baseline.get('commit', 'unknown')}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Cache Module
+This module provides an in-process LRU/TTL cache and `QueryCache`, a read-through cache for query
+results. Entries are keyed on the query, its arguments and a generation counter of every table the
+query reads; writers bump the counters of the tables they change (`invalidate`), which makes every
+dependent entry unreachable at once while results of unrelated queries stay cached.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from homework_10.db import after_commit, get_pool
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe mapping that keeps at most `maxsize` entries, evicting the least recently used
+    one, and optionally expires entries `ttl` seconds after they were stored.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Initializes an empty cache.
+        :param maxsize: maximum number of entries.
+        :param ttl: seconds an entry stays valid, None to keep it until evicted.
+        :param clock: time source, replaceable in tests.
+        :raises ValueError: If `maxsize` is less than 1 or `ttl` is not positive.
+        """
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise ValueError("Cache size must be a positive integer")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("TTL must be positive")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns a cached value and marks it as recently used.
+        :param key: cache key.
+        :param default: value returned on a miss.
+        :return: the cached value, or `default`.
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and self.ttl is not None and self._clock() >= entry[1]:
+                del self._entries[key]
+                self._counters["expirations"] += 1
+                entry = _MISSING
+            if entry is _MISSING:
+                self._counters["misses"] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Stores a value, evicting the least recently used entry when the cache is full.
+        :param key: cache key.
+        :param value: value to store.
+        """
+        expires = self._clock() + self.ttl if self.ttl is not None else 0.0
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def discard(self, key: Hashable) -> None:
+        """
+        Removes an entry if present.
+        :param key: cache key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Removes every entry; counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns cache counters.
+        :return: dictionary with hits, misses, evictions, expirations and the current size.
+        """
+        with self._lock:
+            return {**self._counters, "size": len(self._entries)}
+
+    def __len__(self) -> int:
+        """
+        Returns the number of stored entries.
+        """
+        with self._lock:
+            return len(self._entries)
+
+
+class QueryCache:
+    """
+    Read-through cache of query results invalidated through per-table generation counters.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = 60.0) -> None:
+        """
+        Initializes the cache.
+        :param maxsize: maximum number of cached results.
+        :param ttl: seconds a result stays valid; bounds staleness after writes that bypass `invalidate`,
+                    e.g. from another process.
+        """
+        self.entries = LRUCache(maxsize, ttl)
+        self.enabled = True
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def generation(self, table: str) -> int:
+        """
+        Returns the current generation of a table.
+        :param table: table name.
+        :return: number of invalidations of the table so far.
+        """
+        with self._lock:
+            return self._generations.get(table, 0)
+
+    def invalidate(self, *tables: str) -> None:
+        """
+        Bumps the generation of the given tables, so results depending on them are no longer served.
+        :param tables: names of the changed tables.
+        """
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def invalidate_after_commit(self, *tables: str) -> None:
+        """
+        Invalidates the tables once the current transaction commits, so no reader can cache the
+        pre-commit state under the new generation; nothing happens if the transaction rolls back.
+        :param tables: names of the tables being changed.
+        """
+        after_commit(lambda: self.invalidate(*tables))
+
+    def cached(self, *tables: str) -> Callable[[Callable], Callable]:
+        """
+        Decorator caching a query function's result until one of `tables` is invalidated.
+        List results are stored as tuples and returned as fresh lists, so callers cannot alter the cache.
+        Inside a write transaction the cache is bypassed both ways: the query must see the
+        transaction's own writes, and its result, which may include uncommitted rows, is not stored.
+        :param tables: tables the query reads.
+        :return: decorator.
+        """
+        def decorator(func: Callable) -> Callable:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or get_pool().holds_connection():
+                    return func(*args, **kwargs)
+                with self._lock:
+                    generations = tuple(self._generations.get(table, 0) for table in tables)
+                key = (func.__qualname__, get_pool().database, args, tuple(sorted(kwargs.items())), generations)
+                value = self.entries.get(key, _MISSING)
+                if value is _MISSING:
+                    value = func(*args, **kwargs)
+                    self.entries.put(key, tuple(value) if isinstance(value, list) else value)
+                    return value
+                return list(value) if isinstance(value, tuple) else value
+            return wrapper
+        return decorator
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns hit/miss/eviction counters of the result cache.
+        :return: dictionary of counters.
+        """
+        return self.entries.stats()
+
+
+query_cache = QueryCache()
@@ -1,32 +1,693 @@
 """
 Database Operations
 Module is responsible for handling database operations.
+Connections are borrowed from a bounded, thread-aware pool instead of being opened per query.
+Reads may use a second pool of read-only connections (`get_connection(read_only=True)`) that map the
+file into memory and never take the write lock.
 """
 
 import sqlite3
+import threading
+import time
 
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
 from sqlite3 import Connection
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
 from homework_10.utils import movie_age
 
+DB_NAME = "moviebase.db"
+
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA foreign_keys=ON;",
+)
+
+# PRAGMAs run on every new connection, by kind of connection.
+# Read connections map up to 256 MiB of the file into memory, keep a 64 MiB page cache
+# and refuse writes, so they never compete with the writer for the database lock.
+TUNING_PROFILES: Dict[str, Tuple[str, ...]] = {
+    "write": CONNECTION_PRAGMAS,
+    "read": (
+        "PRAGMA mmap_size=268435456;",
+        "PRAGMA cache_size=-65536;",
+        "PRAGMA temp_store=MEMORY;",
+        "PRAGMA query_only=ON;",
+    ),
+}
+
+
+class PoolExhaustedError(sqlite3.OperationalError):
+    """
+    Raised when no pooled connection becomes available within the checkout timeout.
+    """
+
 
-def create_connection() -> Connection | None:
+def open_connection(database: str = DB_NAME, read_only: bool = False) -> Connection:
+    """
+    Opens a new connection and runs the one-off setup: PRAGMAs and SQLite functions.
+    :param database: path to the database file.
+    :param read_only: open the file with `mode=ro` and the "read" tuning profile; the file must exist.
+    :return: sqlite3.Connection
+    :raises: sqlite3.OperationalError in case of database operation error.
+    """
+    if read_only:
+        uri = f"{Path(database).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=10)
+    else:
+        conn = sqlite3.connect(database, check_same_thread=False, timeout=10)
+    for pragma in TUNING_PROFILES["read" if read_only else "write"]:
+        conn.execute(pragma)
+    register_functions(conn)
+    return conn
+
+
+def register_functions(conn: Connection) -> None:
+    """
+    Registers the Python SQL functions.
+    `movie_age(release_year)` reads the clock on every row; `movie_age(release_year, current_year)`
+    is deterministic, so SQLite may cache it, and the year is bound once per statement.
+    :param conn: open connection.
+    """
+    conn.create_function("movie_age", 1, movie_age)
+    conn.create_function("movie_age", 2, movie_age, deterministic=True)
+
+
+def create_connection(database: str = DB_NAME) -> Connection | None:
     """
     Creates a database connection and registers SQLite functions.
+    :param database: path to the database file.
     :return: sqlite3.Connection
     :raises: sqlite3.OperationalError in case of database operation error.
     """
     try:
-        conn = sqlite3.connect("moviebase.db", check_same_thread=False, timeout=10)
-        conn.execute("PRAGMA journal_mode=WAL;")
-        conn.create_function("movie_age", 1, movie_age)
-        return conn
+        return open_connection(database)
     except sqlite3.OperationalError:
         print("Database connection failed.")
 
 
+class ConnectionPool:
+    """
+    Bounded pool of warm sqlite3 connections.
+
+    A thread checks out one connection and keeps it for nested `connection()` calls,
+    so a model function calling another model function shares the same transaction.
+    Idle connections are health-checked before being handed out again.
+    """
+
+    def __init__(self, database: str = DB_NAME, max_size: int = 5, timeout: float = 10.0,
+                 read_only: bool = False) -> None:
+        """
+        Initializes the pool. Connections are opened lazily, up to `max_size`.
+        :param database: path to the database file.
+        :param max_size: maximum number of open connections.
+        :param timeout: seconds to wait for a free connection before giving up.
+        :param read_only: whether to open read-only connections, see `open_connection`.
+        :raises TypeError: If `database` is not a string.
+        :raises ValueError: If `max_size` is less than 1.
+        """
+        if not isinstance(database, str):
+            raise TypeError("Database must be a string")
+        if not isinstance(max_size, int) or max_size < 1:
+            raise ValueError("Pool size must be a positive integer")
+
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        self.read_only = read_only
+        self._idle: List[Connection] = []
+        self._size = 0
+        self._closed = False
+        self._available = threading.Condition(threading.Lock())
+        self._local = threading.local()
+        self._metrics = {
+            "created": 0,
+            "checkouts": 0,
+            "reused": 0,
+            "discarded": 0,
+            "exhausted": 0,
+            "timeouts": 0,
+        }
+
+    def _is_healthy(self, conn: Connection) -> bool:
+        """
+        Checks that an idle connection is still usable.
+        :param conn: connection to check.
+        :return: True if the connection answered a trivial query.
+        """
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _acquire(self) -> Connection:
+        """
+        Takes an idle connection or opens a new one, waiting while the pool is exhausted.
+        :return: sqlite3.Connection
+        :raises PoolExhaustedError: If no connection is released within the timeout.
+        :raises sqlite3.OperationalError: If the pool is closed or a connection cannot be opened.
+        """
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            with self._available:
+                if self._closed:
+                    raise sqlite3.OperationalError("Connection pool is closed")
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._metrics["reused"] += 1
+                elif self._size < self.max_size:
+                    self._size += 1
+                    conn = None
+                else:
+                    if not waited:
+                        self._metrics["exhausted"] += 1
+                        waited = True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._available.wait(remaining):
+                        self._metrics["timeouts"] += 1
+                        raise PoolExhaustedError("Connection pool exhausted")
+                    continue
+
+            if conn is None:
+                try:
+                    conn = open_connection(self.database, self.read_only)
+                except sqlite3.Error:
+                    self._forget()
+                    raise
+                with self._available:
+                    self._metrics["created"] += 1
+            elif not self._is_healthy(conn):
+                conn.close()
+                self._forget(discarded=True)
+                continue
+
+            with self._available:
+                self._metrics["checkouts"] += 1
+            return conn
+
+    def _forget(self, discarded: bool = False) -> None:
+        """
+        Frees the slot of a connection that will not come back to the pool.
+        :param discarded: whether to count the connection as discarded.
+        """
+        with self._available:
+            self._size -= 1
+            if discarded:
+                self._metrics["discarded"] += 1
+            self._available.notify()
+
+    def _release(self, conn: Connection) -> None:
+        """
+        Returns a connection to the pool, or closes it if the pool was closed meanwhile.
+        :param conn: connection to return.
+        """
+        with self._available:
+            if not self._closed:
+                self._idle.append(conn)
+                self._available.notify()
+                return
+            self._size -= 1
+        conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        """
+        Borrows a connection for the current thread.
+        The outermost checkout commits on success, rolls back on error and returns the
+        connection to the pool; nested checkouts in the same thread reuse it.
+        :return: sqlite3.Connection
+        :raises PoolExhaustedError: If no connection is available within the timeout.
+        """
+        local = self._local
+        if getattr(local, "conn", None) is not None:
+            yield local.conn
+            return
+
+        conn = self._acquire()
+        local.conn, local.on_commit = conn, []
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            callbacks, local.on_commit = local.on_commit, []
+            local.conn = None
+            self._release(conn)
+        for callback in callbacks:
+            callback()
+
+    @contextmanager
+    def dedicated_connection(self) -> Iterator[Connection]:
+        """
+        Borrows a connection that is not shared with the thread's other checkouts.
+        Meant for generators, which stay suspended between rows and may be closed from
+        another thread; any open transaction is rolled back when the connection is returned.
+        :return: sqlite3.Connection
+        :raises PoolExhaustedError: If no connection is available within the timeout.
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._release(conn)
+
+    def holds_connection(self) -> bool:
+        """
+        Tells whether the current thread has a connection of this pool checked out.
+        :return: True inside a `connection()` block.
+        """
+        return getattr(self._local, "conn", None) is not None
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """
+        Runs `callback` once the current thread's transaction commits; it is dropped on rollback.
+        Without a checked out connection the callback runs immediately.
+        :param callback: function without arguments, e.g. a cache invalidation.
+        """
+        local = self._local
+        if getattr(local, "conn", None) is None:
+            callback()
+        else:
+            local.on_commit.append(callback)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns pool usage counters.
+        :return: dictionary with created/checkouts/reused/discarded/exhausted/timeouts
+                 counters and the current in_use/idle/max_size figures.
+        """
+        with self._available:
+            stats = dict(self._metrics)
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._size - len(self._idle)
+            stats["max_size"] = self.max_size
+            return stats
+
+    def close(self) -> None:
+        """
+        Closes idle connections; connections in use are closed when they are released.
+        """
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._available.notify_all()
+        for conn in idle:
+            conn.close()
+
+
+_pool: Optional[ConnectionPool] = None
+_read_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def configure_pool(database: str = DB_NAME, max_size: int = 5, timeout: float = 10.0) -> ConnectionPool:
+    """
+    Replaces the module-wide pools, closing the previous ones.
+    The read-only pool is opened on first use with the same size and timeout.
+    :param database: path to the database file.
+    :param max_size: maximum number of open connections per pool.
+    :param timeout: seconds to wait for a free connection.
+    :return: the new read-write pool.
+    """
+    global _pool, _read_pool
+    with _pool_lock:
+        for previous in (_pool, _read_pool):
+            if previous is not None:
+                previous.close()
+        _pool = ConnectionPool(database, max_size, timeout)
+        _read_pool = None
+        return _pool
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Returns the module-wide pool, creating it with default settings on first use.
+    :return: ConnectionPool
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
+
+
+def get_read_pool() -> ConnectionPool:
+    """
+    Returns the module-wide read-only pool for the database of `get_pool()`.
+    :return: ConnectionPool
+    """
+    global _read_pool
+    pool = get_pool()
+    with _pool_lock:
+        if _read_pool is None:
+            _read_pool = ConnectionPool(pool.database, pool.max_size, pool.timeout, read_only=True)
+        return _read_pool
+
+
+def close_pools() -> None:
+    """
+    Closes the read-write and the read-only pool; the next `get_pool()` opens a new pool
+    with default settings.
+    """
+    global _pool, _read_pool
+    with _pool_lock:
+        pools = (_pool, _read_pool)
+        _pool = _read_pool = None
+    for pool in pools:
+        if pool is not None:
+            pool.close()
+
+
+def get_connection(read_only: bool = False):
+    """
+    Borrows a pooled connection: `with get_connection() as conn: ...`
+    A read-only checkout inside a read-write one reuses the read-write connection,
+    so a thread always sees its own uncommitted changes.
+    :param read_only: borrow from the read-only pool, for queries.
+    :return: context manager yielding sqlite3.Connection
+    """
+    pool = get_pool()
+    if read_only and not pool.holds_connection():
+        return get_read_pool().connection()
+    return pool.connection()
+
+
+def after_commit(callback: Callable[[], None]) -> None:
+    """
+    Registers a callback for the commit of the current thread's transaction, see `ConnectionPool.after_commit`.
+    :param callback: function without arguments.
+    """
+    get_pool().after_commit(callback)
+
+
+@lru_cache(maxsize=None)
+def fts5_available() -> bool:
+    """
+    Checks whether the SQLite library was built with the FTS5 extension.
+    :return: True if FTS5 virtual tables can be created.
+    """
+    probe = sqlite3.connect(":memory:")
+    try:
+        probe.execute("CREATE VIRTUAL TABLE fts5_probe USING fts5(text)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        probe.close()
+
+
+SEARCH_INDEX_EXISTS_SQL = """SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'movies_fts'"""
+
+_search_index: Dict[str, bool] = {}
+_search_index_lock = threading.Lock()
+
+
+def has_search_index(database: Optional[str] = None) -> bool:
+    """
+    Checks whether the FTS5 title index exists. The answer is cached per database file,
+    since only `migrate` creates the index, and `migrate` clears the cache.
+    :param database: path to the database file, defaults to the one of the module-wide pool.
+    :return: True if the movies_fts table exists.
+    """
+    database = database or get_pool().database
+    with _search_index_lock:
+        if database in _search_index:
+            return _search_index[database]
+    conn = open_connection(database, read_only=True)
+    try:
+        exists = conn.execute(SEARCH_INDEX_EXISTS_SQL).fetchone() is not None
+    finally:
+        conn.close()
+    with _search_index_lock:
+        _search_index[database] = exists
+    return exists
+
+
+def _movie_search_script(conn: Connection) -> str:
+    """
+    Builds the full-text index over movie titles, kept in sync with movies by triggers.
+    Skipped when FTS5 is unavailable; title search then falls back to LIKE.
+    :param conn: open connection.
+    :return: SQL script, empty if FTS5 is not available.
+    """
+    if not fts5_available():
+        return ""
+    return """
+        CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+            title, content='movies', content_rowid='id', tokenize='unicode61 remove_diacritics 2');
+
+        CREATE TRIGGER IF NOT EXISTS movies_fts_insert AFTER INSERT ON movies BEGIN
+            INSERT INTO movies_fts (rowid, title) VALUES (new.id, new.title);
+        END;
+        CREATE TRIGGER IF NOT EXISTS movies_fts_delete AFTER DELETE ON movies BEGIN
+            INSERT INTO movies_fts (movies_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        END;
+        CREATE TRIGGER IF NOT EXISTS movies_fts_update AFTER UPDATE OF title ON movies BEGIN
+            INSERT INTO movies_fts (movies_fts, rowid, title) VALUES ('delete', old.id, old.title);
+            INSERT INTO movies_fts (rowid, title) VALUES (new.id, new.title);
+        END;
+
+        INSERT INTO movies_fts (movies_fts) VALUES ('rebuild');
+    """
+
+
+REBUILD_CAST_LISTS_SQL = """
+    UPDATE movies SET cast_text = (
+        SELECT GROUP_CONCAT(name, ', ') FROM (
+            SELECT actors.name FROM movie_cast
+            JOIN actors ON actors.id = movie_cast.actor_id
+            WHERE movie_cast.movie_id = movies.id
+            ORDER BY movie_cast.rowid));
+"""
+
+
+def _cast_list_script(conn: Connection) -> str:
+    """
+    Adds the denormalized movies.cast_text column (comma separated actor names) and fills it,
+    so listing movies with their casts does not need to join three tables.
+    :param conn: open connection.
+    :return: SQL script.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(movies)")}
+    add_column = "" if "cast_text" in columns else "ALTER TABLE movies ADD COLUMN cast_text TEXT;"
+    return add_column + REBUILD_CAST_LISTS_SQL
+
+
+# Versioned schema changes applied on top of the base tables, tracked in PRAGMA user_version.
+# A step is either an SQL script or a callable building the script for the given connection.
+MIGRATIONS: Tuple[Tuple[int, Union[str, Callable[[Connection], str]]], ...] = (
+    (1, """
+        -- Merge duplicate actor names into the oldest row before making names unique.
+        UPDATE OR IGNORE movie_cast SET actor_id = (
+            SELECT MIN(same_name.id) FROM actors
+            JOIN actors AS same_name ON same_name.name = actors.name
+            WHERE actors.id = movie_cast.actor_id);
+        DELETE FROM movie_cast WHERE actor_id NOT IN (SELECT MIN(id) FROM actors GROUP BY name);
+        DELETE FROM actors WHERE id NOT IN (SELECT MIN(id) FROM actors GROUP BY name);
+
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_actors_name ON actors (name);
+        CREATE INDEX IF NOT EXISTS idx_movies_genre ON movies (genre);
+        CREATE INDEX IF NOT EXISTS idx_movie_cast_actor ON movie_cast (actor_id, movie_id);
+        ANALYZE;
+    """),
+    (2, _movie_search_script),
+    (3, """
+        -- Pure SQL alternative to the movie_age() Python function; 'now' is evaluated once per statement.
+        CREATE VIEW IF NOT EXISTS movies_with_age AS
+        SELECT id, title, release_year, CAST(strftime('%Y', 'now') AS INTEGER) - release_year AS age
+        FROM movies;
+    """),
+    (4, """
+        -- Per-genre aggregates kept up to date by triggers, so genre queries read O(genres) rows.
+        CREATE TABLE IF NOT EXISTS genre_stats (
+            genre TEXT PRIMARY KEY,
+            movie_count INTEGER NOT NULL DEFAULT 0,
+            birth_year_sum INTEGER NOT NULL DEFAULT 0,
+            birth_year_count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID;
+
+        DELETE FROM genre_stats;
+        INSERT INTO genre_stats (genre, movie_count, birth_year_sum, birth_year_count)
+        SELECT movies.genre, COUNT(DISTINCT movies.id), COALESCE(SUM(actors.birth_year), 0), COUNT(actors.birth_year)
+        FROM movies
+        LEFT JOIN movie_cast ON movie_cast.movie_id = movies.id
+        LEFT JOIN actors ON actors.id = movie_cast.actor_id
+        GROUP BY movies.genre;
+
+        CREATE TRIGGER IF NOT EXISTS genre_stats_movie_insert AFTER INSERT ON movies BEGIN
+            INSERT INTO genre_stats (genre, movie_count) VALUES (new.genre, 1)
+            ON CONFLICT (genre) DO UPDATE SET movie_count = movie_count + 1;
+        END;
+
+        -- Casts go first, while the movie (and so its genre) still exists.
+        CREATE TRIGGER IF NOT EXISTS genre_stats_movie_before_delete BEFORE DELETE ON movies BEGIN
+            DELETE FROM movie_cast WHERE movie_id = old.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS genre_stats_movie_delete AFTER DELETE ON movies BEGIN
+            UPDATE genre_stats SET movie_count = movie_count - 1 WHERE genre = old.genre;
+            DELETE FROM genre_stats WHERE genre = old.genre AND movie_count <= 0;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS genre_stats_movie_genre_update AFTER UPDATE OF genre ON movies
+        WHEN old.genre IS NOT new.genre BEGIN
+            INSERT INTO genre_stats (genre, movie_count, birth_year_sum, birth_year_count)
+            SELECT new.genre, 1, COALESCE(SUM(actors.birth_year), 0), COUNT(actors.birth_year)
+            FROM movie_cast JOIN actors ON actors.id = movie_cast.actor_id
+            WHERE movie_cast.movie_id = new.id
+            ON CONFLICT (genre) DO UPDATE SET
+                movie_count = movie_count + 1,
+                birth_year_sum = birth_year_sum + excluded.birth_year_sum,
+                birth_year_count = birth_year_count + excluded.birth_year_count;
+            UPDATE genre_stats SET
+                movie_count = movie_count - 1,
+                birth_year_sum = birth_year_sum - (
+                    SELECT COALESCE(SUM(actors.birth_year), 0)
+                    FROM movie_cast JOIN actors ON actors.id = movie_cast.actor_id
+                    WHERE movie_cast.movie_id = old.id),
+                birth_year_count = birth_year_count - (
+                    SELECT COUNT(actors.birth_year)
+                    FROM movie_cast JOIN actors ON actors.id = movie_cast.actor_id
+                    WHERE movie_cast.movie_id = old.id)
+            WHERE genre = old.genre;
+            DELETE FROM genre_stats WHERE genre = old.genre AND movie_count <= 0;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS genre_stats_cast_insert AFTER INSERT ON movie_cast BEGIN
+            UPDATE genre_stats SET
+                birth_year_sum = birth_year_sum + COALESCE(
+                    (SELECT birth_year FROM actors WHERE id = new.actor_id), 0),
+                birth_year_count = birth_year_count + COALESCE(
+                    (SELECT birth_year IS NOT NULL FROM actors WHERE id = new.actor_id), 0)
+            WHERE genre = (SELECT genre FROM movies WHERE id = new.movie_id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS genre_stats_cast_delete AFTER DELETE ON movie_cast BEGIN
+            UPDATE genre_stats SET
+                birth_year_sum = birth_year_sum - COALESCE(
+                    (SELECT birth_year FROM actors WHERE id = old.actor_id), 0),
+                birth_year_count = birth_year_count - COALESCE(
+                    (SELECT birth_year IS NOT NULL FROM actors WHERE id = old.actor_id), 0)
+            WHERE genre = (SELECT genre FROM movies WHERE id = old.movie_id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS genre_stats_cast_update AFTER UPDATE ON movie_cast BEGIN
+            UPDATE genre_stats SET
+                birth_year_sum = birth_year_sum - COALESCE(
+                    (SELECT birth_year FROM actors WHERE id = old.actor_id), 0),
+                birth_year_count = birth_year_count - COALESCE(
+                    (SELECT birth_year IS NOT NULL FROM actors WHERE id = old.actor_id), 0)
+            WHERE genre = (SELECT genre FROM movies WHERE id = old.movie_id);
+            UPDATE genre_stats SET
+                birth_year_sum = birth_year_sum + COALESCE(
+                    (SELECT birth_year FROM actors WHERE id = new.actor_id), 0),
+                birth_year_count = birth_year_count + COALESCE(
+                    (SELECT birth_year IS NOT NULL FROM actors WHERE id = new.actor_id), 0)
+            WHERE genre = (SELECT genre FROM movies WHERE id = new.movie_id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS genre_stats_actor_before_delete BEFORE DELETE ON actors BEGIN
+            DELETE FROM movie_cast WHERE actor_id = old.id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS genre_stats_actor_birth_year_update AFTER UPDATE OF birth_year ON actors
+        WHEN old.birth_year IS NOT new.birth_year BEGIN
+            UPDATE genre_stats SET
+                birth_year_sum = birth_year_sum
+                    + (COALESCE(new.birth_year, 0) - COALESCE(old.birth_year, 0)) * appearances.n,
+                birth_year_count = birth_year_count
+                    + ((new.birth_year IS NOT NULL) - (old.birth_year IS NOT NULL)) * appearances.n
+            FROM (SELECT movies.genre AS genre, COUNT(*) AS n
+                  FROM movie_cast JOIN movies ON movies.id = movie_cast.movie_id
+                  WHERE movie_cast.actor_id = new.id
+                  GROUP BY movies.genre) AS appearances
+            WHERE genre_stats.genre = appearances.genre;
+        END;
+    """),
+    (5, _cast_list_script),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: Connection) -> int:
+    """
+    Reads the schema version stored in the database file.
+    :param conn: open connection.
+    :return: the applied migration version, 0 for a fresh database.
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: Connection) -> int:
+    """
+    Applies pending migrations, each one in its own transaction together with the version bump.
+    Version 2 is recorded even when SQLite lacks FTS5, so the title index is also created
+    whenever it is missing but FTS5 has become available.
+    :param conn: open connection.
+    :return: the schema version after migrating.
+    :raises: sqlite3.OperationalError in case of database operation error.
+    """
+    version = get_schema_version(conn)
+    for target, script in MIGRATIONS:
+        if target <= version:
+            continue
+        if callable(script):
+            script = script(conn)
+        conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {target};\nCOMMIT;")
+        version = target
+    if version >= 2 and fts5_available() and conn.execute(SEARCH_INDEX_EXISTS_SQL).fetchone() is None:
+        conn.executescript(f"BEGIN;\n{_movie_search_script(conn)}\nCOMMIT;")
+    with _search_index_lock:
+        _search_index.clear()
+    return version
+
+
+def explain_query_plan(sql: str, params: Sequence = ()) -> List[str]:
+    """
+    Returns the EXPLAIN QUERY PLAN detail lines of a statement.
+    :param sql: statement to explain.
+    :param params: statement parameters.
+    :return: list of plan details, e.g. "SEARCH actors USING COVERING INDEX idx_actors_name (name=?)".
+    """
+    with get_connection(read_only=True) as conn:
+        return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def check_query_plan(sql: str, params: Sequence = (), allow_scan: Sequence[str] = ()) -> List[str]:
+    """
+    Checks that a statement reaches its tables through indexes.
+    A full scan is only accepted for tables listed in `allow_scan`, i.e. queries that list a whole table.
+    :param sql: statement to check.
+    :param params: statement parameters.
+    :param allow_scan: tables that the statement is expected to read in full.
+    :return: plan lines violating the check; empty if every access uses an index.
+    """
+    violations = []
+    for detail in explain_query_plan(sql, params):
+        if "AUTOMATIC" in detail:
+            violations.append(detail)
+        elif detail.startswith("SCAN ") and " USING " not in detail and "VIRTUAL TABLE INDEX" not in detail:
+            if detail.split()[1] not in allow_scan:
+                violations.append(detail)
+    return violations
+
+
 def create_tables() -> None:
     """
-    Creates tables movies, actors, and movie_cast in db in case they were not created yet.
+    Creates tables movies, actors, and movie_cast in db in case they were not created yet
+    and brings the schema up to date with `MIGRATIONS`.
     :raises: sqlite3.OperationalError in case of database operation error.
     :raises: sqlite3.IntegrityError in case of foreign key error.
     """
@@ -51,9 +712,9 @@ def create_tables() -> None:
                 );
                 """
     try:
-        with create_connection() as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             cursor.executescript(sql_script)
-            conn.commit()
+            migrate(conn)
     except sqlite3.IntegrityError:
         print("Foreign Key constraint failed.")
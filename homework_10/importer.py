@@ -0,0 +1,216 @@
+"""
+Parallel Import Module
+Loads large tab-separated movie dumps (IMDb style, optionally gzip-compressed) with a pipeline of
+processes: the main process reads raw lines in chunks, a process pool parses and validates the
+chunks, and a single writer process commits them through `models.add_movies_bulk`. Parsed chunks
+travel through a bounded queue, so a slow writer throttles the parsers instead of filling memory.
+"""
+
+import gzip
+import multiprocessing
+import queue
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from homework_10 import db
+from homework_10.cache import query_cache
+from homework_10.models import add_movies_bulk
+
+# Accepted column names, moviebase names first, then the IMDb title.basics names.
+COLUMN_ALIASES = {
+    "title": ("title", "primaryTitle"),
+    "release_year": ("release_year", "startYear"),
+    "genre": ("genre", "genres"),
+    "actors": ("actors",),
+}
+TITLE_TYPE_COLUMN = "titleType"
+NULL_VALUE = "\\N"
+UNKNOWN_GENRE = "Unknown"
+
+
+def read_chunks(path: str, chunk_size: int) -> Tuple[List[str], Iterator[List[str]]]:
+    """
+    Opens a TSV file and splits its data lines into chunks without parsing them.
+    :param path: path to a `.tsv` or `.tsv.gz` file with a header line.
+    :param chunk_size: number of lines per chunk.
+    :return: tuple (header columns, iterator of line chunks).
+    :raises ValueError: If the header lacks the title or release year column.
+    """
+    file = gzip.open(path, "rt", encoding="utf-8") if path.endswith(".gz") \
+        else open(path, encoding="utf-8")
+    header = file.readline().rstrip("\n").split("\t")
+    try:
+        _column_positions(header)
+    except ValueError:
+        file.close()
+        raise
+
+    def chunks() -> Iterator[List[str]]:
+        with file:
+            while chunk := list(islice(file, chunk_size)):
+                yield chunk
+
+    return header, chunks()
+
+
+def _column_positions(header: List[str]) -> Dict[str, Optional[int]]:
+    """
+    Finds the position of every known field in the header.
+    :param header: header columns.
+    :return: dictionary field -> column index, None for absent fields.
+    :raises ValueError: If the title or release year column is missing.
+    """
+    positions = {field: next((header.index(name) for name in names if name in header), None)
+                 for field, names in COLUMN_ALIASES.items()}
+    positions[TITLE_TYPE_COLUMN] = header.index(TITLE_TYPE_COLUMN) if TITLE_TYPE_COLUMN in header else None
+    if positions["title"] is None or positions["release_year"] is None:
+        raise ValueError("TSV file needs a title and a release year column.")
+    return positions
+
+
+def parse_chunk(header: List[str], lines: List[str],
+                title_types: Tuple[str, ...] = ("movie",)) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Parses and validates raw TSV lines; runs in the parser processes.
+    The first of several comma separated genres is kept; `\\N` marks a missing value.
+    :param header: header columns of the file.
+    :param lines: raw data lines.
+    :param title_types: kept values of the `titleType` column, if the file has one.
+    :return: tuple (movie dictionaries for `add_movies_bulk`, number of rejected lines).
+    """
+    positions = _column_positions(header)
+    movies, rejected = [], 0
+
+    def field(values: List[str], name: str) -> Optional[str]:
+        index = positions[name]
+        if index is None or index >= len(values) or values[index] in ("", NULL_VALUE):
+            return None
+        return values[index]
+
+    for line in lines:
+        values = line.rstrip("\n").split("\t")
+        title_type = field(values, TITLE_TYPE_COLUMN)
+        if title_type is not None and title_type not in title_types:
+            continue
+        title, year = field(values, "title"), field(values, "release_year")
+        if title is None or year is None or not year.isdigit():
+            rejected += 1
+            continue
+        genres, actors = field(values, "genre"), field(values, "actors")
+        movies.append({
+            "title": title,
+            "release_year": int(year),
+            "genre": genres.split(",")[0] if genres else UNKNOWN_GENRE,
+            "actors": [actor.strip() for actor in actors.split(",") if actor.strip()] if actors else [],
+        })
+    return movies, rejected
+
+
+def _write_batches(database: str, batches: multiprocessing.Queue, written: Any, batch_size: int) -> None:
+    """
+    Writer process: commits parsed chunks until it receives None.
+    :param database: path to the database file.
+    :param batches: queue of movie lists.
+    :param written: shared counter of committed movies.
+    :param batch_size: number of movies per transaction.
+    """
+    db.configure_pool(database, max_size=1)
+    try:
+        while (movies := batches.get()) is not None:
+            rows = add_movies_bulk(movies, batch_size)["rows"]
+            with written.get_lock():
+                written.value += rows
+    finally:
+        db.close_pools()
+
+
+def _put(batches: multiprocessing.Queue, item: Any, writer: multiprocessing.Process) -> None:
+    """
+    Puts an item on the writer queue, waiting while it is full.
+    :param batches: writer queue.
+    :param item: movie list or the None sentinel.
+    :param writer: writer process.
+    :raises RuntimeError: If the writer process died.
+    """
+    while True:
+        try:
+            batches.put(item, timeout=1)
+            return
+        except queue.Full:
+            if not writer.is_alive():
+                raise RuntimeError("Writer process stopped unexpectedly.")
+
+
+def import_tsv(path: str, database: Optional[str] = None, workers: Optional[int] = None,
+               batch_size: int = 1000, queue_size: int = 8,
+               progress: Optional[Callable[[Dict[str, float]], None]] = None) -> Dict[str, float]:
+    """
+    Imports a TSV dump with parallel parsers and one writer process.
+    :param path: path to a `.tsv` or `.tsv.gz` file.
+    :param database: path to the database file, defaults to the one of the module-wide pool.
+                     The schema must already exist (`db.create_tables`).
+    :param workers: number of parser processes, defaults to the number of CPUs.
+    :param batch_size: lines per parsed chunk and movies per transaction.
+    :param queue_size: maximum number of parsed chunks waiting for the writer.
+    :param progress: called after every chunk with the current statistics.
+    :return: dictionary with `parsed` and `rows` (committed) movies, `rejected` lines,
+             `seconds` and `rows_per_second`.
+    :raises TypeError: If `batch_size` or `queue_size` is not an integer.
+    :raises ValueError: If `batch_size` or `queue_size` is less than 1, or the header is unusable.
+    :raises RuntimeError: If the writer process fails.
+    """
+    if not isinstance(batch_size, int) or not isinstance(queue_size, int):
+        raise TypeError("Batch size and queue size must be integers")
+    if batch_size < 1 or queue_size < 1:
+        raise ValueError("Batch size and queue size must be positive")
+
+    database = database or db.get_pool().database
+    header, chunks = read_chunks(path, batch_size)
+    workers = workers or multiprocessing.cpu_count()
+
+    context = multiprocessing.get_context("spawn")
+    batches = context.Queue(maxsize=queue_size)
+    written = context.Value("q", 0)
+    writer = context.Process(target=_write_batches, args=(database, batches, written, batch_size),
+                             name="moviebase-writer", daemon=True)
+    stats = {"parsed": 0, "rows": 0, "rejected": 0, "seconds": 0.0, "rows_per_second": 0.0}
+    started = time.perf_counter()
+
+    def collect(future: Future) -> None:
+        movies, rejected = future.result()
+        _put(batches, movies, writer)
+        stats["parsed"] += len(movies)
+        stats["rejected"] += rejected
+        stats["rows"] = written.value
+        stats["seconds"] = time.perf_counter() - started
+        stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+        if progress is not None:
+            progress(dict(stats))
+
+    writer.start()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as parsers:
+            pending: Deque[Future] = deque()
+            for chunk in chunks:
+                pending.append(parsers.submit(parse_chunk, header, chunk))
+                if len(pending) >= 2 * workers:
+                    collect(pending.popleft())
+            while pending:
+                collect(pending.popleft())
+        _put(batches, None, writer)
+        writer.join()
+    finally:
+        if writer.is_alive():
+            writer.terminate()
+            writer.join()
+        query_cache.invalidate("movies", "movie_cast", "actors")
+    if writer.exitcode != 0:
+        raise RuntimeError("Writer process failed.")
+
+    stats["rows"] = written.value
+    stats["seconds"] = time.perf_counter() - started
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
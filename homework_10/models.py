@@ -1,11 +1,49 @@
 """
 Model Operations Module
-This module provides functions to work with actors and movies: add_movie, add_actors, get_actor_id
+This module provides functions to work with actors and movies: add_movie, add_actors, get_actor_id,
+add_movies_bulk, rebuild_cast_lists
 """
 
-from typing import List, Union
+import sqlite3
+import time
+from itertools import islice
+from sqlite3 import Cursor
+from typing import Any, Dict, Iterable, List, Optional, Union
 
-from homework_10.db import create_connection
+from homework_10.cache import LRUCache, query_cache
+from homework_10.db import REBUILD_CAST_LISTS_SQL, after_commit, get_connection, get_pool
+
+SQLITE_MAX_PARAMS = 500
+
+ACTOR_ID_SQL = """SELECT id FROM actors WHERE name = ?"""
+
+# Actor name -> id of committed actors, keyed by (database, name). Ids are only published once the
+# transaction that read or inserted them commits, so a rollback never leaves an unknown id behind.
+# Actors deleted with plain SQL stay cached until evicted; call `actor_id_cache.clear()` after that.
+actor_id_cache = LRUCache(maxsize=10_000)
+
+
+def _cached_actor_id(name: str) -> Optional[int]:
+    """
+    Looks an actor up in the name cache.
+    :param name: actor name.
+    :return: actor id, or None if the name is not cached.
+    """
+    return actor_id_cache.get((get_pool().database, name))
+
+
+def _remember_actor_ids(actor_ids: Dict[str, int]) -> None:
+    """
+    Publishes name -> id pairs to the name cache once the current transaction commits.
+    :param actor_ids: dictionary name -> actor id.
+    """
+    database, staged = get_pool().database, dict(actor_ids)
+
+    def publish() -> None:
+        for name, actor_id in staged.items():
+            actor_id_cache.put((database, name), actor_id)
+
+    after_commit(publish)
 
 
 def get_actor_id(name: str) -> Union[int, None]:
@@ -13,7 +51,7 @@ def get_actor_id(name: str) -> Union[int, None]:
     Retrieves the ID of an actor by their name.
 
     This function checks if the actor exists in the database and returns their ID.
-    If the actor is not found, it returns `None`.
+    If the actor is not found, it returns `None`. Found ids are kept in `actor_id_cache`.
 
     :param name: The full name of the actor as a string.
     :raises TypeError: If the input `name` is not a string.
@@ -22,15 +60,21 @@ def get_actor_id(name: str) -> Union[int, None]:
     if not isinstance(name, str):
         raise TypeError("Actor name must be a string")
 
-    query = """SELECT id FROM actors WHERE name = ?"""
-    with create_connection() as conn:
+    actor_id = _cached_actor_id(name)
+    if actor_id is not None:
+        return actor_id
+
+    with get_connection() as conn:
         cursor = conn.cursor()
         try:
-            cursor.execute(query, (name,))
+            cursor.execute(ACTOR_ID_SQL, (name,))
             result = cursor.fetchone()
-            return result[0] if result else None
         finally:
             cursor.close()
+        if result is None:
+            return None
+        _remember_actor_ids({name: result[0]})
+        return result[0]
 
 
 def add_actor(name: str, birth_year: int = 1970) -> None:
@@ -41,6 +85,7 @@ def add_actor(name: str, birth_year: int = 1970) -> None:
 
     :raises TypeError: If the input `name` is not a string.
     :raises TypeError: If the input `birth_year` is not an integer.
+    :raises ValueError: If an actor with this name already exists.
     """
     if not isinstance(name, str):
         raise TypeError("Actor name must be a string")
@@ -48,18 +93,23 @@ def add_actor(name: str, birth_year: int = 1970) -> None:
         raise TypeError("Birth year must be an integer")
 
     query = """INSERT INTO actors (name, birth_year) values (?, ?)"""
-    with create_connection() as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         try:
             cursor.execute(query, (name, birth_year))
-            conn.commit()
+            _remember_actor_ids({name: cursor.lastrowid})
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"Actor {name} already exists") from e
         finally:
             cursor.close()
+        query_cache.invalidate_after_commit("actors")
 
 
 def add_movie(title: str, release_year: int, genre: str, actors: List[str]) -> None:
     """
     Function to add a movie to the database.
+    Actor ids come from the name cache; the actors it misses are looked up, and created
+    if unknown, with one set-based query.
     :param title: The title of the movie.
     :param release_year: release year of the movie.
     :param genre: genre of the movie.
@@ -79,23 +129,146 @@ def add_movie(title: str, release_year: int, genre: str, actors: List[str]) -> N
     if not isinstance(actors, list):
         raise TypeError("Actors must be a list")
 
-    query_insert_movie = """INSERT INTO movies (title, release_year, genre) VALUES (?, ?, ?)"""
+    query_insert_movie = """INSERT INTO movies (title, release_year, genre, cast_text) VALUES (?, ?, ?, ?)"""
     query_insert_actor = """INSERT INTO movie_cast (movie_id, actor_id) VALUES (?, ?)"""
-    query_insert_new_actor = """INSERT INTO actors (name, birth_year) VALUES (?, ?)"""
 
-    with create_connection() as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         try:
-            cursor.execute(query_insert_movie, (title, release_year, genre))
+            cursor.execute(query_insert_movie, (title, release_year, genre, ", ".join(actors) or None))
             movie_id = cursor.lastrowid
 
-            for actor in actors:
-                actor_id = get_actor_id(actor)
-                if actor_id is None:
-                    cursor.execute(query_insert_new_actor, (actor, 1970))
-                    actor_id = cursor.lastrowid
-                cursor.execute(query_insert_actor, (movie_id, actor_id))
+            actor_ids = _resolve_actor_ids(cursor, actors)
+            cursor.executemany(query_insert_actor, ((movie_id, actor_ids[actor]) for actor in actors))
+        finally:
+            cursor.close()
+        query_cache.invalidate_after_commit("movies", "movie_cast", "actors")
+
+
+def _validate_movie(movie: Dict[str, Any]) -> tuple:
+    """
+    Checks a movie record for the bulk loader.
+    :param movie: dictionary with `title`, `release_year`, `genre` and `actors` keys.
+    :return: tuple (title, release_year, genre, actors) with duplicate actors removed.
+    :raises TypeError: If the record or any of its fields has a wrong type.
+    """
+    if not isinstance(movie, dict):
+        raise TypeError("Movie record must be a dictionary")
+    title, release_year = movie.get("title"), movie.get("release_year")
+    genre, actors = movie.get("genre"), movie.get("actors", [])
+    if not isinstance(title, str):
+        raise TypeError("Movie title must be a string")
+    if not isinstance(release_year, int):
+        raise TypeError("Release year must be an integer")
+    if not isinstance(genre, str):
+        raise TypeError("Genre must be a string")
+    if not isinstance(actors, list) or not all(isinstance(actor, str) for actor in actors):
+        raise TypeError("Actors must be a list of strings")
+    return title, release_year, genre, list(dict.fromkeys(actors))
+
 
-            conn.commit()
+def _resolve_actor_ids(cursor: Cursor, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Maps actor names to ids: cached names first, the rest with set-based lookups,
+    inserting the actors that are missing.
+    :param cursor: cursor inside the current transaction.
+    :param names: actor names to resolve.
+    :return: dictionary name -> actor id.
+    """
+    actor_ids: Dict[str, int] = {}
+    uncached = []
+    for name in dict.fromkeys(names):
+        actor_id = _cached_actor_id(name)
+        if actor_id is None:
+            uncached.append(name)
+        else:
+            actor_ids[name] = actor_id
+    if not uncached:
+        return actor_ids
+
+    def select(batch: List[str]) -> None:
+        placeholders = ", ".join("?" * len(batch))
+        cursor.execute(f"SELECT name, id FROM actors WHERE name IN ({placeholders}) ORDER BY id DESC",
+                       batch)
+        actor_ids.update(cursor.fetchall())
+
+    for start in range(0, len(uncached), SQLITE_MAX_PARAMS):
+        select(uncached[start:start + SQLITE_MAX_PARAMS])
+
+    missing = [name for name in uncached if name not in actor_ids]
+    if missing:
+        cursor.executemany("""INSERT INTO actors (name, birth_year) VALUES (?, ?)""",
+                           ((name, 1970) for name in missing))
+        for start in range(0, len(missing), SQLITE_MAX_PARAMS):
+            select(missing[start:start + SQLITE_MAX_PARAMS])
+    _remember_actor_ids({name: actor_ids[name] for name in uncached})
+    return actor_ids
+
+
+def _insert_movie_batch(batch: List[tuple]) -> None:
+    """
+    Inserts one chunk of validated movies and their casts in a single transaction.
+    :param batch: list of (title, release_year, genre, actors) tuples.
+    """
+    with get_connection() as conn:
+        if not conn.in_transaction:
+            # Take the write lock up front so no other writer can grab ids in between.
+            conn.execute("BEGIN IMMEDIATE")
+        cursor = conn.cursor()
+        try:
+            actor_ids = _resolve_actor_ids(cursor, (actor for movie in batch for actor in movie[3]))
+
+            cursor.execute("""SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'movies'""")
+            first_id = cursor.fetchone()[0] + 1
+            cursor.executemany("""INSERT INTO movies (title, release_year, genre, cast_text) VALUES (?, ?, ?, ?)""",
+                               ((*movie[:3], ", ".join(movie[3]) or None) for movie in batch))
+            cursor.executemany("""INSERT INTO movie_cast (movie_id, actor_id) VALUES (?, ?)""",
+                               ((first_id + index, actor_ids[actor])
+                                for index, movie in enumerate(batch) for actor in movie[3]))
+        finally:
+            cursor.close()
+        query_cache.invalidate_after_commit("movies", "movie_cast", "actors")
+
+
+def add_movies_bulk(movies: Iterable[Dict[str, Any]], batch_size: int = 1000) -> Dict[str, float]:
+    """
+    Loads many movies at once.
+    Records are consumed lazily in chunks of `batch_size`; every chunk is one transaction
+    that resolves all its actor names with set-based lookups and inserts with `executemany`.
+    :param movies: iterable of dictionaries with `title`, `release_year`, `genre` and `actors`.
+    :param batch_size: number of movies per transaction.
+    :return: dictionary with `rows`, `seconds` and `rows_per_second`.
+    :raises TypeError: If `batch_size` is not an integer or a record is malformed.
+    :raises ValueError: If `batch_size` is less than 1.
+    """
+    if not isinstance(batch_size, int):
+        raise TypeError("Batch size must be an integer")
+    if batch_size < 1:
+        raise ValueError("Batch size must be positive")
+
+    rows = 0
+    started = time.perf_counter()
+    records = iter(movies)
+    while batch := [_validate_movie(movie) for movie in islice(records, batch_size)]:
+        _insert_movie_batch(batch)
+        rows += len(batch)
+
+    seconds = time.perf_counter() - started
+    return {"rows": rows, "seconds": seconds, "rows_per_second": rows / seconds if seconds else 0.0}
+
+
+def rebuild_cast_lists() -> int:
+    """
+    Recomputes the denormalized cast list of every movie from movie_cast, e.g. after casts
+    were changed with plain SQL or for a database created before the column existed.
+    :return: number of movies updated.
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(REBUILD_CAST_LISTS_SQL)
+            updated = cursor.rowcount
         finally:
             cursor.close()
+        query_cache.invalidate_after_commit("movies")
+    return updated
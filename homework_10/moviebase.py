@@ -1,21 +1,125 @@
 """
 Movie Database Console Application
 This module provides a command-line interface for managing a movie database.
+Run without arguments for the interactive menu, `import <file>` to bulk-load a CSV/JSONL catalogue,
+`import-tsv <file>` to load a large (IMDb style) TSV dump in parallel or `rebuild-casts` to recompute
+the stored cast lists of an existing database.
 """
 
+import argparse
+import csv
+import json
+from typing import Any, Dict, Iterable, Iterator
+
 from homework_10.db import create_tables
-from homework_10.models import add_movie, add_actor
-from homework_10.queries import get_movies_with_actors, get_unique_genres, get_movie_count_by_genre, \
-    get_average_age_by_genre, search_movies_with_like, get_movies_with_limit, get_all_movies_and_actors, \
-    get_movies_with_age
+from homework_10.importer import import_tsv
+from homework_10.models import add_movie, add_actor, add_movies_bulk, rebuild_cast_lists
+from homework_10.queries import iter_movies_with_actors, iter_unique_genres, iter_movie_count_by_genre, \
+    get_average_age_by_genre, iter_search_movies, iter_movies_with_limit, iter_all_movies_and_actors, \
+    iter_movies_with_age, get_movies_page
 
 
-def main():
+def read_movies(path: str) -> Iterator[Dict[str, Any]]:
     """
-    Runs the Movie Database console application.
+    Lazily reads movie records from a CSV or JSONL file.
+    CSV files need a header with `title`, `release_year`, `genre` and `actors` (comma separated);
+    JSONL files hold one object per line with the same keys, `actors` being a list or a string.
+    :param path: path to a `.csv` or `.jsonl` file.
+    :return: iterator of movie dictionaries accepted by `add_movies_bulk`.
+    :raises ValueError: If the file extension is not supported.
     """
-    create_tables()
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as file:
+            for row in csv.DictReader(file):
+                yield _normalize_movie(row)
+    elif path.endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    yield _normalize_movie(json.loads(line))
+    else:
+        raise ValueError("Only .csv and .jsonl files are supported.")
+
+
+def _normalize_movie(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converts a raw file record to the types expected by the models.
+    :param record: raw record read from a file.
+    :return: movie dictionary.
+    """
+    actors = record.get("actors") or []
+    if isinstance(actors, str):
+        actors = [actor.strip() for actor in actors.split(",") if actor.strip()]
+    return {
+        "title": record["title"],
+        "release_year": int(record["release_year"]),
+        "genre": record["genre"],
+        "actors": actors,
+    }
+
+
+def import_movies(path: str, batch_size: int = 1000) -> None:
+    """
+    Bulk-loads a CSV/JSONL catalogue and reports the throughput.
+    :param path: path to a `.csv` or `.jsonl` file.
+    :param batch_size: number of movies per transaction.
+    """
+    stats = add_movies_bulk(read_movies(path), batch_size)
+    print(f"Imported {stats['rows']} movies in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_second']:.0f} rows/sec).")
+
+
+def import_movies_tsv(path: str, workers: int | None = None, batch_size: int = 1000) -> None:
+    """
+    Loads a TSV dump with parallel parsers, printing progress and the final throughput.
+    :param path: path to a `.tsv` or `.tsv.gz` file.
+    :param workers: number of parser processes, defaults to the number of CPUs.
+    :param batch_size: number of movies per transaction.
+    """
+    def report(stats: Dict[str, float]) -> None:
+        print(f"Parsed {stats['parsed']} movies, written {stats['rows']} "
+              f"({stats['rows_per_second']:.0f} rows/sec)", end="\r", flush=True)
+
+    stats = import_tsv(path, workers=workers, batch_size=batch_size, progress=report)
+    print(f"\nImported {stats['rows']} movies in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_second']:.0f} rows/sec), {stats['rejected']} lines rejected.")
+
+
+def print_rows(rows: Iterable, line: str = "{0}", empty_message: str = "No movies found.") -> None:
+    """
+    Prints query results one line per row, consuming iterators lazily.
+    :param rows: rows returned by a query; tuples are unpacked into `line`.
+    :param line: format string for a row.
+    :param empty_message: message printed when there are no rows.
+    """
+    printed = False
+    for row in rows:
+        print(line.format(*row) if isinstance(row, tuple) else line.format(row))
+        printed = True
+    if not printed:
+        print(empty_message)
+
 
+def browse_movies(limit: int) -> None:
+    """
+    Shows movies page by page using keyset pagination until the user stops or the list ends.
+    :param limit: number of movies per page.
+    """
+    cursor = None
+    while True:
+        rows, cursor = get_movies_page(limit, cursor)
+        if not rows:
+            print("No movies found.")
+        for _, title in rows:
+            print(title)
+        if cursor is None or input('Press Enter for the next page or q to stop: ').lower() == 'q':
+            break
+
+
+def run_menu():
+    """
+    Runs the Movie Database console application.
+    """
     while True:
         print('Menu')
         print('1 - Add Movie')
@@ -28,7 +132,9 @@ def main():
         print('8 - Show Movies with Pagination')
         print('9 - All Movies and Actors')
         print('10 - Check Movies Age')
-        print('11 - Esc')
+        print('11 - Import Movies from CSV/JSONL')
+        print('12 - Browse Movies Page by Page')
+        print('13 - Esc')
 
         try:
             choice = input('Enter your choice: ')
@@ -46,26 +152,32 @@ def main():
                     add_actor(name, birth_year)
                     print(f"Actor {name} added.")
                 case '3':
-                    get_movies_with_actors()
+                    print_rows(iter_movies_with_actors(), "Movie: {0}| Actors: {1}")
                 case '4':
-                    get_unique_genres()
+                    print_rows(iter_unique_genres(), empty_message="No genres found.")
                 case '5':
-                    get_movie_count_by_genre()
+                    print_rows(iter_movie_count_by_genre(), "{0}: {1}", "No genres found.")
                 case '6':
                     genre = input('Enter movie genre: ')
-                    get_average_age_by_genre(genre)
+                    print(f"{genre}: {get_average_age_by_genre(genre)}")
                 case '7':
                     name = input('Enter movie name (or part of it): ')
-                    search_movies_with_like(name)
+                    print_rows(iter_search_movies(name))
                 case '8':
                     limit = int(input('Enter number of movies per page: '))
                     offset = int(input('Enter number of page to show: '))
-                    get_movies_with_limit(limit, offset)
+                    print_rows(iter_movies_with_limit(limit, offset))
                 case '9':
-                    get_all_movies_and_actors()
+                    print_rows(iter_all_movies_and_actors(), empty_message="No movies or actors found.")
                 case '10':
-                    get_movies_with_age()
+                    print_rows(iter_movies_with_age(), "{0}: {1} years")
                 case '11':
+                    path = input('Enter path to .csv or .jsonl file: ')
+                    import_movies(path)
+                case '12':
+                    limit = int(input('Enter number of movies per page: '))
+                    browse_movies(limit)
+                case '13':
                     print('Goodbye!')
                     break
                 case _:
@@ -74,5 +186,32 @@ def main():
             print(f"An error occurred: {e}")
 
 
+def main():
+    """
+    Entry point: parses command line arguments and runs the menu or a subcommand.
+    """
+    parser = argparse.ArgumentParser(description="Movie Database console application.")
+    subcommands = parser.add_subparsers(dest="command")
+    import_parser = subcommands.add_parser("import", help="bulk-load movies from a CSV/JSONL file")
+    import_parser.add_argument("path", help="path to a .csv or .jsonl file")
+    import_parser.add_argument("--batch-size", type=int, default=1000, help="movies per transaction")
+    tsv_parser = subcommands.add_parser("import-tsv", help="load a TSV dump with parallel parser processes")
+    tsv_parser.add_argument("path", help="path to a .tsv or .tsv.gz file")
+    tsv_parser.add_argument("--workers", type=int, help="parser processes (default: number of CPUs)")
+    tsv_parser.add_argument("--batch-size", type=int, default=1000, help="movies per transaction")
+    subcommands.add_parser("rebuild-casts", help="recompute the stored cast list of every movie")
+    args = parser.parse_args()
+
+    create_tables()
+    if args.command == "import":
+        import_movies(args.path, args.batch_size)
+    elif args.command == "import-tsv":
+        import_movies_tsv(args.path, args.workers, args.batch_size)
+    elif args.command == "rebuild-casts":
+        print(f"Rebuilt cast lists of {rebuild_cast_lists()} movies.")
+    else:
+        run_menu()
+
+
 if __name__ == '__main__':
     main()
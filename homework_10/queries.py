@@ -1,131 +1,302 @@
 """
 Queries Module
-This module provides the list of queries to access the data
+This module provides the list of queries to access the data.
+Every query has an `iter_*` variant that streams typed rows in `fetchmany` batches
+and a `get_*` variant that returns them as a list. The hottest `get_*` functions are served
+from `cache.query_cache`, which model functions invalidate on writes.
 """
 
-from homework_10.db import create_connection
+import base64
+import binascii
+import re
+from datetime import datetime
+from typing import Callable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 
+from homework_10.cache import query_cache
+from homework_10.db import get_connection, get_pool, get_read_pool, has_search_index
 
-def get_movies_with_actors() -> None:
+FETCH_BATCH_SIZE = 500
+
+# Casts are pre-aggregated into movies.cast_text by the models (see models.rebuild_cast_lists).
+MOVIES_WITH_ACTORS_SQL = """
+    SELECT title, cast_text AS actors
+    FROM movies
+    WHERE cast_text IS NOT NULL
+"""
+
+# Genre queries read the genre_stats summary table maintained by triggers (see db.MIGRATIONS).
+UNIQUE_GENRES_SQL = """SELECT genre FROM genre_stats"""
+
+MOVIE_COUNT_BY_GENRE_SQL = """
+    SELECT genre, movie_count AS movies_count
+    FROM genre_stats
+    ORDER BY genre
+"""
+
+AVERAGE_AGE_BY_GENRE_SQL = """
+    SELECT strftime('%Y', 'now') - CAST(birth_year_sum AS REAL) / birth_year_count AS avg_age
+    FROM genre_stats
+    WHERE genre = ? AND birth_year_count > 0
+"""
+
+SEARCH_MOVIES_LIKE_SQL = """
+    SELECT title from movies
+    WHERE LOWER(title) LIKE LOWER (?)
+"""
+
+SEARCH_MOVIES_FTS_SQL = """
+    SELECT movies.title FROM movies_fts
+    JOIN movies ON movies.id = movies_fts.rowid
+    WHERE movies_fts MATCH ?
+    ORDER BY bm25(movies_fts)
+    LIMIT ?
+"""
+
+SEARCH_MOVIES_LIKE_LIMIT_SQL = """
+    SELECT title from movies
+    WHERE LOWER(title) LIKE LOWER (?)
+    LIMIT ?
+"""
+
+MOVIES_WITH_LIMIT_SQL = """
+    SELECT title from movies
+    LIMIT ? OFFSET ?
+"""
+
+MOVIES_PAGE_SQL = """
+    SELECT id, title FROM movies
+    WHERE id > ?
+    ORDER BY id
+    LIMIT ?
+"""
+
+ALL_MOVIES_AND_ACTORS_SQL = """
+    SELECT TITLE FROM movies
+    UNION
+    SELECT NAME FROM actors
+"""
+
+MOVIES_WITH_AGE_SQL = """SELECT title, age FROM movies_with_age"""
+
+MOVIES_WITH_AGE_UDF_SQL = """SELECT title, movie_age(release_year, ?) AS age FROM movies"""
+
+
+class MovieRow(NamedTuple):
+    """A movie identified by its id."""
+    id: int
+    title: str
+
+
+class MovieActors(NamedTuple):
+    """A movie with its comma separated cast."""
+    title: str
+    actors: str
+
+
+class GenreCount(NamedTuple):
+    """Number of movies within a genre."""
+    genre: str
+    movies_count: int
+
+
+class MovieAge(NamedTuple):
+    """A movie with its age in years."""
+    title: str
+    age: int
+
+
+def first_column(row: tuple) -> object:
+    """Returns the only column of a single-column row."""
+    return row[0]
+
+
+def _stream(sql: str, params: Sequence = (), make_row: Callable[[tuple], object] = tuple,
+            batch_size: int = FETCH_BATCH_SIZE) -> Iterator:
     """
-    Gets all movies with actors.
+    Runs a query and yields its rows converted by `make_row`, fetching `batch_size` rows at a time.
+    The iterator holds a read-only connection of its own until it is exhausted or closed, so
+    interleaved iterators never share one. Inside a write transaction the rows are read
+    at once through the writer's connection instead, to include its uncommitted changes.
+    :param sql: query to run.
+    :param params: query parameters.
+    :param make_row: converts a raw row, e.g. `MovieAge._make`.
+    :param batch_size: number of rows per `fetchmany` call.
+    :return: iterator of converted rows.
     """
-    query = """
-         SELECT movies.title, GROUP_CONCAT(actors.name, ', ') AS actors
-         FROM movies
-         INNER JOIN movie_cast ON movies.id = movie_cast.movie_id
-         INNER JOIN actors ON actors.id = movie_cast.actor_id
-         GROUP BY movies.id
-         """
+    if get_pool().holds_connection():
+        with get_connection() as conn:
+            return iter([make_row(row) for row in conn.execute(sql, params).fetchall()])
+    return _fetch_batches(sql, params, make_row, batch_size)
 
-    with create_connection() as conn:
+
+def _fetch_batches(sql: str, params: Sequence, make_row: Callable[[tuple], object],
+                   batch_size: int) -> Iterator:
+    """
+    Streaming part of `_stream`, on a dedicated read-only connection.
+    :param sql: query to run.
+    :param params: query parameters.
+    :param make_row: converts a raw row.
+    :param batch_size: number of rows per `fetchmany` call.
+    :return: iterator of converted rows.
+    """
+    with get_read_pool().dedicated_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute(query)
-        result = cursor.fetchall()
+        try:
+            cursor.execute(sql, params)
+            while rows := cursor.fetchmany(batch_size):
+                for row in rows:
+                    yield make_row(row)
+        finally:
+            cursor.close()
+
 
-        if result:
-            for row in result:
-                print(f"Movie: {row[0]}| Actors: {row[1]}")
-        else:
-            print("No movies found.")
+def iter_movies_with_actors() -> Iterator[MovieActors]:
+    """
+    Streams all movies with actors.
+    :return: iterator of MovieActors.
+    """
+    return _stream(MOVIES_WITH_ACTORS_SQL, make_row=MovieActors._make)
 
 
-def get_unique_genres() -> None:
+@query_cache.cached("movies", "movie_cast", "actors")
+def get_movies_with_actors() -> List[MovieActors]:
     """
-    Gets all unique genres.
+    Gets all movies with actors.
+    :return: list of MovieActors.
     """
-    query = """SELECT DISTINCT genre FROM movies"""
+    return list(iter_movies_with_actors())
 
-    with create_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(query)
-        movies = cursor.fetchall()
-        result = [movie[0] for movie in movies]
-        if result:
-            for genre in result:
-                print(f"{genre}")
-        else:
-            print("No genres found.")
+
+def iter_unique_genres() -> Iterator[str]:
+    """
+    Streams all unique genres.
+    :return: iterator of genre names.
+    """
+    return _stream(UNIQUE_GENRES_SQL, make_row=first_column)
 
 
-def get_movie_count_by_genre() -> None:
+@query_cache.cached("movies")
+def get_unique_genres() -> List[str]:
     """
-    Gets movie count by genre.
+    Gets all unique genres.
+    :return: list of genre names.
     """
-    query = """
-    SELECT genre, COUNT(*) AS movies_count
-    FROM movies
-    GROUP BY genre
+    return list(iter_unique_genres())
+
+
+def iter_movie_count_by_genre() -> Iterator[GenreCount]:
+    """
+    Streams movie count by genre.
+    :return: iterator of GenreCount.
     """
+    return _stream(MOVIE_COUNT_BY_GENRE_SQL, make_row=GenreCount._make)
 
-    with create_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(query)
-        genre_count = cursor.fetchall()
-        if genre_count:
-            for genre, count in genre_count:
-                print(f"{genre}: {count}")
-        else:
-            print("No genres found.")
+
+@query_cache.cached("movies")
+def get_movie_count_by_genre() -> List[GenreCount]:
+    """
+    Gets movie count by genre.
+    :return: list of GenreCount.
+    """
+    return list(iter_movie_count_by_genre())
 
 
-def get_average_age_by_genre(genre: str) -> None:
+@query_cache.cached("movies", "movie_cast", "actors")
+def get_average_age_by_genre(genre: str) -> Optional[float]:
     """
     Gets average age of actors in movies by genre.
     :param genre: genre to check
+    :return: the average age, or None if the genre has no actors with a known birth year.
     :raises TypeError: if genre is not a string.
     """
     if not isinstance(genre, str):
         raise TypeError("Genre must be a string.")
 
-    query = """
-    SELECT AVG(strftime('%Y', 'now') - actors.birth_year) AS avg_age
-    FROM ACTORS
-    JOIN movie_cast ON movie_cast.actor_id = actors.id
-    JOIN movies ON movies.id = movie_cast.movie_id
-    WHERE movies.genre = ?
-    """
-
-    with create_connection() as conn:
+    with get_connection(read_only=True) as conn:
         cursor = conn.cursor()
-        cursor.execute(query, (genre,))
+        cursor.execute(AVERAGE_AGE_BY_GENRE_SQL, (genre,))
         result = cursor.fetchone()
-        if result:
-            print(f"{genre}: {result[0]}")
-        else:
-            print("No genres found.")
+        return result[0] if result else None
 
 
-def search_movies_with_like(title: str) -> None:
+def iter_movies_with_like(title: str) -> Iterator[str]:
+    """
+    Streams movies with a certain title or partially
+    :param title: title to search for
+    :return: iterator of movie titles.
+    :raises TypeError: if title is not a string.
+    """
+    if not isinstance(title, str):
+        raise TypeError("Title must be a string.")
+
+    return _stream(SEARCH_MOVIES_LIKE_SQL, (f'%{title}%',), first_column)
+
+
+def search_movies_with_like(title: str) -> List[str]:
     """
     Searches for movies with a certain title or partially
     :param title: title to search for
+    :return: list of movie titles.
     :raises TypeError: if title is not a string.
     """
+    return list(iter_movies_with_like(title))
+
+
+def search_statement(title: str, limit: int = 20, database: Optional[str] = None) -> Tuple[str, tuple]:
+    """
+    Builds the title search query: with the full-text index every word is matched as a prefix
+    and results are ranked by bm25; without it (no FTS5, or no words) LIKE is used.
+    Shared by the sync and async search functions.
+    :param title: words (or beginnings of words) to search for
+    :param limit: maximum number of movies to return
+    :param database: database the query will run on, defaults to the one of the module-wide pool.
+    :return: tuple (sql, params) selecting movie titles.
+    :raises TypeError: if title is not a string or limit is not an integer.
+    :raises ValueError: if limit is less than 1.
+    """
     if not isinstance(title, str):
         raise TypeError("Title must be a string.")
+    if not isinstance(limit, int):
+        raise TypeError("Limit must be an integer.")
+    if limit < 1:
+        raise ValueError("Limit must be positive.")
 
-    query = """
-    SELECT title from movies
-    WHERE LOWER(title) LIKE LOWER (?)
+    words = re.findall(r"\w+", title)
+    if words and has_search_index(database):
+        match = " ".join(f'"{word}"*' for word in words)
+        return SEARCH_MOVIES_FTS_SQL, (match, limit)
+    return SEARCH_MOVIES_LIKE_LIMIT_SQL, (f'%{title}%', limit)
+
+
+def iter_search_movies(title: str, limit: int = 20) -> Iterator[str]:
     """
+    Streams movie titles found with the full-text index, see `search_statement`.
+    :param title: words (or beginnings of words) to search for
+    :param limit: maximum number of movies to return
+    :return: iterator of movie titles, best match first.
+    :raises TypeError: if title is not a string or limit is not an integer.
+    :raises ValueError: if limit is less than 1.
+    """
+    sql, params = search_statement(title, limit)
+    return _stream(sql, params, first_column)
 
-    with create_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(query, (f'%{title}%',))
-        movies = cursor.fetchall()
-        if movies:
-            for movie in movies:
-                print(f"{movie[0]}")
-        else:
-            print("No movies found.")
+
+def search_movies(title: str, limit: int = 20) -> List[str]:
+    """
+    Searches movie titles with the full-text index, see `iter_search_movies`.
+    :param title: words (or beginnings of words) to search for
+    :param limit: maximum number of movies to return
+    :return: list of movie titles, best match first.
+    """
+    return list(iter_search_movies(title, limit))
 
 
-def get_movies_with_limit(limit: int, offset: int) -> None:
+def iter_movies_with_limit(limit: int, offset: int) -> Iterator[str]:
     """
-    Gets list of movies with a certain pagination
+    Streams list of movies with a certain pagination
     :param limit: limit of records to show
     :param offset: number of the page to show
+    :return: iterator of movie titles.
     :raises TypeError: if limit is not an integer.
     :raises TypeError: if offset is not an integer.
     :raises ValueError: if offset is less than 1.
@@ -138,58 +309,125 @@ def get_movies_with_limit(limit: int, offset: int) -> None:
     if limit < 1 or offset < 1:
         raise ValueError("Limit and offset must be positive.")
 
-    query = """
-    SELECT title from movies
-    LIMIT ? OFFSET ?
+    real_offset = (offset - 1) * limit
+    return _stream(MOVIES_WITH_LIMIT_SQL, (limit, real_offset), first_column)
+
+
+def get_movies_with_limit(limit: int, offset: int) -> List[str]:
+    """
+    Gets list of movies with a certain pagination, see `iter_movies_with_limit`.
+    :param limit: limit of records to show
+    :param offset: number of the page to show
+    :return: list of movie titles.
     """
+    return list(iter_movies_with_limit(limit, offset))
 
-    real_offset = (offset - 1) * limit if offset > 0 else 0
-    with create_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(query, (limit, real_offset))
-        movies = cursor.fetchall()
-        if movies:
-            for movie in movies:
-                print(f"{movie[0]}")
-        else:
-            print("No movies found.")
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Packs the position after the last seen movie into an opaque cursor.
+    :param last_id: id of the last movie on the page.
+    :return: URL-safe cursor string.
+    """
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode()
 
 
-def get_all_movies_and_actors():
+def decode_cursor(cursor: str) -> int:
     """
-    Gets all movies and actors.
+    Unpacks a cursor produced by `encode_cursor`.
+    :param cursor: cursor string.
+    :return: id of the last movie of the previous page.
+    :raises ValueError: if the cursor is malformed.
     """
-    query = """
-    SELECT TITLE FROM movies
-    UNION 
-    SELECT NAME FROM actors;
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor.") from e
+
+
+def page_statement(limit: int, cursor: Optional[str] = None) -> Tuple[str, tuple]:
     """
+    Builds the query of one keyset page; it selects one row more than `limit`,
+    which tells `split_page` whether another page follows.
+    :param limit: number of movies per page
+    :param cursor: cursor returned with the previous page, None for the first page
+    :return: tuple (sql, params) selecting MovieRow rows.
+    :raises TypeError: if limit is not an integer or cursor is not a string.
+    :raises ValueError: if limit is less than 1 or cursor is malformed.
+    """
+    if not isinstance(limit, int):
+        raise TypeError("Limit must be an integer.")
+    if cursor is not None and not isinstance(cursor, str):
+        raise TypeError("Cursor must be a string.")
+    if limit < 1:
+        raise ValueError("Limit must be positive.")
 
-    with create_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(query)
-        result = cursor.fetchall()
+    last_id = decode_cursor(cursor) if cursor else 0
+    return MOVIES_PAGE_SQL, (last_id, limit + 1)
 
-        if result:
-            for row in result:
-                print(f"{row[0]}")
-        else:
-            print("No movies or actors found.")
 
+def split_page(rows: List[MovieRow], limit: int) -> Tuple[List[MovieRow], Optional[str]]:
+    """
+    Turns the rows of a `page_statement` query into a page and the cursor of the next one.
+    :param rows: fetched rows, at most `limit + 1`.
+    :param limit: number of movies per page
+    :return: tuple (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].id)
+    return rows, None
 
-def get_movies_with_age():
+
+def get_movies_page(limit: int, cursor: Optional[str] = None) -> Tuple[List[MovieRow], Optional[str]]:
     """
-    Gets all movies with their age.
+    Gets one page of movies using keyset pagination: the page starts right after the movie
+    the cursor points at, so every page costs the same regardless of how deep it is.
+    :param limit: number of movies per page
+    :param cursor: cursor returned with the previous page, None for the first page
+    :return: tuple (rows, next_cursor); next_cursor is None on the last page.
+    :raises TypeError: if limit is not an integer or cursor is not a string.
+    :raises ValueError: if limit is less than 1 or cursor is malformed.
     """
-    query = """SELECT title, movie_age(release_year) AS age FROM movies"""
+    sql, params = page_statement(limit, cursor)
+    return split_page(list(_stream(sql, params, MovieRow._make)), limit)
 
-    with create_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(query)
-        result = cursor.fetchall()
-
-        if result:
-            for row in result:
-                print(f"{row[0]}: {row[1]} years")
-        else:
-            print("No movies found.")
+
+def iter_all_movies_and_actors() -> Iterator[str]:
+    """
+    Streams all movie titles and actor names.
+    :return: iterator of names.
+    """
+    return _stream(ALL_MOVIES_AND_ACTORS_SQL, make_row=first_column)
+
+
+@query_cache.cached("movies", "actors")
+def get_all_movies_and_actors() -> List[str]:
+    """
+    Gets all movies and actors.
+    :return: list of movie titles and actor names.
+    """
+    return list(iter_all_movies_and_actors())
+
+
+def iter_movies_with_age(validate: bool = False) -> Iterator[MovieAge]:
+    """
+    Streams all movies with their age.
+    By default the age is computed in SQL by the movies_with_age view. With `validate` the
+    deterministic movie_age() function is used instead, so release years are checked,
+    and the current year is read once and bound to the statement.
+    :param validate: whether to compute ages with the validating Python function.
+    :return: iterator of MovieAge.
+    """
+    if validate:
+        return _stream(MOVIES_WITH_AGE_UDF_SQL, (datetime.now().year,), MovieAge._make)
+    return _stream(MOVIES_WITH_AGE_SQL, make_row=MovieAge._make)
+
+
+def get_movies_with_age(validate: bool = False) -> List[MovieAge]:
+    """
+    Gets all movies with their age, see `iter_movies_with_age`.
+    :param validate: whether to compute ages with the validating Python function.
+    :return: list of MovieAge.
+    """
+    return list(iter_movies_with_age(validate))
@@ -4,14 +4,17 @@ This module includes function `movie_age` which returns the age of the movie
 """
 
 from datetime import datetime
+from typing import Optional
 
 
-def movie_age(release_year: int) -> int:
+def movie_age(release_year: int, current_year: Optional[int] = None) -> int:
     """
     Returns the age of the movie
     :param release_year: The release year of the movie
+    :param current_year: The year to count from. Defaults to the current year; pass it
+                         explicitly to get a deterministic result that does not call `datetime.now()`.
     :return: the age of the movie
-    :raise TypeError: If `release_year` is not an integer
+    :raise TypeError: If `release_year` or `current_year` is not an integer
     :raise ValueError: If `release_year` is less than 1910
     """
 
@@ -20,5 +23,8 @@ def movie_age(release_year: int) -> int:
     if release_year < 1910:
         raise ValueError("Release year must be greater than 1910")
 
-    current_year = datetime.now().year
+    if current_year is None:
+        current_year = datetime.now().year
+    elif not isinstance(current_year, int):
+        raise TypeError("Current year must be an integer")
     return current_year - release_year
@@ -0,0 +1,500 @@
+"""
+Module: async_repository
+------------------------
+This module defines asyncio counterparts of the shop repositories built on Motor.
+All repositories of one event loop share a Motor client per URI, and a semaphore per client
+bounds the number of operations in flight, so a burst of requests waits for a free slot
+instead of queueing unbounded work on the connection pool.
+"""
+
+import asyncio
+import weakref
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import pymongo
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError
+
+from base_repo import (BULK_CHUNK_SIZE, BULK_RETRIES, FIND_BATCH_SIZE, BulkOperation, add_bulk_counts,
+                       is_idempotent, settle_bulk_error, write_model)
+from client_registry import DEFAULT_URI
+from order_repo import (CLIENT_TOTALS_COLLECTION, DAILY_SALES_COLLECTION, check_order, client_total_pipeline,
+                        rollup_updates, sales_info_pipeline)
+from product_repo import VERSIONS_COLLECTION, catalogue_version_bump
+
+MAX_CONCURRENCY = 100
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Tuple[AsyncIOMotorClient, asyncio.Semaphore]]]" \
+    = weakref.WeakKeyDictionary()
+_limits: Dict[str, int] = {}
+
+
+def configure_async_client(uri: str = DEFAULT_URI, max_concurrency: int = MAX_CONCURRENCY) -> None:
+    """
+    Sets how many operations the clients of a URI run at once; applies to clients created afterwards.
+    :param uri: MongoDB connection URI.
+    :param max_concurrency: maximum number of operations in flight per event loop.
+    :raises TypeError: If `max_concurrency` is not an integer.
+    :raises ValueError: If `max_concurrency` is less than 1.
+    """
+    if not isinstance(max_concurrency, int):
+        raise TypeError("Max concurrency must be an integer")
+    if max_concurrency < 1:
+        raise ValueError("Max concurrency must be positive")
+    _limits[uri] = max_concurrency
+
+
+def get_async_client(uri: str = DEFAULT_URI) -> Tuple[AsyncIOMotorClient, asyncio.Semaphore]:
+    """
+    Returns the Motor client of a URI for the running event loop, with its concurrency limit.
+    Motor clients are bound to the loop they are first used on, hence one client per loop.
+    :param uri: MongoDB connection URI.
+    :return: tuple (client, semaphore).
+    :raises RuntimeError: If called outside a running event loop.
+    """
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    if uri not in clients:
+        clients[uri] = (AsyncIOMotorClient(uri), asyncio.Semaphore(_limits.get(uri, MAX_CONCURRENCY)))
+    return clients[uri]
+
+
+def close_async_clients() -> None:
+    """
+    Closes the Motor clients of the running event loop.
+    """
+    for client, _ in _clients.pop(asyncio.get_running_loop(), {}).values():
+        client.close()
+
+
+class AsyncBaseRepository:
+    """
+    Asyncio variant of `BaseRepository`; every method is a coroutine, `find_all` and
+    `aggregate` are async iterators. Must be created inside a running event loop.
+    """
+
+    def __init__(self, db_name: str, collection_name: str, uri: str = DEFAULT_URI) -> None:
+        """
+        Initializes the repository with the shared client of the running loop.
+        :param db_name: The name of the MongoDB database.
+        :param collection_name: The name of the collection to interact with.
+        :param uri: MongoDB connection URI.
+        :raises TypeError: If `db_name` or `collection_name` is not a string.
+        """
+        if not isinstance(db_name, str):
+            raise TypeError("Database name must be a string")
+        if not isinstance(collection_name, str):
+            raise TypeError("Collection name must be a string")
+
+        self.client, self.limit = get_async_client(uri)
+        self.db = self.client[db_name]
+        self.collection = self.db[collection_name]
+
+    async def insert_one(self, data: Dict[str, Any]) -> Optional[pymongo.results.InsertOneResult]:
+        """
+        Inserts a single document into the collection.
+        :param data: The document to insert.
+        :return: The result of the insertion.
+        :raises TypeError: If `data` is not a dictionary.
+        """
+        if not isinstance(data, dict):
+            raise TypeError("Data must be a dictionary")
+
+        try:
+            async with self.limit:
+                result = await self.collection.insert_one(data)
+            await self._changed()
+            return result
+        except PyMongoError as e:
+            print(f"Error: {e}")
+            return None
+
+    async def insert_many(self, data: List[Dict[str, Any]]) -> Optional[pymongo.results.InsertManyResult]:
+        """
+        Inserts a list of documents into the collection.
+        :param data: list of documents to insert.
+        :return: result of the insertion.
+        :raises TypeError: If `data` is not a list.
+        """
+        if not isinstance(data, list):
+            raise TypeError("Data must be a list")
+
+        try:
+            async with self.limit:
+                result = await self.collection.insert_many(data)
+            await self._changed()
+            return result
+        except PyMongoError as e:
+            print(f"Error: {e}")
+            return None
+
+    async def _changed(self) -> None:
+        """
+        Awaited after every successful write through the repository, outside its concurrency slot.
+        Does nothing here; subclasses override it, like `BaseRepository._changed`.
+        """
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Retrieves a single document from the collection.
+        :param query: The filter criteria for the search. Defaults to None.
+        :return: The first matching document, or None if no match is found.
+        :raises TypeError: If `query` is not a dictionary.
+        """
+        if query is not None and not isinstance(query, dict):
+            raise TypeError("Query must be a dictionary or None")
+
+        try:
+            async with self.limit:
+                return await self.collection.find_one(query)
+        except PyMongoError as e:
+            print(f"Error: {e}")
+            return None
+
+    async def find_all(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None,
+                       sort: Optional[List[Tuple[str, int]]] = None, limit: int = 0,
+                       batch_size: int = FIND_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields matching documents, fetching `batch_size` of them per round trip.
+        A concurrency slot is held only while a batch is fetched, not while the caller consumes it.
+        :param query: The filter criteria for the search. Defaults to None.
+        :param projection: fields to return. Defaults to whole documents.
+        :param sort: list of (field, direction) pairs.
+        :param limit: maximum number of documents, 0 for no limit.
+        :param batch_size: number of documents per round trip.
+        :return: async iterator of documents.
+        :raises TypeError: If `query` is not a dictionary.
+        """
+        if query is not None and not isinstance(query, dict):
+            raise TypeError("Query must be a dictionary or None")
+
+        cursor = self.collection.find(query, projection, sort=sort, limit=limit, batch_size=batch_size)
+        try:
+            while True:
+                async with self.limit:
+                    batch = await cursor.to_list(length=batch_size)
+                if not batch:
+                    return
+                for document in batch:
+                    yield document
+        except PyMongoError as e:
+            print(f"Error: {e}")
+        finally:
+            await cursor.close()
+
+    async def aggregate(self, pipeline: List[Dict[str, Any]],
+                        batch_size: int = FIND_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Runs an aggregation and yields its results batch by batch.
+        :param pipeline: aggregation stages.
+        :param batch_size: number of documents per round trip.
+        :return: async iterator of result documents.
+        :raises TypeError: If `pipeline` is not a list.
+        """
+        if not isinstance(pipeline, list):
+            raise TypeError("Pipeline must be a list")
+
+        cursor = self.collection.aggregate(pipeline, batchSize=batch_size)
+        try:
+            while True:
+                async with self.limit:
+                    batch = await cursor.to_list(length=batch_size)
+                if not batch:
+                    return
+                for document in batch:
+                    yield document
+        except PyMongoError as e:
+            print(f"Error: {e}")
+        finally:
+            await cursor.close()
+
+    async def update_one(self, query: Dict[str, Any], new_data: Dict[str, Any]) \
+            -> Optional[pymongo.results.UpdateResult]:
+        """
+        Updates a single document that matches the query.
+        :param query: The filter criteria for the search.
+        :param new_data: The fields to set.
+        :return: The result of the update operation.
+        :raises TypeError: If `query` or `new_data` is not a dictionary.
+        """
+        if not isinstance(query, dict):
+            raise TypeError("Query must be a dictionary")
+        if not isinstance(new_data, dict):
+            raise TypeError("New data must be a dictionary")
+
+        try:
+            async with self.limit:
+                result = await self.collection.update_one(query, {"$set": new_data})
+            await self._changed()
+            return result
+        except PyMongoError as e:
+            print(f"Error: {e}")
+            return None
+
+    async def update_many(self, query: Dict[str, Any], new_data: Dict[str, Any]) \
+            -> Optional[pymongo.results.UpdateResult]:
+        """
+        Updates all documents that match the query.
+        :param query: The filter criteria for the search.
+        :param new_data: The fields to set.
+        :return: The result of the update operation.
+        :raises TypeError: If `query` or `new_data` is not a dictionary.
+        """
+        if not isinstance(query, dict):
+            raise TypeError("Query must be a dictionary")
+        if not isinstance(new_data, dict):
+            raise TypeError("New data must be a dictionary")
+
+        try:
+            async with self.limit:
+                result = await self.collection.update_many(query, {"$set": new_data})
+            await self._changed()
+            return result
+        except PyMongoError as e:
+            print(f"Error: {e}")
+            return None
+
+    async def bulk_write(self, operations: Iterable[BulkOperation], chunk_size: int = BULK_CHUNK_SIZE,
+                         ordered: bool = True, retries: int = BULK_RETRIES) -> Dict[str, int]:
+        """
+        Sends write operations in chunks, one round trip and one concurrency slot per chunk,
+        with the chunking, retry and counting rules of `BaseRepository.bulk_write`.
+        :param operations: pymongo write models; build updates with `update_operation`.
+        :param chunk_size: maximum number of operations per round trip.
+        :param ordered: whether operations must be applied in order, stopping at the first error.
+        :param retries: how many times a failed sub-batch is sent again.
+        :return: dictionary with inserted/matched/modified/upserted/deleted/failed counts.
+        :raises TypeError: If `chunk_size` or `retries` is not an integer.
+        :raises ValueError: If `chunk_size` is less than 1 or `retries` is negative.
+        """
+        if not isinstance(chunk_size, int) or not isinstance(retries, int):
+            raise TypeError("Chunk size and retries must be integers")
+        if chunk_size < 1 or retries < 0:
+            raise ValueError("Chunk size must be positive and retries not negative")
+
+        totals = {"inserted": 0, "matched": 0, "modified": 0, "upserted": 0, "deleted": 0, "failed": 0}
+        operations = iter(operations)
+        while chunk := list(islice(operations, chunk_size)):
+            if not await self._write_chunk(chunk, ordered, retries, totals) and ordered:
+                totals["failed"] += sum(1 for _ in operations)
+                break
+        if any(totals[counter] for counter in ("inserted", "modified", "upserted", "deleted")):
+            await self._changed()
+        return totals
+
+    async def _write_chunk(self, chunk: List[BulkOperation], ordered: bool, retries: int,
+                           totals: Dict[str, int]) -> bool:
+        """
+        Writes one chunk, retrying the operations that failed transiently.
+        :param chunk: operations of the chunk.
+        :param ordered: whether operations must be applied in order.
+        :param retries: how many times a failed sub-batch is sent again.
+        :param totals: counters updated in place.
+        :return: True if every operation of the chunk was applied.
+        """
+        for attempt in range(retries + 1):
+            if attempt:
+                await asyncio.sleep(0.1 * 2 ** (attempt - 1))
+            try:
+                async with self.limit:
+                    result = await self.collection.bulk_write([write_model(operation) for operation in chunk],
+                                                              ordered=ordered)
+                add_bulk_counts(totals, result.bulk_api_result)
+                return True
+            except BulkWriteError as e:
+                chunk, outcome = settle_bulk_error(chunk, e.details, ordered, totals)
+                if outcome is not None:
+                    return outcome
+            except ConnectionFailure as e:
+                print(f"Error: {e}")
+                if not all(is_idempotent(operation) for operation in chunk):
+                    break
+            except PyMongoError as e:
+                print(f"Error: {e}")
+                break
+        totals["failed"] += len(chunk)
+        return False
+
+    async def delete_one(self, query: Dict[str, Any]) -> Optional[pymongo.results.DeleteResult]:
+        """
+        Deletes a single document from the collection that matches the query.
+        :param query: The filter criteria for the deletion.
+        :return: The result of the delete operation.
+        :raises TypeError: If `query` is not a dictionary.
+        """
+        if not isinstance(query, dict):
+            raise TypeError("Query must be a dictionary")
+
+        try:
+            async with self.limit:
+                result = await self.collection.delete_one(query)
+            await self._changed()
+            return result
+        except PyMongoError as e:
+            print(f"Error: {e}")
+            return None
+
+    async def delete_many(self, query: Dict[str, Any]) -> Optional[pymongo.results.DeleteResult]:
+        """
+        Deletes all documents from the collection that match the query.
+        :param query: The filter criteria for the deletion.
+        :return: The result of the delete operation.
+        :raises TypeError: If `query` is not a dictionary.
+        """
+        if not isinstance(query, dict):
+            raise TypeError("Query must be a dictionary")
+
+        try:
+            async with self.limit:
+                result = await self.collection.delete_many(query)
+            await self._changed()
+            return result
+        except PyMongoError as e:
+            print(f"Error: {e}")
+            return None
+
+
+class AsyncProductRepository(AsyncBaseRepository):
+    """
+    Asyncio variant of `ProductRepository`; every write bumps the catalogue version as well.
+    """
+
+    def __init__(self, uri: str = DEFAULT_URI) -> None:
+        """
+        Initializes the repository with the 'products' collection.
+        :param uri: MongoDB connection URI.
+        """
+        super().__init__("my_shop", "products", uri)
+        self.versions = self.db[VERSIONS_COLLECTION]
+
+    async def _changed(self) -> None:
+        """
+        Bumps the catalogue version after a write, like `ProductRepository._changed`.
+        """
+        try:
+            async with self.limit:
+                await self.versions.update_one(*catalogue_version_bump(self.collection.name), upsert=True)
+        except PyMongoError as e:
+            print(f"Error: {e}")
+
+    async def update_stock(self, product_name: str, quantity: int) -> Optional[pymongo.results.UpdateResult]:
+        """
+        Updates the stock quantity for a given product.
+        :param product_name: The name of the product
+        :param quantity: The new stock quantity (must be >= 0).
+        :return: The result of the update operation.
+        :raises ValueError: If `quantity` is less than 0.
+        """
+        if quantity < 0:
+            raise ValueError("Quantity must be greater than  or equal to 0")
+
+        return await self.update_one({"name": product_name}, {"stock": quantity})
+
+    async def delete_out_of_stock(self) -> Optional[pymongo.results.DeleteResult]:
+        """
+        Deletes all products that have a stock quantity of zero.
+        :return: The result of the delete operation.
+        """
+        return await self.delete_many({"stock": 0})
+
+
+class AsyncOrderRepository(AsyncBaseRepository):
+    """
+    Asyncio variant of `OrderRepository`. Inserted orders are checked and added to the same rollups,
+    so `OrderRepository.get_sales_from_rollups` and `get_client_total_from_rollups` include them.
+    """
+
+    def __init__(self, uri: str = DEFAULT_URI) -> None:
+        """
+        Initializes the repository with the 'orders' collection and the rollup collections.
+        :param uri: MongoDB connection URI.
+        """
+        super().__init__("my_shop", "orders", uri)
+        self.daily_sales = self.db[DAILY_SALES_COLLECTION]
+        self.client_totals = self.db[CLIENT_TOTALS_COLLECTION]
+
+    async def insert_one(self, data: Dict[str, Any]) -> Optional[pymongo.results.InsertOneResult]:
+        """
+        Inserts an order and adds it to the rollups.
+        :param data: The order to insert.
+        :return: The result of the insertion.
+        :raises TypeError: If `data` is not a dictionary.
+        :raises ValueError: If the order cannot be added to the rollups, see `check_order`.
+        """
+        check_order(data)
+        result = await super().insert_one(data)
+        if result is not None:
+            await self._update_rollups([data])
+        return result
+
+    async def insert_many(self, data: List[Dict[str, Any]]) -> Optional[pymongo.results.InsertManyResult]:
+        """
+        Inserts orders and adds them to the rollups.
+        :param data: list of orders to insert.
+        :return: result of the insertion.
+        :raises TypeError: If `data` is not a list.
+        :raises ValueError: If any order cannot be added to the rollups, see `check_order`;
+                            nothing is inserted then.
+        """
+        if isinstance(data, list):
+            for order in data:
+                check_order(order)
+        result = await super().insert_many(data)
+        if result is not None:
+            await self._update_rollups(data)
+        return result
+
+    async def _update_rollups(self, orders: List[Dict[str, Any]]) -> None:
+        """
+        Adds orders to the rollups with the increments of `rollup_updates`, one bulk write per collection.
+        Like in `OrderRepository`, they are not atomic with the order insert.
+        :param orders: inserted orders.
+        """
+        daily, clients = rollup_updates(orders)
+        try:
+            async with self.limit:
+                if daily:
+                    await self.daily_sales.bulk_write(daily, ordered=False)
+                if clients:
+                    await self.client_totals.bulk_write(clients, ordered=False)
+        except PyMongoError as e:
+            print(f"Error: {e}")
+
+    def iter_recent_orders(self, days: int = 30) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields orders placed within the past `days`, newest first.
+        :param days: number of days to get recent orders for. Default is 30 days.
+        :return: async iterator of orders.
+        :raises TypeError: If `days` is not an integer.
+        """
+        if not isinstance(days, int):
+            raise TypeError("Days must be an integer")
+        return self.find_all({"date": {"$gt": datetime.today() - timedelta(days=days)}},
+                             sort=[("date", pymongo.DESCENDING)])
+
+    async def get_sales_info(self, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
+        """
+        Retrieves total sales per product within a specified date range.
+        :param start_date: The start of the date range.
+        :param end_date: The end of the date range.
+        :return: A list containing sales information for each product.
+        :raises TypeError: If `start_date` or `end_date` is not a datetime.
+        """
+        if not isinstance(start_date, datetime) or not isinstance(end_date, datetime):
+            raise TypeError("Start date and end date must be of type datetime.date")
+
+        return [row async for row in self.aggregate(sales_info_pipeline(start_date, end_date))]
+
+    async def get_total_order_amount_by_client(self, client_name: str) -> float:
+        """
+        Calculates the total amount spent by a given client.
+        :param client_name: The name of the client.
+        :return: The total amount spent by the client.
+        :raises TypeError: If `client_name` is not a string.
+        """
+        if not isinstance(client_name, str):
+            raise TypeError("Client name must be a string")
+
+        result = [row async for row in self.aggregate(client_total_pipeline(client_name))]
+        return result[0]["total_amount"] if result else 0.0
@@ -5,11 +5,183 @@ This module defines the BaseRepository class, which provides a generic
 interface for interacting with MongoDB collections.
 """
 
-from typing import Dict, Any, List, Optional
+import time
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 
 import pymongo
 
-from pymongo.errors import PyMongoError
+from pymongo import DeleteMany, DeleteOne, IndexModel, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError
+
+from client_registry import DEFAULT_URI, get_client
+
+WriteOperation = Union[InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne, DeleteMany]
+
+FIND_BATCH_SIZE = 500
+BULK_CHUNK_SIZE = 1000
+BULK_RETRIES = 3
+# Server error codes after which a failed write may succeed when sent again
+# (primary stepping down, shutdown, write conflicts, time limits).
+TRANSIENT_ERROR_CODES = frozenset({6, 7, 50, 89, 91, 112, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436})
+# Update operators whose result does not change when the same update is applied twice.
+IDEMPOTENT_UPDATE_OPERATORS = frozenset({"$set", "$unset", "$setOnInsert", "$min", "$max", "$addToSet", "$pull"})
+
+# A query shape is a filter with an optional sort, as issued by a repository method.
+QueryShape = Tuple[Dict[str, Any], Optional[List[Tuple[str, int]]]]
+
+
+def collscan_stages(plan: Any) -> List[Dict[str, Any]]:
+    """
+    Finds full collection scans in the output of `explain()`.
+    Only the winning plan is inspected: rejected candidate plans are skipped.
+    :param plan: explain document, or any part of it.
+    :return: list of COLLSCAN stages, empty if the query uses indexes only.
+    """
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in collscan_stages(item)]
+    if not isinstance(plan, dict):
+        return []
+    stages = [plan] if plan.get("stage") == "COLLSCAN" else []
+    for key, value in plan.items():
+        if key != "rejectedPlans":
+            stages.extend(collscan_stages(value))
+    return stages
+
+
+class Resendable(NamedTuple):
+    """
+    Write operation marked, by the code that built it, as safe to send again after a connection
+    error left its outcome unknown. `BaseRepository.bulk_write` sends the wrapped operation.
+    """
+
+    operation: WriteOperation
+
+
+BulkOperation = Union[WriteOperation, Resendable]
+
+
+def update_operation(query: Dict[str, Any], update: Union[Dict[str, Any], List[Dict[str, Any]]],
+                     upsert: bool = False, many: bool = False) -> BulkOperation:
+    """
+    Builds an UpdateOne (or UpdateMany) for `bulk_write`, marked `Resendable` when the update
+    document only uses operators in IDEMPOTENT_UPDATE_OPERATORS. Updates with $inc, $push
+    or pipelines are left unmarked, since applying them twice changes the result.
+    :param query: The filter criteria for the update.
+    :param update: update document or pipeline.
+    :param upsert: whether to insert a document if none matches.
+    :param many: whether to update every matching document.
+    :return: write operation, wrapped in `Resendable` if idempotent.
+    """
+    operation = (UpdateMany if many else UpdateOne)(query, update, upsert=upsert)
+    if isinstance(update, dict) and set(update) <= IDEMPOTENT_UPDATE_OPERATORS:
+        return Resendable(operation)
+    return operation
+
+
+def is_idempotent(operation: BulkOperation) -> bool:
+    """
+    Tells whether applying a write operation twice gives the same result as applying it once,
+    i.e. whether it may be sent again after a connection error left its outcome unknown.
+    Operations marked `Resendable` qualify, and so do `DeleteMany` and inserts: pymongo assigns
+    the `_id` before sending, so a repeated insert fails with a duplicate key error instead of
+    adding a second document. Other operations qualify only when marked: `DeleteOne` would
+    remove another matching document, and whether an update or replacement is safe depends on
+    its document, which only the code building it knows (see `update_operation`).
+    :param operation: pymongo write model, or one wrapped in `Resendable`.
+    :return: True if the operation is safe to resend.
+    """
+    return isinstance(operation, (Resendable, InsertOne, DeleteMany))
+
+
+def write_model(operation: BulkOperation) -> WriteOperation:
+    """
+    Returns the pymongo write model of an operation, unwrapping `Resendable`.
+    :param operation: pymongo write model, or one wrapped in `Resendable`.
+    :return: pymongo write model.
+    """
+    return operation.operation if isinstance(operation, Resendable) else operation
+
+
+def add_bulk_counts(totals: Dict[str, int], result: Dict[str, Any]) -> None:
+    """
+    Adds the counters of a raw bulk write result to the running totals.
+    :param totals: counters updated in place.
+    :param result: `bulk_api_result` or `BulkWriteError.details`.
+    """
+    totals["inserted"] += result.get("nInserted", 0)
+    totals["matched"] += result.get("nMatched", 0)
+    totals["modified"] += result.get("nModified", 0)
+    totals["upserted"] += result.get("nUpserted", 0)
+    totals["deleted"] += result.get("nRemoved", 0)
+
+
+def settle_bulk_error(chunk: List[BulkOperation], details: Dict[str, Any], ordered: bool,
+                      totals: Dict[str, int]) -> Tuple[List[BulkOperation], Optional[bool]]:
+    """
+    Counts the outcome of a chunk that failed with a BulkWriteError and picks the operations
+    to send again: those that failed with a transient error and, in ordered mode, the rest after them.
+    :param chunk: operations of the failed round trip.
+    :param details: `BulkWriteError.details`.
+    :param ordered: whether operations must be applied in order.
+    :param totals: counters updated in place.
+    :return: tuple (operations to send again, outcome); the outcome is None while operations are
+             left to send, else whether every operation of the chunk was applied.
+    """
+    add_bulk_counts(totals, details)
+    errors = details.get("writeErrors", [])
+    if not errors:
+        # Every operation was applied; only the write concern was not satisfied.
+        concern_errors = details.get("writeConcernErrors") or [{"errmsg": "write concern error"}]
+        print(f"Error: {concern_errors[0].get('errmsg')}")
+        return [], True
+    transient = [error for error in errors if error.get("code") in TRANSIENT_ERROR_CODES]
+    failed = len(errors) - len(transient)
+    if ordered:
+        first = errors[0]["index"]
+        if failed:
+            print(f"Error: {errors[0].get('errmsg')}")
+            totals["failed"] += len(chunk) - first
+            return [], False
+        return chunk[first:], None
+    for error in errors:
+        if error.get("code") not in TRANSIENT_ERROR_CODES:
+            print(f"Error: {error.get('errmsg')}")
+    totals["failed"] += failed
+    chunk = [chunk[error["index"]] for error in transient]
+    return (chunk, None) if chunk else ([], failed == 0)
+
+
+class BoundCollection:
+    """
+    Repository attribute resolving a collection of the repository's database on every access,
+    so a repository never holds on to a client that `client_registry` closed and replaced.
+    Assigning the attribute, e.g. a test double, overrides the lookup.
+    """
+
+    def __init__(self, collection_name: Optional[str] = None) -> None:
+        """
+        :param collection_name: name of the collection, None for the repository's own collection.
+        """
+        self.collection_name = collection_name
+        self.attribute = ""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        """Remembers where an assigned override is kept."""
+        self.attribute = f"_{name}_override"
+
+    def __get__(self, repository: Any, owner: type) -> Any:
+        """Returns the assigned override or the collection of the current client."""
+        if repository is None:
+            return self
+        override = repository.__dict__.get(self.attribute)
+        if override is not None:
+            return override
+        return repository.db[self.collection_name or repository.collection_name]
+
+    def __set__(self, repository: Any, value: Any) -> None:
+        """Overrides the lookup with a fixed collection."""
+        repository.__dict__[self.attribute] = value
 
 
 class BaseRepository:
@@ -17,17 +189,28 @@ class BaseRepository:
     A generic repository class for performing common database operations in MongoDB.
     This class provides methods to insert, retrieve, update, and delete
     documents from a specified collection.
+    Subclasses declare the indexes their queries need in `INDEXES` and the methods issuing
+    those queries in `QUERY_METHODS`, so `ensure_indexes` and `collscan_queries` can keep the two in line.
     Attributes:
-        client (MongoClient): The MongoDB client instance.
+        client (MongoClient): The MongoDB client instance, shared by all repositories using the same URI
+                              and looked up in `client_registry` on every access.
         db (Database): The database instance.
         collection (Collection): The collection instance within the database.
     """
 
-    def __init__(self, db_name: str, collection_name: str) -> None:
+    INDEXES: List[IndexModel] = []
+    # Methods whose queries must be served by `INDEXES`: (method name, sample arguments);
+    # the tests record the queries they issue and check them with `collscan_queries`.
+    QUERY_METHODS: List[Tuple[str, Tuple[Any, ...]]] = []
+
+    collection = BoundCollection()
+
+    def __init__(self, db_name: str, collection_name: str, uri: str = DEFAULT_URI) -> None:
         """
          Initializes the repository by connecting to MongoDB.
         :param db_name: The name of the MongoDB database.
         :param collection_name: The name of the collection to interact with.
+        :param uri: MongoDB connection URI; the client comes from `client_registry`.
         :raises TypeError: If `db_name` is not a string.
         :raises TypeError: If `collection_name` is not a string.
         """
@@ -36,9 +219,24 @@ class BaseRepository:
         if not isinstance(collection_name, str):
             raise TypeError("Collection name must be a string")
 
-        self.client = pymongo.MongoClient("mongodb://localhost:27017/")
-        self.db = self.client[db_name]
-        self.collection = self.db[collection_name]
+        self.uri = uri
+        self.db_name = db_name
+        self.collection_name = collection_name
+
+    @property
+    def client(self) -> pymongo.MongoClient:
+        """
+        The registry's current client of the repository's URI, so clients replaced by
+        `configure_client` or closed by `close_all` are never used again.
+        """
+        return get_client(self.uri)
+
+    @property
+    def db(self) -> pymongo.database.Database:
+        """
+        The repository's database on the current client.
+        """
+        return self.client[self.db_name]
 
     def insert_one(self, data: Dict[str, Any]) -> Optional[pymongo.results.InsertOneResult]:
         """
@@ -52,7 +250,9 @@ class BaseRepository:
             raise TypeError("Data must be a dictionary")
 
         try:
-            return self.collection.insert_one(data)
+            result = self.collection.insert_one(data)
+            self._changed()
+            return result
         except PyMongoError as e:
             print(f"Error: {e}")
             return None
@@ -68,11 +268,19 @@ class BaseRepository:
         if not isinstance(data, list):
             raise TypeError("Data must be a list")
         try:
-            return self.collection.insert_many(data)
+            result = self.collection.insert_many(data)
+            self._changed()
+            return result
         except PyMongoError as e:
             print(f"Error: {e}")
             return None
 
+    def _changed(self) -> None:
+        """
+        Called after every successful write through the repository.
+        Does nothing here; subclasses override it, e.g. to publish a new data version.
+        """
+
     def find_one(self, query: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """
         Retrieves a single document from the collection.
@@ -94,18 +302,109 @@ class BaseRepository:
         """
         Retrieves all documents from the collection.
         :param query: The filter criteria for the search. Defaults to None.
-        :return: All documents from the collection matching criteria.
-        :raises pymongo.errors.PyMongoError: If there is an error in retrieving data.
+        :return: All documents from the collection matching criteria; empty if the query failed.
+        :raises pymongo.errors.PyMongoError: If the cursor fails after documents were received,
+                                             instead of returning a truncated list.
         :raises TypeError: If `query` is not a dictionary.
         """
+        return list(self.iter_find(query))
+
+    def iter_find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None,
+                  sort: Optional[List[Tuple[str, int]]] = None, skip: int = 0, limit: int = 0,
+                  batch_size: int = FIND_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yields documents, fetching them from the server `batch_size` at a time.
+        The server cursor is closed when the iterator is exhausted or closed.
+        An error before the first document is printed and ends the iteration; an error
+        after documents were yielded is raised, so a truncated result never looks complete.
+        :param query: The filter criteria for the search. Defaults to None.
+        :param projection: fields to return, e.g. {"name": 1, "_id": 0}. Defaults to whole documents.
+        :param sort: list of (field, direction) pairs, e.g. [("date", pymongo.DESCENDING)].
+        :param skip: number of matching documents to skip.
+        :param limit: maximum number of documents, 0 for no limit.
+        :param batch_size: number of documents per round trip.
+        :return: iterator of documents.
+        :raises pymongo.errors.PyMongoError: If the cursor fails after documents were yielded.
+        :raises TypeError: If `query` or `projection` is not a dictionary.
+        :raises ValueError: If `skip` or `limit` is negative or `batch_size` is less than 1.
+        """
         if query is not None and not isinstance(query, dict):
             raise TypeError("Query must be a dictionary or None")
+        if projection is not None and not isinstance(projection, dict):
+            raise TypeError("Projection must be a dictionary or None")
+        if skip < 0 or limit < 0 or batch_size < 1:
+            raise ValueError("Skip and limit must not be negative and batch size must be positive")
+
+        return self._iter_cursor(query, projection, sort=sort, skip=skip, limit=limit, batch_size=batch_size)
 
+    def _iter_cursor(self, query: Optional[Dict[str, Any]], projection: Optional[Dict[str, Any]],
+                     started: bool = False, **options: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the documents of a find cursor. Errors are printed like in the other methods
+        as long as nothing was handed out; afterwards they are raised.
+        :param query: The filter criteria for the search.
+        :param projection: fields to return.
+        :param started: whether the caller already handed out documents of the same result.
+        :param options: further `Collection.find` options.
+        :return: iterator of documents.
+        :raises pymongo.errors.PyMongoError: If the cursor fails once documents were handed out.
+        """
         try:
-            return list(self.collection.find(query))
+            with self.collection.find(query, projection, **options) as cursor:
+                for document in cursor:
+                    started = True
+                    yield document
         except PyMongoError as e:
+            if started:
+                raise
             print(f"Error: {e}")
-            return []
+
+    def iter_by_id(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None,
+                   page_size: int = FIND_BATCH_SIZE, after_id: Any = None) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yields documents in `_id` order, one page per query.
+        Every page starts after the last `_id` seen and is served by the `_id` index, so no
+        server cursor stays open between pages and the walk can be resumed from any `_id`.
+        :param query: The filter criteria for the search. Defaults to None.
+        :param projection: fields to return; `_id` must not be excluded.
+        :param page_size: number of documents per query.
+        :param after_id: `_id` to resume after, None to start from the beginning.
+        :return: iterator of documents.
+        :raises pymongo.errors.PyMongoError: If a page fails after documents were yielded.
+        :raises TypeError: If `query` or `projection` is not a dictionary.
+        :raises ValueError: If `page_size` is less than 1 or `projection` excludes `_id`.
+        """
+        if query is not None and not isinstance(query, dict):
+            raise TypeError("Query must be a dictionary or None")
+        if projection is not None and not isinstance(projection, dict):
+            raise TypeError("Projection must be a dictionary or None")
+        if not isinstance(page_size, int) or page_size < 1:
+            raise ValueError("Page size must be a positive integer")
+        if projection is not None and projection.get("_id", 1) in (0, False):
+            raise ValueError("Keyset pagination needs the _id field")
+
+        return self._iter_pages(query or {}, projection, page_size, after_id)
+
+    def _iter_pages(self, query: Dict[str, Any], projection: Optional[Dict[str, Any]],
+                    page_size: int, after_id: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Generator behind `iter_by_id`.
+        :param query: The filter criteria for the search.
+        :param projection: fields to return.
+        :param page_size: number of documents per query.
+        :param after_id: `_id` to resume after, or None.
+        :return: iterator of documents.
+        """
+        started = False
+        while True:
+            page_query = query if after_id is None else {"$and": [query, {"_id": {"$gt": after_id}}]}
+            page = list(self._iter_cursor(page_query, projection, started, sort=[("_id", pymongo.ASCENDING)],
+                                          limit=page_size, batch_size=page_size))
+            started = started or bool(page)
+            yield from page
+            if len(page) < page_size:
+                return
+            after_id = page[-1]["_id"]
 
     def update_one(self, query: Dict[str, Any], new_data: Dict[str, Any]) \
             -> Optional[pymongo.results.UpdateResult]:
@@ -124,7 +423,9 @@ class BaseRepository:
             raise TypeError("New data must be a dictionary")
 
         try:
-            return self.collection.update_one(query, {"$set": new_data})
+            result = self.collection.update_one(query, {"$set": new_data})
+            self._changed()
+            return result
         except PyMongoError as e:
             print(f"Error: {e}")
             return None
@@ -140,7 +441,172 @@ class BaseRepository:
         if not isinstance(query, dict):
             raise TypeError("Query must be a dictionary")
         try:
-            return self.collection.delete_one(query)
+            result = self.collection.delete_one(query)
+            self._changed()
+            return result
+        except PyMongoError as e:
+            print(f"Error: {e}")
+            return None
+
+    def update_many(self, query: Dict[str, Any], new_data: Dict[str, Any]) \
+            -> Optional[pymongo.results.UpdateResult]:
+        """
+        Updates all documents that match the query.
+        :param query: The filter criteria for the search.
+        :param new_data: The fields to set.
+        :return: The result of the update operation.
+        :raises pymongo.errors.PyMongoError: If there is an error in updating data.
+        :raises TypeError: If `query` is not a dictionary.
+        :raises TypeError: If `new_data` is not a dictionary.
+        """
+        if not isinstance(query, dict):
+            raise TypeError("Query must be a dictionary")
+        if not isinstance(new_data, dict):
+            raise TypeError("New data must be a dictionary")
+
+        try:
+            result = self.collection.update_many(query, {"$set": new_data})
+            self._changed()
+            return result
+        except PyMongoError as e:
+            print(f"Error: {e}")
+            return None
+
+    def delete_many(self, query: Dict[str, Any]) -> Optional[pymongo.results.DeleteResult]:
+        """
+        Deletes all documents from the collection that match the query.
+        :param query: The filter criteria for the deletion.
+        :return: The result of the delete operation.
+        :raises pymongo.errors.PyMongoError: If there is an error in deleting data.
+        :raises TypeError: If `query` is not a dictionary.
+        """
+        if not isinstance(query, dict):
+            raise TypeError("Query must be a dictionary")
+        try:
+            result = self.collection.delete_many(query)
+            self._changed()
+            return result
         except PyMongoError as e:
             print(f"Error: {e}")
             return None
+
+    def bulk_write(self, operations: Iterable[BulkOperation], chunk_size: int = BULK_CHUNK_SIZE,
+                   ordered: bool = True, retries: int = BULK_RETRIES) -> Dict[str, int]:
+        """
+        Sends write operations in chunks, one round trip per chunk.
+        With `ordered=False` the server applies a chunk in any order and continues past failed
+        operations; with `ordered=True` it stops at the first failure and the rest is not sent.
+        Sub-batches that failed with a connection error or a transient server error are sent again
+        up to `retries` times with exponential backoff; other failures are counted in `failed`.
+        A chunk lost to a connection error may have been applied in part, so it is sent again
+        only if all its operations are idempotent (see `is_idempotent`); a chunk with e.g. $inc
+        updates is counted as failed instead of risking applying them twice.
+        :param operations: pymongo write models, e.g. `DeleteMany(...)`; build updates with
+                           `update_operation` so the idempotent ones are marked `Resendable`.
+        :param chunk_size: maximum number of operations per round trip.
+        :param ordered: whether operations must be applied in order, stopping at the first error.
+        :param retries: how many times a failed sub-batch is sent again.
+        :return: dictionary with inserted/matched/modified/upserted/deleted/failed counts.
+        :raises TypeError: If `chunk_size` or `retries` is not an integer.
+        :raises ValueError: If `chunk_size` is less than 1 or `retries` is negative.
+        """
+        if not isinstance(chunk_size, int) or not isinstance(retries, int):
+            raise TypeError("Chunk size and retries must be integers")
+        if chunk_size < 1 or retries < 0:
+            raise ValueError("Chunk size must be positive and retries not negative")
+
+        totals = {"inserted": 0, "matched": 0, "modified": 0, "upserted": 0, "deleted": 0, "failed": 0}
+        operations = iter(operations)
+        while chunk := list(islice(operations, chunk_size)):
+            if not self._write_chunk(chunk, ordered, retries, totals) and ordered:
+                totals["failed"] += sum(1 for _ in operations)
+                break
+        if any(totals[counter] for counter in ("inserted", "modified", "upserted", "deleted")):
+            self._changed()
+        return totals
+
+    def _write_chunk(self, chunk: List[BulkOperation], ordered: bool, retries: int,
+                     totals: Dict[str, int]) -> bool:
+        """
+        Writes one chunk, retrying the operations that failed transiently.
+        :param chunk: operations of the chunk.
+        :param ordered: whether operations must be applied in order.
+        :param retries: how many times a failed sub-batch is sent again.
+        :param totals: counters updated in place.
+        :return: True if every operation of the chunk was applied.
+        """
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(0.1 * 2 ** (attempt - 1))
+            try:
+                result = self.collection.bulk_write([write_model(operation) for operation in chunk],
+                                                    ordered=ordered)
+                add_bulk_counts(totals, result.bulk_api_result)
+                return True
+            except BulkWriteError as e:
+                chunk, outcome = settle_bulk_error(chunk, e.details, ordered, totals)
+                if outcome is not None:
+                    return outcome
+            except ConnectionFailure as e:
+                print(f"Error: {e}")
+                if not all(is_idempotent(operation) for operation in chunk):
+                    break
+            except PyMongoError as e:
+                print(f"Error: {e}")
+                break
+        totals["failed"] += len(chunk)
+        return False
+
+    def upsert_many(self, documents: Iterable[Dict[str, Any]], key: str, chunk_size: int = BULK_CHUNK_SIZE,
+                    ordered: bool = False) -> Dict[str, int]:
+        """
+        Inserts or updates documents identified by `key` with batched bulk writes.
+        :param documents: documents to store; each must contain `key`.
+        :param key: field identifying a document, e.g. "name".
+        :param chunk_size: maximum number of documents per round trip.
+        :param ordered: whether documents must be written in order.
+        :return: counters as returned by `bulk_write`.
+        :raises TypeError: If `key` is not a string.
+        """
+        if not isinstance(key, str):
+            raise TypeError("Key must be a string")
+
+        return self.bulk_write((update_operation({key: document[key]}, {"$set": document}, upsert=True)
+                                for document in documents), chunk_size, ordered)
+
+    def ensure_indexes(self) -> List[str]:
+        """
+        Creates the indexes declared in `INDEXES`. Safe to call on every startup:
+        the server does nothing for indexes that already exist with the same specification.
+        :return: names of the declared indexes.
+        :raises pymongo.errors.PyMongoError: If there is an error in creating indexes.
+        """
+        if not self.INDEXES:
+            return []
+        try:
+            return self.collection.create_indexes(self.INDEXES)
+        except PyMongoError as e:
+            print(f"Error: {e}")
+            return []
+
+    def explain(self, query: Dict[str, Any], sort: Optional[List[Tuple[str, int]]] = None) -> Dict[str, Any]:
+        """
+        Returns the query plan the server chooses for a find.
+        :param query: The filter criteria for the search.
+        :param sort: list of (field, direction) pairs.
+        :return: explain document.
+        :raises TypeError: If `query` is not a dictionary.
+        """
+        if not isinstance(query, dict):
+            raise TypeError("Query must be a dictionary")
+        return self.collection.find(query, sort=sort).explain()
+
+    def collscan_queries(self, shapes: Iterable[QueryShape]) -> List[QueryShape]:
+        """
+        Explains query shapes, e.g. those the tests record from the methods in `QUERY_METHODS`,
+        and reports those answered by a collection scan.
+        Intended for tests and startup checks against a database with `ensure_indexes` applied.
+        :param shapes: (filter, sort) pairs to explain.
+        :return: list of offending query shapes, empty if every query uses an index.
+        """
+        return [(query, sort) for query, sort in shapes if collscan_stages(self.explain(query, sort))]
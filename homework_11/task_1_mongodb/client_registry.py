@@ -0,0 +1,168 @@
+"""
+Module: client_registry
+-----------------------
+This module keeps one MongoClient per connection URI for the whole process, so all
+repositories pointing at the same server share one pool of sockets. Pool sizes and the
+checkout timeout are configurable per URI, and every pool reports usage metrics.
+"""
+
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import pymongo
+from pymongo import monitoring
+
+DEFAULT_URI = "mongodb://localhost:27017/"
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener counting connection and checkout events of one client.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes all counters with zero.
+        """
+        self._lock = threading.Lock()
+        self._counters = {
+            "created": 0,
+            "closed": 0,
+            "checked_out": 0,
+            "checked_in": 0,
+            "checkout_failed": 0,
+            "cleared": 0,
+        }
+
+    def _increment(self, counter: str) -> None:
+        """
+        Increments a counter.
+        :param counter: counter name.
+        """
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the counters and the figures derived from them.
+        :return: dictionary with event counters, `open` connections and connections `in_use`.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        stats["open"] = stats["created"] - stats["closed"]
+        stats["in_use"] = stats["checked_out"] - stats["checked_in"]
+        return stats
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        """Pool listener callback, not counted."""
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        """Pool listener callback, not counted."""
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        """Counts pools cleared after a network error."""
+        self._increment("cleared")
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        """Pool listener callback, not counted."""
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        """Counts new sockets."""
+        self._increment("created")
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        """Pool listener callback, not counted."""
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        """Counts closed sockets."""
+        self._increment("closed")
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        """Pool listener callback, not counted."""
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        """Counts checkouts that timed out or failed."""
+        self._increment("checkout_failed")
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        """Counts sockets handed to an operation."""
+        self._increment("checked_out")
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        """Counts sockets returned to the pool."""
+        self._increment("checked_in")
+
+
+_options: Dict[str, Dict[str, Any]] = {}
+_clients: Dict[str, Tuple[pymongo.MongoClient, PoolMetrics]] = {}
+_lock = threading.Lock()
+
+
+def configure_client(uri: str = DEFAULT_URI, max_pool_size: int = 100, min_pool_size: int = 0,
+                     wait_queue_timeout: Optional[float] = None) -> None:
+    """
+    Sets the pool options of a URI. An already open client for the URI is closed, so the
+    next `get_client` call opens one with the new options. Repositories look their client up
+    on every call and move to the new one; operations running on the old client fail.
+    :param uri: MongoDB connection URI.
+    :param max_pool_size: maximum number of sockets per server.
+    :param min_pool_size: number of sockets kept open even when idle.
+    :param wait_queue_timeout: seconds an operation waits for a free socket, None to wait indefinitely.
+    :raises TypeError: If `uri` is not a string or the pool sizes are not integers.
+    :raises ValueError: If `max_pool_size` is less than 1 or smaller than `min_pool_size`.
+    """
+    if not isinstance(uri, str):
+        raise TypeError("URI must be a string")
+    if not isinstance(max_pool_size, int) or not isinstance(min_pool_size, int):
+        raise TypeError("Pool sizes must be integers")
+    if max_pool_size < 1 or not 0 <= min_pool_size <= max_pool_size:
+        raise ValueError("Pool sizes must satisfy 0 <= min_pool_size <= max_pool_size and max_pool_size >= 1")
+
+    options = {"maxPoolSize": max_pool_size, "minPoolSize": min_pool_size}
+    if wait_queue_timeout is not None:
+        options["waitQueueTimeoutMS"] = int(wait_queue_timeout * 1000)
+    with _lock:
+        _options[uri] = options
+        previous = _clients.pop(uri, None)
+    if previous is not None:
+        previous[0].close()
+
+
+def get_client(uri: str = DEFAULT_URI) -> pymongo.MongoClient:
+    """
+    Returns the process-wide client of a URI, creating it on first use.
+    :param uri: MongoDB connection URI.
+    :return: the shared MongoClient.
+    :raises TypeError: If `uri` is not a string.
+    """
+    if not isinstance(uri, str):
+        raise TypeError("URI must be a string")
+
+    with _lock:
+        if uri not in _clients:
+            metrics = PoolMetrics()
+            client = pymongo.MongoClient(uri, event_listeners=[metrics], **_options.get(uri, {}))
+            _clients[uri] = (client, metrics)
+        return _clients[uri][0]
+
+
+def pool_stats(uri: str = DEFAULT_URI) -> Dict[str, int]:
+    """
+    Returns the connection metrics of a URI's client.
+    :param uri: MongoDB connection URI.
+    :return: dictionary of counters, empty if no client was opened for the URI.
+    """
+    with _lock:
+        entry = _clients.get(uri)
+    return entry[1].stats() if entry else {}
+
+
+def close_all() -> None:
+    """
+    Closes every client; later `get_client` calls, and so existing repositories, open new ones.
+    """
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client, _ in clients:
+        client.close()
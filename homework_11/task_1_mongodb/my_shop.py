@@ -92,6 +92,8 @@ orders_list = [
 ]
 
 if __name__ == "__main__":
+    products.ensure_indexes()
+    orders.ensure_indexes()
     # products.insert_many(products_list)
     # orders.insert_many(orders_list)
     #
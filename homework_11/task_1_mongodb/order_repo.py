@@ -6,10 +6,148 @@ This module contains the OrderRepository class, which interacts with the MongoDB
 """
 
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from collections import defaultdict
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
-from pymongo.errors import PyMongoError
-from base_repo import BaseRepository
+import pymongo
+from bson import ObjectId
+from pymongo import IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from base_repo import FIND_BATCH_SIZE, BaseRepository, BoundCollection
+from client_registry import DEFAULT_URI
+from product_repo import VERSIONS_COLLECTION, bump_catalogue_version
+
+
+DAILY_SALES_COLLECTION = "daily_product_sales"
+CLIENT_TOTALS_COLLECTION = "client_totals"
+DAILY_SALES_INDEXES = [IndexModel([("day", pymongo.ASCENDING), ("product", pymongo.ASCENDING)], name="day_1_product_1")]
+PRODUCTS_COLLECTION = "products"
+# Error code of the failed conversion `reserve_stock` provokes when stock is short.
+OUT_OF_STOCK_CODE = 241
+
+
+class InsufficientStockError(ValueError):
+    """
+    Raised when an order asks for more units of a product than are in stock.
+    """
+
+    def __init__(self, product_name: str) -> None:
+        """
+        :param product_name: The name of the product that ran short.
+        """
+        super().__init__(f"Insufficient stock of {product_name}")
+        self.product_name = product_name
+
+
+def check_order(order: Any) -> None:
+    """
+    Checks that an order carries what the rollups are keyed by: its date, client and priced lines.
+    Anything that is not a dictionary is left to the type checks of the insert methods.
+    :param order: order about to be inserted.
+    :raises ValueError: If `date` is not a datetime, `client` is not a string or a product line
+                        lacks its name, quantity or price.
+    """
+    if not isinstance(order, dict):
+        return
+    if not isinstance(order.get("date"), datetime) or not isinstance(order.get("client"), str):
+        raise ValueError("Order must have a datetime date and a string client")
+    if not all(isinstance(line, dict) and {"name", "quantity", "price"} <= line.keys()
+               for line in order.get("products", [])):
+        raise ValueError("Order products must have a name, quantity and price")
+
+
+def rollup_updates(orders: List[Dict[str, Any]]) -> Tuple[List[UpdateOne], List[UpdateOne]]:
+    """
+    Builds the increments that add orders to the daily product sales and the client totals.
+    :param orders: inserted orders, checked with `check_order`.
+    :return: tuple (updates of the daily sales collection, updates of the client totals collection).
+    """
+    daily: Dict[tuple, Dict[str, float]] = defaultdict(lambda: {"quantity": 0, "revenue": 0})
+    clients: Dict[str, Dict[str, float]] = defaultdict(lambda: {"total": 0, "orders": 0})
+    for order in orders:
+        day = order["date"].replace(hour=0, minute=0, second=0, microsecond=0)
+        for product in order.get("products", []):
+            totals = daily[(day, product["name"])]
+            totals["quantity"] += product["quantity"]
+            totals["revenue"] += product["quantity"] * product["price"]
+        clients[order["client"]]["total"] += order.get("total", 0)
+        clients[order["client"]]["orders"] += 1
+
+    return ([UpdateOne({"_id": {"day": day, "product": name}},
+                       {"$inc": totals, "$setOnInsert": {"day": day, "product": name}}, upsert=True)
+             for (day, name), totals in daily.items()],
+            [UpdateOne({"_id": client}, {"$inc": totals}, upsert=True) for client, totals in clients.items()])
+
+
+def reserve_stock(product_name: str, quantity: int) -> UpdateOne:
+    """
+    Builds the atomic stock decrement of one order line.
+    The update pipeline subtracts `quantity` only if that many units are in stock; otherwise it
+    converts an error message to a number, which fails the write, so an ordered bulk write stops
+    at exactly this line. The upsert makes an unknown product fail the same way (its stock is
+    missing) instead of matching nothing; the failed write inserts no document.
+    :param product_name: The name of the product.
+    :param quantity: units to take.
+    :return: update operation for `bulk_write` on the products collection.
+    """
+    return UpdateOne({"name": product_name}, [{"$set": {"stock": {"$cond": [
+        {"$gte": ["$stock", quantity]},
+        {"$subtract": ["$stock", quantity]},
+        {"$toInt": {"$concat": ["Insufficient stock of ", "$name"]}},
+    ]}}}], upsert=True)
+
+
+def order_lines_pipeline(items: Dict[str, int]) -> List[Dict[str, Any]]:
+    """
+    Builds the aggregation over products that prices the lines of an order and sums the total.
+    :param items: dictionary product name -> quantity.
+    :return: aggregation pipeline returning one document with `products` and `total`.
+    """
+    names, quantities = list(items), list(items.values())
+    return [
+        {"$match": {"name": {"$in": names}}},
+        {"$project": {
+            "_id": 0, "name": 1, "price": 1,
+            "quantity": {"$arrayElemAt": [{"$literal": quantities},
+                                          {"$indexOfArray": [{"$literal": names}, "$name"]}]},
+        }},
+        {"$group": {
+            "_id": None,
+            "products": {"$push": {"name": "$name", "quantity": "$quantity", "price": "$price"}},
+            "total": {"$sum": {"$multiply": ["$price", "$quantity"]}},
+        }},
+    ]
+
+
+def sales_info_pipeline(start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
+    """
+    Builds the aggregation of total sales per product within a date range.
+    :param start_date: The start of the date range.
+    :param end_date: The end of the date range.
+    :return: aggregation pipeline.
+    """
+    return [
+        {"$match": {"date": {"$gte": start_date, "$lte": end_date}}},
+        {"$unwind": "$products"},
+        {"$group": {"_id": "$products.name", "total_sold": {"$sum": "$products.quantity"}}}
+    ]
+
+
+def client_total_pipeline(client_name: str) -> List[Dict[str, Any]]:
+    """
+    Builds the aggregation of the total amount spent by a client.
+    :param client_name: The name of the client.
+    :return: aggregation pipeline.
+    """
+    return [
+        {"$match": {"client": client_name}},
+        {
+            "$group": {
+                "_id": None,
+                "total_amount": {"$sum": "$total"}
+            }
+        }
+    ]
 
 
 class OrderRepository(BaseRepository):
@@ -18,13 +156,203 @@ class OrderRepository(BaseRepository):
 
     Provides methods for retrieving recent orders, fetching sales information,
     and calculating total order amounts for clients.
+    Inserted orders are also added to two rollup collections, daily per-product sales and
+    per-client totals, so the `*_from_rollups` queries read a few small documents instead of
+    aggregating every order; `rebuild_rollups` recomputes both from the orders.
+    The aggregations start with a $match stage, so their index use is checked
+    through the equivalent find.
     """
 
-    def __init__(self) -> None:
+    INDEXES = [
+        IndexModel([("date", pymongo.DESCENDING)], name="date_-1"),
+        IndexModel([("client", pymongo.ASCENDING)], name="client_1"),
+    ]
+    QUERY_METHODS = [
+        ("iter_recent_orders", ()),
+        ("get_sales_info", (datetime(2024, 1, 1), datetime(2024, 1, 10))),
+        ("get_total_order_amount_by_client", ("Homer Simpson",)),
+    ]
+
+    daily_sales = BoundCollection(DAILY_SALES_COLLECTION)
+    client_totals = BoundCollection(CLIENT_TOTALS_COLLECTION)
+    products = BoundCollection(PRODUCTS_COLLECTION)
+    catalogue_versions = BoundCollection(VERSIONS_COLLECTION)
+
+    def __init__(self, uri: str = DEFAULT_URI) -> None:
         """
         Initializes the OrderRepository with the 'orders' collection.
+        :param uri: MongoDB connection URI.
+        """
+        super().__init__("my_shop", "orders", uri)
+
+    def insert_one(self, data: Dict[str, Any]) -> Optional[pymongo.results.InsertOneResult]:
+        """
+        Inserts an order and adds it to the rollups.
+        :param data: The order to insert.
+        :return: The result of the insertion.
+        :raises TypeError: If `data` is not a dictionary.
+        :raises ValueError: If the order cannot be added to the rollups, see `check_order`.
+        """
+        check_order(data)
+        result = super().insert_one(data)
+        if result is not None:
+            self._update_rollups([data])
+        return result
+
+    def insert_many(self, data: List[Dict[str, Any]]) -> Optional[pymongo.results.InsertManyResult]:
+        """
+        Inserts orders and adds them to the rollups.
+        :param data: list of orders to insert.
+        :return: result of the insertion.
+        :raises TypeError: If `data` is not a list.
+        :raises ValueError: If any order cannot be added to the rollups, see `check_order`;
+                            nothing is inserted then.
+        """
+        if isinstance(data, list):
+            for order in data:
+                check_order(order)
+        result = super().insert_many(data)
+        if result is not None:
+            self._update_rollups(data)
+        return result
+
+    def place_order(self, client_name: str, items: Dict[str, int],
+                    order_number: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Takes the ordered units out of stock and records the order.
+        All stock decrements go to the server in one ordered bulk write, each conditional on
+        enough stock, so concurrent orders can never oversell. If a line fails, the lines before
+        it are put back and the order is rejected. Prices and the total are computed on the
+        server from the products collection, not taken from the caller.
+        An order costs several round trips: the stock bulk write, the catalogue version bump,
+        the pricing aggregation, the order insert and one bulk write per rollup. Only the stock
+        decrement is atomic; see `_restock` for what a failure in between leaves behind.
+        :param client_name: The name of the client.
+        :param items: dictionary product name -> quantity.
+        :param order_number: order number, defaults to the id of the new order.
+        :return: The inserted order, or None if a database error occurred.
+        :raises TypeError: If `client_name` is not a string or `items` is not a dictionary
+                           of product names to integers.
+        :raises ValueError: If `items` is empty or a quantity is not positive.
+        :raises InsufficientStockError: If a product is unknown or has too few units in stock.
+        """
+        if not isinstance(client_name, str):
+            raise TypeError("Client name must be a string")
+        if not isinstance(items, dict) or not all(isinstance(name, str) and isinstance(quantity, int)
+                                                  for name, quantity in items.items()):
+            raise TypeError("Items must be a dictionary of product names to quantities")
+        if not items or any(quantity < 1 for quantity in items.values()):
+            raise ValueError("An order needs at least one item and positive quantities")
+
+        lines = list(items.items())
+        try:
+            self.products.bulk_write([reserve_stock(name, quantity) for name, quantity in lines], ordered=True)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors")
+            if errors:
+                self._restock(lines[:errors[0]["index"]])
+                if errors[0]["code"] == OUT_OF_STOCK_CODE:
+                    raise InsufficientStockError(lines[errors[0]["index"]][0]) from e
+                print(f"Error: {e}")
+                return None
+            # Only the write concern failed: every decrement was applied.
+            print(f"Error: {e}")
+        except PyMongoError as e:
+            print(f"Error: {e}")
+            return None
+        bump_catalogue_version(self.catalogue_versions, self.products.name)
+
+        order_id = ObjectId()
+        try:
+            priced = next(iter(self.products.aggregate(order_lines_pipeline(items))))
+        except (PyMongoError, StopIteration) as e:
+            print(f"Error: {e}")
+            self._restock(lines)
+            return None
+        order = {
+            "_id": order_id,
+            "order_number": order_number or str(order_id),
+            "client": client_name,
+            "products": priced["products"],
+            "total": priced["total"],
+            "date": datetime.now(),
+        }
+        if self.insert_one(order) is None:
+            self._restock(lines)
+            return None
+        return order
+
+    def _restock(self, lines: List[tuple]) -> None:
         """
-        super().__init__("my_shop", "orders")
+        Puts units taken by a rejected order back into stock.
+        This compensation is a separate write, not part of a transaction with the decrement:
+        if the process dies or the connection is lost after the decrement and before the order
+        is inserted or this write lands, the units stay out of stock without an order. Such
+        leaks are not repaired automatically; compare the stock against the orders to find them.
+        :param lines: list of (product name, quantity) pairs that were decremented.
+        """
+        if not lines:
+            return
+        try:
+            self.products.bulk_write([UpdateOne({"name": name}, {"$inc": {"stock": quantity}})
+                                      for name, quantity in lines], ordered=False)
+        except PyMongoError as e:
+            print(f"Error: {e}")
+        bump_catalogue_version(self.catalogue_versions, self.products.name)
+
+    def _update_rollups(self, orders: List[Dict[str, Any]]) -> None:
+        """
+        Adds orders to the daily product sales and the client totals, one bulk write per collection.
+        The increments are not atomic with the order insert; `rebuild_rollups` repairs any drift.
+        :param orders: inserted orders.
+        """
+        daily, clients = rollup_updates(orders)
+        try:
+            if daily:
+                self.daily_sales.bulk_write(daily, ordered=False)
+            if clients:
+                self.client_totals.bulk_write(clients, ordered=False)
+        except PyMongoError as e:
+            print(f"Error: {e}")
+
+    def rebuild_rollups(self) -> None:
+        """
+        Recomputes both rollup collections from all orders on the server (MongoDB 5.0+ for $dateTrunc).
+        Each aggregation writes with $out, which fills a temporary collection and renames it over
+        the rollup only once it is complete, keeping the rollup's indexes: readers see the old
+        or the new rollup, never an empty or partial one, and a failed run leaves the old one.
+        Run it while no orders are being inserted, their increments would be replaced.
+        :raises pymongo.errors.PyMongoError: Error in connecting to MongoDB or processing data.
+        """
+        try:
+            self.collection.aggregate([
+                {"$unwind": "$products"},
+                {"$group": {
+                    "_id": {"day": {"$dateTrunc": {"date": "$date", "unit": "day"}}, "product": "$products.name"},
+                    "quantity": {"$sum": "$products.quantity"},
+                    "revenue": {"$sum": {"$multiply": ["$products.quantity", "$products.price"]}},
+                }},
+                {"$set": {"day": "$_id.day", "product": "$_id.product"}},
+                {"$out": DAILY_SALES_COLLECTION},
+            ])
+            self.collection.aggregate([
+                {"$group": {"_id": "$client", "total": {"$sum": "$total"}, "orders": {"$sum": 1}}},
+                {"$out": CLIENT_TOTALS_COLLECTION},
+            ])
+        except PyMongoError as e:
+            print(f"Error: {e}")
+
+    def ensure_indexes(self) -> List[str]:
+        """
+        Creates the order indexes and the index serving date ranges on the daily rollup.
+        :return: names of the created indexes.
+        """
+        names = super().ensure_indexes()
+        try:
+            names.extend(self.daily_sales.create_indexes(DAILY_SALES_INDEXES))
+        except PyMongoError as e:
+            print(f"Error: {e}")
+        return names
 
     def get_recent_orders(self, days: int = 30) -> List[Dict[str, Any]]:
         """
@@ -33,9 +361,20 @@ class OrderRepository(BaseRepository):
         :return: A list of recent orders within the given timeframe. Default is 30 days.
         :raises TypeError: If `days` is not an integer.
         """
+        return list(self.iter_recent_orders(days))
+
+    def iter_recent_orders(self, days: int = 30, batch_size: int = FIND_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yields orders placed within the past `days`, newest first.
+        :param days: number of days to get recent orders for. Default is 30 days.
+        :param batch_size: number of orders fetched per round trip.
+        :return: iterator of orders.
+        :raises TypeError: If `days` is not an integer.
+        """
         if not isinstance(days, int):
             raise TypeError("Days must be an integer")
-        return self.find_all({"date": {"$gt": datetime.today() - timedelta(days=days)}})
+        return self.iter_find({"date": {"$gt": datetime.today() - timedelta(days=days)}},
+                              sort=[("date", pymongo.DESCENDING)], batch_size=batch_size)
 
     def get_sales_info(self, start_date: datetime.date = datetime.today() - timedelta(days=10),
                        end_date: datetime.date = datetime.today()) -> List[Dict[str, Any]]:
@@ -51,11 +390,7 @@ class OrderRepository(BaseRepository):
             raise TypeError("Start date and end date must be of type datetime.date")
 
         try:
-            return list(self.collection.aggregate([
-                {"$match": {"date": {"$gte": start_date, "$lte": end_date}}},
-                {"$unwind": "$products"},
-                {"$group": {"_id": "$products.name", "total_sold": {"$sum": "$products.quantity"}}}
-            ]))
+            return list(self.collection.aggregate(sales_info_pipeline(start_date, end_date)))
         except PyMongoError as e:
             print(f"Error: {e}")
             return []
@@ -72,16 +407,49 @@ class OrderRepository(BaseRepository):
             raise TypeError("Client name must be a string")
 
         try:
-            result = list(self.collection.aggregate([
-                {"$match": {"client": client_name}},
-                {
-                    "$group": {
-                        "_id": None,
-                        "total_amount": {"$sum": "$total"}
-                    }
-                }
-            ]))
+            result = list(self.collection.aggregate(client_total_pipeline(client_name)))
             return result[0]["total_amount"] if result else 0.0
         except PyMongoError as e:
             print(f"Error: {e}")
             return 0.0
+
+    def get_sales_from_rollups(self, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
+        """
+        Retrieves total sales per product from the daily rollup.
+        Days are the unit: the days of `start_date` and `end_date` are included completely.
+        :param start_date: The start of the date range.
+        :param end_date: The end of the date range.
+        :return: A list of {"_id": product name, "total_sold": quantity, "revenue": amount}.
+        :raises TypeError: If `start_date` or `end_date` is not a datetime.
+        :raises pymongo.errors.PyMongoError: Error in connecting to MongoDB or processing data.
+        """
+        if not isinstance(start_date, datetime) or not isinstance(end_date, datetime):
+            raise TypeError("Start date and end date must be of type datetime.date")
+
+        first_day = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        try:
+            return list(self.daily_sales.aggregate([
+                {"$match": {"day": {"$gte": first_day, "$lte": end_date}}},
+                {"$group": {"_id": "$product", "total_sold": {"$sum": "$quantity"}, "revenue": {"$sum": "$revenue"}}}
+            ]))
+        except PyMongoError as e:
+            print(f"Error: {e}")
+            return []
+
+    def get_client_total_from_rollups(self, client_name: str) -> float:
+        """
+        Returns the total amount spent by a client from the client rollup.
+        :param client_name: The name of the client.
+        :return: The total amount spent by the client.
+        :raises TypeError: If `client_name` is not a string.
+        :raises pymongo.errors.PyMongoError: Error in connecting to MongoDB or processing data.
+        """
+        if not isinstance(client_name, str):
+            raise TypeError("Client name must be a string")
+
+        try:
+            totals = self.client_totals.find_one({"_id": client_name})
+            return totals["total"] if totals else 0.0
+        except PyMongoError as e:
+            print(f"Error: {e}")
+            return 0.0
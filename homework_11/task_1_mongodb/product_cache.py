@@ -0,0 +1,270 @@
+"""
+Module: product_cache
+---------------------
+This module defines ProductCache, an in-process read-through cache for product lookups by
+name and by category. Entries expire after a TTL and the least recently used ones are evicted.
+A background thread empties the cache whenever the catalogue changes: it follows the
+collection's change stream, or, where change streams are unavailable (standalone servers),
+polls the catalogue version that ProductRepository bumps on every write.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+
+from product_repo import ProductRepository
+
+_MISSING = object()
+
+
+# Same LRUCache as homework_10.cache: this directory's modules run as scripts and cannot import
+# the homework_10 package, so it is copied; tests/hw_11 checks the copies stay identical.
+class LRUCache:
+    """
+    Thread-safe mapping that keeps at most `maxsize` entries, evicting the least recently used
+    one, and optionally expires entries `ttl` seconds after they were stored.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Initializes an empty cache.
+        :param maxsize: maximum number of entries.
+        :param ttl: seconds an entry stays valid, None to keep it until evicted.
+        :param clock: time source, replaceable in tests.
+        :raises ValueError: If `maxsize` is less than 1 or `ttl` is not positive.
+        """
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise ValueError("Cache size must be a positive integer")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("TTL must be positive")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns a cached value and marks it as recently used.
+        :param key: cache key.
+        :param default: value returned on a miss.
+        :return: the cached value, or `default`.
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and self.ttl is not None and self._clock() >= entry[1]:
+                del self._entries[key]
+                self._counters["expirations"] += 1
+                entry = _MISSING
+            if entry is _MISSING:
+                self._counters["misses"] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Stores a value, evicting the least recently used entry when the cache is full.
+        :param key: cache key.
+        :param value: value to store.
+        """
+        expires = self._clock() + self.ttl if self.ttl is not None else 0.0
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def discard(self, key: Hashable) -> None:
+        """
+        Removes an entry if present.
+        :param key: cache key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Removes every entry; counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns cache counters.
+        :return: dictionary with hits, misses, evictions, expirations and the current size.
+        """
+        with self._lock:
+            return {**self._counters, "size": len(self._entries)}
+
+    def __len__(self) -> int:
+        """
+        Returns the number of stored entries.
+        """
+        with self._lock:
+            return len(self._entries)
+
+
+class ProductCache:
+    """
+    Read-through cache in front of ProductRepository lookups.
+    Call `start()` to begin invalidating on catalogue changes and `stop()` when done;
+    without the watcher, entries still expire after the TTL.
+    """
+
+    def __init__(self, repository: ProductRepository, maxsize: int = 1024, ttl: float = 60.0,
+                 poll_interval: float = 5.0) -> None:
+        """
+        Initializes the cache.
+        :param repository: repository used to load products on a miss.
+        :param maxsize: maximum number of cached lookups.
+        :param ttl: seconds a lookup stays cached; bounds staleness if invalidation lags.
+        :param poll_interval: seconds between catalogue version checks in polling mode.
+        """
+        self.repository = repository
+        self.entries = LRUCache(maxsize, ttl)
+        self.poll_interval = poll_interval
+        self.mode: Optional[str] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get_by_name(self, product_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns a product by name, from the cache if possible.
+        Misses query the collection directly rather than through `find_by_name`, which prints
+        database errors and returns None: a failed lookup must not be cached as a missing product.
+        :param product_name: The name of the product.
+        :return: The product, or None if there is no such product.
+        :raises TypeError: If `product_name` is not a string.
+        :raises pymongo.errors.PyMongoError: If the product could not be loaded; nothing is cached.
+        """
+        if not isinstance(product_name, str):
+            raise TypeError("Product name must be a string")
+        product = self._read_through(("name", product_name),
+                                     lambda: self.repository.collection.find_one({"name": product_name}))
+        return dict(product) if product is not None else None
+
+    def get_by_category(self, category: str) -> List[Dict[str, Any]]:
+        """
+        Returns the products of a category, from the cache if possible.
+        Like `get_by_name`, misses query the collection directly so a failed or truncated
+        load is raised instead of cached.
+        :param category: The category name.
+        :return: list of products, copies of the cached ones.
+        :raises TypeError: If `category` is not a string.
+        :raises pymongo.errors.PyMongoError: If the products could not be loaded; nothing is cached.
+        """
+        if not isinstance(category, str):
+            raise TypeError("Category must be a string")
+        products = self._read_through(("category", category),
+                                      lambda: tuple(self.repository.collection.find({"category": category})))
+        return [dict(product) for product in products]
+
+    def _read_through(self, key: tuple, load: Callable[[], Any]) -> Any:
+        """
+        Returns a cached value or loads and caches it.
+        A value loaded while an invalidation happened is returned but not cached,
+        since it may predate the change.
+        :param key: cache key.
+        :param load: loads the value from the repository; must raise when loading fails.
+        :return: the value.
+        :raises pymongo.errors.PyMongoError: If `load` failed; nothing is cached.
+        """
+        value = self.entries.get(key, _MISSING)
+        if value is not _MISSING:
+            with self._lock:
+                self._counters["hits"] += 1
+            return value
+
+        with self._lock:
+            self._counters["misses"] += 1
+            generation = self._generation
+        value = load()
+        with self._lock:
+            if generation == self._generation:
+                self.entries.put(key, value)
+        return value
+
+    def invalidate(self) -> None:
+        """
+        Drops every cached lookup; a change to any product may affect any category list.
+        """
+        with self._lock:
+            self._generation += 1
+            self._counters["invalidations"] += 1
+            self.entries.clear()
+
+    def start(self) -> str:
+        """
+        Starts the background invalidation.
+        :return: "change_stream" if the server supports change streams, "polling" otherwise.
+        """
+        try:
+            stream = self.repository.collection.watch(max_await_time_ms=500)
+            self.mode, target, args = "change_stream", self._follow_stream, (stream,)
+        except PyMongoError:
+            self.mode, target, args = "polling", self._poll_version, ()
+        self._stopped.clear()
+        self._watcher = threading.Thread(target=target, args=args, name="product-cache-watcher", daemon=True)
+        self._watcher.start()
+        return self.mode
+
+    def _follow_stream(self, stream: Any) -> None:
+        """
+        Watcher loop: invalidates on every change event; switches to polling if the stream breaks.
+        :param stream: open change stream of the products collection.
+        """
+        try:
+            with stream:
+                while not self._stopped.is_set():
+                    if stream.try_next() is not None:
+                        self.invalidate()
+        except PyMongoError as e:
+            print(f"Error: {e}")
+            self.invalidate()
+            self.mode = "polling"
+            self._poll_version()
+
+    def _poll_version(self) -> None:
+        """
+        Watcher loop: invalidates when the catalogue version changes.
+        """
+        version = None
+        while not self._stopped.is_set():
+            try:
+                current = self.repository.catalogue_version()
+                if version is not None and current != version:
+                    self.invalidate()
+                version = current
+            except PyMongoError as e:
+                print(f"Error: {e}")
+            self._stopped.wait(self.poll_interval)
+
+    def stop(self) -> None:
+        """
+        Stops the background invalidation and waits for the watcher thread.
+        """
+        self._stopped.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns cache counters.
+        :return: dictionary with hits, misses, invalidations and the current size.
+        """
+        with self._lock:
+            return {**self._counters, "size": len(self.entries)}
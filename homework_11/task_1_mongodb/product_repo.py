@@ -5,24 +5,108 @@ This module defines the ProductRepository class, responsible for managing
 product-related operations in the MongoDB 'products' collection.
 """
 
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import pymongo
+from pymongo import IndexModel
 from pymongo.errors import PyMongoError
 
-from base_repo import BaseRepository
+from base_repo import BULK_CHUNK_SIZE, BaseRepository, BoundCollection, update_operation
+from client_registry import DEFAULT_URI
+
+
+VERSIONS_COLLECTION = "catalogue_versions"
+
+
+def catalogue_version_bump(products_name: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Builds the filter and update that bump the catalogue version of a products collection;
+    the update must be sent with `upsert=True`.
+    :param products_name: name of the products collection whose version changes.
+    :return: tuple (filter, update) on the 'catalogue_versions' collection.
+    """
+    return {"_id": products_name}, {"$inc": {"version": 1}}
+
+
+def bump_catalogue_version(versions: pymongo.collection.Collection, products_name: str) -> None:
+    """
+    Bumps the catalogue version of a products collection; every synchronous writer of products
+    calls it, `AsyncProductRepository` sends the same `catalogue_version_bump`.
+    :param versions: the 'catalogue_versions' collection.
+    :param products_name: name of the products collection whose version changes.
+    """
+    try:
+        versions.update_one(*catalogue_version_bump(products_name), upsert=True)
+    except PyMongoError as e:
+        print(f"Error: {e}")
 
 
 class ProductRepository(BaseRepository):
     """
     Repository class for handling product-related database operations in the 'products' collection.
+    Every write bumps a version counter in the 'catalogue_versions' collection, which caches
+    poll when change streams are not available (see `product_cache`). Code writing products
+    elsewhere bumps it too: `OrderRepository.place_order` with `bump_catalogue_version`,
+    `AsyncProductRepository` after each of its writes.
     """
 
-    def __init__(self) -> None:
+    INDEXES = [
+        IndexModel([("name", pymongo.ASCENDING)], name="name_1"),
+        IndexModel([("stock", pymongo.ASCENDING)], name="stock_1"),
+        IndexModel([("category", pymongo.ASCENDING)], name="category_1"),
+    ]
+    QUERY_METHODS = [
+        ("find_by_name", ("Whiskas",)),
+        ("find_by_category", ("Cat Food",)),
+        ("update_stock", ("Whiskas", 1)),
+        ("delete_out_of_stock", ()),
+    ]
+
+    versions = BoundCollection(VERSIONS_COLLECTION)
+
+    def __init__(self, uri: str = DEFAULT_URI) -> None:
         """
         Initializes the ProductRepository, setting up the connection to the 'products' collection.
+        :param uri: MongoDB connection URI.
+        """
+        super().__init__("my_shop", "products", uri)
+
+    def _changed(self) -> None:
+        """
+        Bumps the catalogue version after a write.
         """
-        super().__init__("my_shop", "products")
+        bump_catalogue_version(self.versions, self.collection.name)
+
+    def catalogue_version(self) -> int:
+        """
+        Returns the current catalogue version.
+        :return: number of writes made to the products, 0 if none.
+        :raises pymongo.errors.PyMongoError: Error in connecting to MongoDB or processing data.
+        """
+        document = self.versions.find_one({"_id": self.collection.name})
+        return document["version"] if document else 0
+
+    def find_by_name(self, product_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieves a product by its name.
+        :param product_name: The name of the product.
+        :return: The product, or None if there is no such product.
+        :raises TypeError: If `product_name` is not a string.
+        """
+        if not isinstance(product_name, str):
+            raise TypeError("Product name must be a string")
+        return self.find_one({"name": product_name})
+
+    def find_by_category(self, category: str) -> List[Dict[str, Any]]:
+        """
+        Retrieves all products of a category.
+        :param category: The category name.
+        :return: list of products.
+        :raises TypeError: If `category` is not a string.
+        """
+        if not isinstance(category, str):
+            raise TypeError("Category must be a string")
+        return self.find_all({"category": category})
 
     def update_stock(self, product_name: str, quantity: int) -> Optional[pymongo.results.UpdateResult]:
         """
@@ -37,6 +121,24 @@ class ProductRepository(BaseRepository):
 
         return self.update_one({"name": product_name}, {"stock": quantity})
 
+    def update_stock_many(self, quantities: Dict[str, int], chunk_size: int = BULK_CHUNK_SIZE) -> Dict[str, int]:
+        """
+        Updates the stock quantity of many products with one round trip per chunk.
+        Products are independent, so the chunks are applied unordered.
+        :param quantities: dictionary product name -> new stock quantity (must be >= 0).
+        :param chunk_size: maximum number of products per round trip.
+        :return: counters as returned by `bulk_write`.
+        :raises TypeError: If `quantities` is not a dictionary.
+        :raises ValueError: If any quantity is less than 0.
+        """
+        if not isinstance(quantities, dict):
+            raise TypeError("Quantities must be a dictionary")
+        if any(quantity < 0 for quantity in quantities.values()):
+            raise ValueError("Quantity must be greater than  or equal to 0")
+
+        return self.bulk_write((update_operation({"name": name}, {"$set": {"stock": quantity}})
+                                for name, quantity in quantities.items()), chunk_size, ordered=False)
+
     def delete_out_of_stock(self) -> Optional[pymongo.results.DeleteResult]:
         """
         Deletes all products that have a stock quantity of zero.
@@ -0,0 +1,112 @@
+"""
+Session Storage Benchmark
+Compares the JSON and hash storage modes of SessionManager on a live Redis server. For each mode it
+creates sessions, touches them, reads them whole and reads a single field, one call per operation,
+and reports operations per second and the bytes the server received and sent per operation, taken
+from the `total_net_input_bytes`/`total_net_output_bytes` counters of INFO (the two INFO calls of a
+measurement are included, which is negligible for a few thousand operations).
+
+Usage: python -m homework_11.task_1_redis.benchmark --sessions 10000 --touches 5
+"""
+
+import argparse
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from redis import Redis
+
+from homework_11.task_1_redis.session_model import STORAGE_MODES, SessionManager
+
+
+def wire_bytes(client: Redis) -> Tuple[int, int]:
+    """
+    Reads the server's network counters.
+    :param client: Redis client.
+    :return: tuple (bytes received by the server, bytes sent by the server).
+    """
+    stats = client.info("stats")
+    return stats["total_net_input_bytes"], stats["total_net_output_bytes"]
+
+
+def measure(client: Redis, operations: List[Callable[[], Any]]) -> Dict[str, float]:
+    """
+    Runs operations one after another and measures throughput and traffic.
+    :param client: Redis client of the server under test.
+    :param operations: callables issuing one operation each.
+    :return: dictionary with `ops`, `ops_per_second`, `bytes_in_per_op` and `bytes_out_per_op`.
+    """
+    received, sent = wire_bytes(client)
+    started = time.perf_counter()
+    for operation in operations:
+        operation()
+    seconds = time.perf_counter() - started
+    received_after, sent_after = wire_bytes(client)
+    count = len(operations) or 1
+    return {
+        "ops": len(operations),
+        "ops_per_second": len(operations) / seconds if seconds else 0.0,
+        "bytes_in_per_op": (received_after - received) / count,
+        "bytes_out_per_op": (sent_after - sent) / count,
+    }
+
+
+def run_mode(storage: str, sessions: int, touches: int, host: str = "localhost",
+             port: int = 6379) -> Dict[str, Dict[str, float]]:
+    """
+    Benchmarks one storage mode; the sessions it creates are deleted afterwards.
+    :param storage: storage mode of SessionManager.
+    :param sessions: number of sessions to create.
+    :param touches: number of updates per session.
+    :param host: Redis server hostname.
+    :param port: Redis server port.
+    :return: dictionary case -> measurement.
+    """
+    manager = SessionManager(host, port, storage=storage)
+    tokens: List[str] = []
+    try:
+        results = {"create": measure(manager.redis, [lambda i=i: tokens.append(manager.create_session(f"user{i}"))
+                                                     for i in range(sessions)])}
+        results["touch"] = measure(manager.redis, [lambda token=token: manager.update_session(token)
+                                                   for token in tokens * touches])
+        results["read"] = measure(manager.redis, [lambda token=token: manager.get_session(token)
+                                                  for token in tokens])
+        results["read_field"] = measure(manager.redis, [
+            lambda token=token: manager.get_session(token, ["last_activity"]) for token in tokens])
+        return results
+    finally:
+        manager.delete_sessions(tokens)
+        manager.redis.close()
+
+
+def print_report(results: Dict[str, Dict[str, Dict[str, float]]]) -> None:
+    """
+    Prints a table of the measurements of every mode.
+    :param results: dictionary mode -> case -> measurement.
+    """
+    print(f"{'mode':<6} {'case':<11} {'ops/s':>10} {'in B/op':>9} {'out B/op':>9}")
+    for storage, cases in results.items():
+        for case, result in cases.items():
+            print(f"{storage:<6} {case:<11} {result['ops_per_second']:>10.0f} "
+                  f"{result['bytes_in_per_op']:>9.1f} {result['bytes_out_per_op']:>9.1f}")
+
+
+def main() -> int:
+    """
+    Command line entry point.
+    :return: exit status.
+    """
+    parser = argparse.ArgumentParser(description="Compare SessionManager storage modes.")
+    parser.add_argument("--sessions", type=int, default=10000, help="sessions per mode")
+    parser.add_argument("--touches", type=int, default=5, help="updates per session")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+
+    print_report({storage: run_mode(storage, args.sessions, args.touches, args.host, args.port)
+                  for storage in STORAGE_MODES})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,33 +2,142 @@
 Module: session_manager
 -----------------------
 This module provides a `SessionManager` class to handle user session management using Redis.
+Single-session updates run as a Lua script, one atomic round trip; the batch methods send
+all their commands for many sessions in one pipelined round trip.
+Sessions are stored either as JSON strings or, in "hash" storage, as Redis hashes, so an update
+writes only the changed field and reads can fetch single fields. Hash storage still reads
+JSON sessions written before the switch, and converts them on the next update or through
+`migrate_sessions`.
 """
 
 import json
 import time
 import uuid
 from datetime import datetime
-from typing import Dict, Union
+from typing import Dict, Iterator, List, Optional, Union
 
-from redis import Redis, RedisError
+from redis import Redis, RedisError, ResponseError, WatchError
+
+BATCH_SIZE = 500
+# Attempts of `update_session_transaction` before it gives up on a session other clients keep changing.
+TRANSACTION_RETRIES = 10
+STORAGE_MODES = ("json", "hash")
+# Keys shaped like the uuid4 session tokens, for finding sessions to migrate.
+TOKEN_PATTERN = "????????-????-????-????-????????????"
+
+# KEYS[1]: session token; ARGV[1]: last activity timestamp, ARGV[2]: expiry in seconds.
+# Returns 1 if the session was touched, 0 if it does not exist. A session a hash storage
+# instance already converted (while both modes run during a migration) is touched as a hash.
+TOUCH_SCRIPT = """
+local kind = redis.call('TYPE', KEYS[1])['ok']
+if kind == 'none' then
+    return 0
+end
+if kind == 'hash' then
+    redis.call('HSET', KEYS[1], 'last_activity', ARGV[1])
+    redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+    return 1
+end
+local session = cjson.decode(redis.call('GET', KEYS[1]))
+session['last_activity'] = ARGV[1]
+redis.call('SET', KEYS[1], cjson.encode(session), 'EX', tonumber(ARGV[2]))
+return 1
+"""
+
+# Lua fragment: replaces the JSON session string at KEYS[1] by a hash, keeping its TTL.
+JSON_TO_HASH = """
+local ttl = redis.call('PTTL', KEYS[1])
+local session = cjson.decode(redis.call('GET', KEYS[1]))
+redis.call('DEL', KEYS[1])
+for field, value in pairs(session) do
+    redis.call('HSET', KEYS[1], field, tostring(value))
+end
+if ttl > 0 then
+    redis.call('PEXPIRE', KEYS[1], ttl)
+end
+"""
+
+# Hash storage variant of TOUCH_SCRIPT: sets only last_activity, converting a JSON session first.
+HASH_TOUCH_SCRIPT = """
+local kind = redis.call('TYPE', KEYS[1])['ok']
+if kind == 'none' then
+    return 0
+end
+if kind == 'string' then
+""" + JSON_TO_HASH + """
+end
+redis.call('HSET', KEYS[1], 'last_activity', ARGV[1])
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+return 1
+"""
+
+# Converts a JSON session to a hash; returns 1 if converted, 0 if the key holds no JSON session.
+MIGRATE_SCRIPT = """
+if redis.call('TYPE', KEYS[1])['ok'] ~= 'string' then
+    return 0
+end
+""" + JSON_TO_HASH + """
+return 1
+"""
+
+
+def _select(session_data: Optional[Dict], fields: Optional[List[str]]) -> Union[Dict, None]:
+    """
+    Picks the requested fields of a session.
+    :param session_data: whole session, or None.
+    :param fields: fields to keep, None for all of them.
+    :return: the selected fields, missing ones as None, or None without a session.
+    """
+    if not session_data or fields is None:
+        return session_data or None
+    return {field: session_data.get(field) for field in fields}
+
+
+def _chunks(tokens: List[str], size: int) -> Iterator[List[str]]:
+    """
+    Splits tokens into lists of at most `size`, keeping single commands small.
+    :param tokens: session tokens.
+    :param size: maximum number of tokens per list.
+    :return: iterator of token lists.
+    """
+    for start in range(0, len(tokens), size):
+        yield tokens[start:start + size]
+
+
+def _check_tokens(session_tokens: List[str]) -> None:
+    """
+    Validates a list of session tokens.
+    :param session_tokens: session tokens.
+    :raises TypeError: If `session_tokens` is not a list of strings.
+    """
+    if not isinstance(session_tokens, list) or not all(isinstance(token, str) for token in session_tokens):
+        raise TypeError("Session tokens must be a list of strings.")
 
 
 class SessionManager:
     """
     Manages user sessions using Redis.
     This class allows creating, retrieving, updating, and deleting user sessions.
-    Sessions are stored as JSON objects and automatically expire after a given TTL.
+    Sessions are stored as JSON objects or hashes and automatically expire after a given TTL.
     """
 
-    def __init__(self, redis_host="localhost", redis_port=6379, session_expiry=1800) -> None:
+    def __init__(self, redis_host="localhost", redis_port=6379, session_expiry=1800, storage="json") -> None:
         """
         Initializes the SessionManager and connects to the Redis database.
         :param redis_host: Redis server hostname (default: "localhost").
         :param redis_port: Redis server port (default: 6379).
         :param session_expiry: Session expiration time in seconds (default: 1800s = 30 minutes).
+        :param storage: "json" to store sessions as JSON strings, "hash" to store them as hashes.
+        :raises ValueError: If storage is not a known mode.
         """
+        if storage not in STORAGE_MODES:
+            raise ValueError(f"Storage must be one of {', '.join(STORAGE_MODES)}.")
+
         self.redis = Redis(host=redis_host, port=redis_port, decode_responses=True)
         self.session_expiry = session_expiry
+        self.storage = storage
+        self._touch = self.redis.register_script(HASH_TOUCH_SCRIPT if storage == "hash" else TOUCH_SCRIPT)
+        self._migrate = self.redis.register_script(MIGRATE_SCRIPT)
 
     def create_session(self, user_id: str) -> str:
         """
@@ -49,30 +158,68 @@ class SessionManager:
             "last_activity": datetime.now().isoformat()
         }
         try:
-            self.redis.setex(session_token, self.session_expiry, json.dumps(session_data))
+            if self.storage == "hash":
+                with self.redis.pipeline() as pipe:
+                    pipe.hset(session_token, mapping=session_data)
+                    pipe.expire(session_token, self.session_expiry)
+                    pipe.execute()
+            else:
+                self.redis.setex(session_token, self.session_expiry, json.dumps(session_data))
             return session_token
         except RedisError as e:
             print(f"Error: {e}")
             return "Failed to create new session."
 
-    def get_session(self, session_token: str) -> Union[Dict, None]:
+    def get_session(self, session_token: str, fields: Optional[List[str]] = None) -> Union[Dict, None]:
         """
         Retrieves the session data for a given session token.
+        In hash storage, requested fields are read with HMGET and the rest is not transferred.
+        Either mode reads the sessions of the other one, so both can run during a migration:
+        a JSON session written before the switch to hash storage is read as JSON, and a session
+        a hash storage instance already converted is read as a hash in JSON storage.
         :param session_token:  The session token to retrieve.
+        :param fields: fields to retrieve, None for the whole session.
         :return: The session data as a dictionary if found, else None.
-        :raises TypeError: If session_token is not a string.
+        :raises TypeError: If session_token is not a string or fields is not a list of strings.
+        :raises ValueError: If fields is an empty list.
         :raises RedisError: If case it is not possible to reach db.
         """
         if not isinstance(session_token, str):
             raise TypeError("Session token must be a string.")
+        if fields is not None and (not isinstance(fields, list) or not all(isinstance(f, str) for f in fields)):
+            raise TypeError("Fields must be a list of strings.")
+        if fields == []:
+            raise ValueError("Fields must not be empty.")
 
         try:
-            session_data = self.redis.get(session_token)
-            return json.loads(session_data) if session_data else None
+            if self.storage == "hash":
+                try:
+                    return self._get_hash_session(session_token, fields)
+                except ResponseError:
+                    pass
+            try:
+                session_data = self.redis.get(session_token)
+            except ResponseError:
+                return self._get_hash_session(session_token, fields)
+            return _select(json.loads(session_data) if session_data else None, fields)
         except RedisError as e:
             print(f"Error: {e}")
             return None
 
+    def _get_hash_session(self, session_token: str, fields: Optional[List[str]]) -> Union[Dict, None]:
+        """
+        Reads a session stored as a hash, only the requested fields if any.
+        :param session_token: The session token to retrieve.
+        :param fields: fields to retrieve, None for the whole session.
+        :return: The session data as a dictionary if found, else None.
+        :raises ResponseError: If the session is not a hash.
+        :raises RedisError: If case it is not possible to reach db.
+        """
+        if fields is None:
+            return self.redis.hgetall(session_token) or None
+        values = self.redis.hmget(session_token, fields)
+        return dict(zip(fields, values)) if any(value is not None for value in values) else None
+
     def update_session(self, session_token: str) -> str:
         """
         Updates the last activity timestamp of a session and refreshes its TTL.
@@ -85,16 +232,51 @@ class SessionManager:
             raise TypeError("Session token must be a string.")
 
         try:
-            session_data = self.redis.get(session_token)
-
-            if not session_data:
+            if not self._touch(keys=[session_token], args=[datetime.now().isoformat(), self.session_expiry]):
                 return f"Session {session_token} was not found."
+            return f"Session {session_token} was successfully updated."
+        except RedisError as e:
+            print(f"Error: {e}")
+            return "Failed to update last activity timestamp."
 
-            session_data = json.loads(session_data)
-            session_data["last_activity"] = datetime.now().isoformat()
+    def update_session_transaction(self, session_token: str) -> str:
+        """
+        Same as `update_session`, for servers with scripting disabled: reads the session under
+        WATCH and writes it back in MULTI/EXEC, retrying up to TRANSACTION_RETRIES times
+        if another client changed it meanwhile.
+        :param session_token: The session token to update.
+        :return: Confirmation message indicating success or failure.
+        :raises TypeError: If session_token is not a string.
+        :raises RedisError: If case it is not possible to reach db.
+        """
+        if not isinstance(session_token, str):
+            raise TypeError("Session token must be a string.")
 
-            self.redis.setex(session_token, self.session_expiry, json.dumps(session_data))
-            return f"Session {session_token} was successfully updated."
+        try:
+            with self.redis.pipeline() as pipe:
+                for _ in range(TRANSACTION_RETRIES):
+                    try:
+                        pipe.watch(session_token)
+                        kind = pipe.type(session_token)
+                        if kind == "none":
+                            return f"Session {session_token} was not found."
+
+                        now = datetime.now().isoformat()
+                        if kind == "hash":
+                            pipe.multi()
+                            pipe.hset(session_token, "last_activity", now)
+                            pipe.expire(session_token, self.session_expiry)
+                        else:
+                            session_data = json.loads(pipe.get(session_token))
+                            session_data["last_activity"] = now
+                            pipe.multi()
+                            pipe.setex(session_token, self.session_expiry, json.dumps(session_data))
+                        pipe.execute()
+                        return f"Session {session_token} was successfully updated."
+                    except WatchError:
+                        continue
+            print(f"Error: session {session_token} kept changing, gave up after {TRANSACTION_RETRIES} attempts")
+            return "Failed to update last activity timestamp."
         except RedisError as e:
             print(f"Error: {e}")
             return "Failed to update last activity timestamp."
@@ -118,6 +300,127 @@ class SessionManager:
             print(f"Error: {e}")
             return "Failed to delete session data."
 
+    def get_sessions(self, session_tokens: List[str]) -> Dict[str, Union[Dict, None]]:
+        """
+        Retrieves many sessions in one round trip: MGET in JSON storage, pipelined HGETALL in hash storage.
+        Sessions stored the other way, while both modes run during a migration, cost one more round trip:
+        MGET reports hashes as missing, so JSON storage looks for the sessions it did not find among
+        the hashes, and hash storage reads the sessions that are not hashes with MGET.
+        :param session_tokens: The session tokens to retrieve.
+        :return: dictionary token -> session data, None for missing sessions or if db is unreachable.
+        :raises TypeError: If session_tokens is not a list of strings.
+        """
+        _check_tokens(session_tokens)
+
+        try:
+            if self.storage == "json":
+                sessions = self._get_json_sessions(session_tokens)
+                missing = [token for token in session_tokens if sessions[token] is None]
+                if missing:
+                    sessions.update(self._get_hash_sessions(missing))
+            else:
+                sessions = self._get_hash_sessions(session_tokens)
+                others = [token for token in session_tokens if token not in sessions]
+                if others:
+                    sessions.update(self._get_json_sessions(others))
+            return {token: sessions[token] for token in session_tokens}
+        except RedisError as e:
+            print(f"Error: {e}")
+            return dict.fromkeys(session_tokens)
+
+    def _get_hash_sessions(self, session_tokens: List[str]) -> Dict[str, Union[Dict, None]]:
+        """
+        Reads hash sessions with pipelined HGETALL, in one round trip.
+        :param session_tokens: The session tokens to retrieve.
+        :return: dictionary token -> session data, None for missing sessions; tokens holding
+                 something else than a hash are left out.
+        :raises RedisError: If case it is not possible to reach db.
+        """
+        with self.redis.pipeline(transaction=False) as pipe:
+            for token in session_tokens:
+                pipe.hgetall(token)
+            hashes = pipe.execute(raise_on_error=False)
+        return {token: value or None for token, value in zip(session_tokens, hashes)
+                if not isinstance(value, ResponseError)}
+
+    def _get_json_sessions(self, session_tokens: List[str]) -> Dict[str, Union[Dict, None]]:
+        """
+        Reads JSON sessions with MGET, in one round trip.
+        :param session_tokens: The session tokens to retrieve.
+        :return: dictionary token -> session data, None for missing sessions.
+        :raises RedisError: If case it is not possible to reach db.
+        """
+        with self.redis.pipeline(transaction=False) as pipe:
+            for chunk in _chunks(session_tokens, BATCH_SIZE):
+                pipe.mget(chunk)
+            values = [value for chunk in pipe.execute() for value in chunk]
+        return {token: json.loads(value) if value else None for token, value in zip(session_tokens, values)}
+
+    def touch_sessions(self, session_tokens: List[str]) -> int:
+        """
+        Updates the last activity and TTL of many sessions: the touch scripts of all tokens go out
+        in one pipelined round trip, after redis-py has checked the script is loaded.
+        :param session_tokens: The session tokens to update.
+        :return: number of sessions updated; missing ones are skipped.
+        :raises TypeError: If session_tokens is not a list of strings.
+        """
+        _check_tokens(session_tokens)
+
+        now = datetime.now().isoformat()
+        try:
+            with self.redis.pipeline(transaction=False) as pipe:
+                for token in session_tokens:
+                    self._touch(keys=[token], args=[now, self.session_expiry], client=pipe)
+                return sum(pipe.execute())
+        except RedisError as e:
+            print(f"Error: {e}")
+            return 0
+
+    def delete_sessions(self, session_tokens: List[str]) -> int:
+        """
+        Deletes many sessions, one DEL per chunk of tokens, in one pipelined round trip.
+        :param session_tokens: The session tokens to delete.
+        :return: number of sessions deleted.
+        :raises TypeError: If session_tokens is not a list of strings.
+        """
+        _check_tokens(session_tokens)
+        if not session_tokens:
+            return 0
+
+        try:
+            with self.redis.pipeline(transaction=False) as pipe:
+                for chunk in _chunks(session_tokens, BATCH_SIZE):
+                    pipe.delete(*chunk)
+                return sum(pipe.execute())
+        except RedisError as e:
+            print(f"Error: {e}")
+            return 0
+
+    def migrate_sessions(self, session_tokens: Optional[List[str]] = None) -> int:
+        """
+        Converts JSON sessions to hashes in place, keeping their remaining TTL.
+        Each conversion is one atomic script; the scripts of a batch share a pipelined round trip.
+        :param session_tokens: sessions to convert, None to scan the database for session tokens.
+        :return: number of converted sessions.
+        :raises TypeError: If session_tokens is not a list of strings.
+        """
+        if session_tokens is not None:
+            _check_tokens(session_tokens)
+
+        migrated = 0
+        try:
+            if session_tokens is None:
+                session_tokens = list(self.redis.scan_iter(match=TOKEN_PATTERN, count=BATCH_SIZE, _type="string"))
+            for chunk in _chunks(session_tokens, BATCH_SIZE):
+                with self.redis.pipeline(transaction=False) as pipe:
+                    for token in chunk:
+                        self._migrate(keys=[token], client=pipe)
+                    migrated += sum(result for result in pipe.execute(raise_on_error=False)
+                                    if isinstance(result, int))
+        except RedisError as e:
+            print(f"Error: {e}")
+        return migrated
+
 
 if __name__ == "__main__":
     session_manager = SessionManager()
@@ -0,0 +1,19 @@
+"""
+Shared fixtures for the moviebase (homework_10) test suite.
+"""
+
+import pytest
+
+from homework_10 import db
+
+
+@pytest.fixture
+def pool(tmp_path):
+    """
+    Points the module-wide connection pool at a fresh database file with the schema created.
+    :return: the configured ConnectionPool
+    """
+    connection_pool = db.configure_pool(str(tmp_path / "moviebase.db"), max_size=2, timeout=0.2)
+    db.create_tables()
+    yield connection_pool
+    db.close_pools()
@@ -0,0 +1,61 @@
+"""
+Test suite for the asyncio moviebase repository.
+"""
+
+import asyncio
+
+import pytest
+
+from homework_10 import queries
+from homework_10.async_repo import AsyncMovieRepository
+from homework_10.models import add_movie
+
+
+def test_async_reads_match_sync_queries(pool):
+    """Test that concurrent async reads return the same rows as the synchronous queries."""
+    add_movie("Heat", 1995, "Crime", ["Al Pacino", "Robert De Niro"])
+    add_movie("Alien", 1979, "Sci-Fi", ["Sigourney Weaver"])
+
+    async def read_concurrently():
+        async with AsyncMovieRepository(workers=3, max_pending=4) as repo:
+            results = await asyncio.gather(*(repo.get_movies_with_actors() for _ in range(20)))
+            genres = await repo.get_movie_count_by_genre()
+            page, cursor = await repo.get_movies_page(1)
+            return results, genres, page, cursor
+
+    results, genres, page, cursor = asyncio.run(read_concurrently())
+
+    assert all(result == queries.get_movies_with_actors() for result in results)
+    assert genres == queries.get_movie_count_by_genre()
+    assert (page, cursor) == queries.get_movies_page(1)
+
+
+def test_async_writes_are_visible_to_readers(pool):
+    """Test that writes made on the writer thread are seen by reader connections."""
+    async def write_then_read():
+        async with AsyncMovieRepository(workers=2) as repo:
+            await asyncio.gather(*(repo.add_movie(f"Movie {i}", 2000, "Drama", [f"Actor {i}"])
+                                   for i in range(10)))
+            return await repo.search_movies("movie", limit=50), await repo.get_average_age_by_genre("Drama")
+
+    titles, average_age = asyncio.run(write_then_read())
+
+    assert sorted(titles) == sorted(f"Movie {i}" for i in range(10))
+    assert average_age == queries.get_average_age_by_genre("Drama")
+
+
+def test_async_search_shares_sync_rules(pool):
+    """Test that async search matches the sync one and validates its arguments the same way."""
+    add_movie("Star Wars", 1977, "Sci-Fi", ["Mark Hamill"])
+    add_movie("The Lone Star", 1990, "Western", ["Lone Actor"])
+
+    async def search():
+        async with AsyncMovieRepository(workers=1) as repo:
+            found = await repo.search_movies("sta", limit=5)
+            with pytest.raises(ValueError):
+                await repo.search_movies("star", limit=0)
+            with pytest.raises(TypeError):
+                await repo.get_movies_page("1")
+            return found
+
+    assert asyncio.run(search()) == queries.search_movies("sta", limit=5)
@@ -0,0 +1,45 @@
+"""
+Test suite for the moviebase benchmark harness.
+"""
+
+from collections import Counter
+
+from homework_10 import db
+from homework_10.benchmark import compare, generate_catalogue, percentile, run_scale
+
+
+def test_generate_catalogue_is_skewed_and_reproducible():
+    """Test that casts follow a Zipf-like skew and the same seed gives the same data."""
+    movies = list(generate_catalogue(2000, 100, seed=7))
+    appearances = Counter(actor for movie in movies for actor in movie["actors"])
+    assert movies == list(generate_catalogue(2000, 100, seed=7))
+    assert appearances["Actor 0"] > 10 * appearances["Actor 99"]
+
+
+def test_percentile():
+    """Test the nearest-rank percentile."""
+    samples = list(range(1, 101))
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 99) == 99
+    assert percentile([3.0], 95) == 3.0
+
+
+def test_run_scale_times_every_case(pool):
+    """Test that a small run reports latencies for queries and models and restores the pool."""
+    result = run_scale(300, repeat=2)
+    assert result["load"]["rows"] == 300
+    assert "queries.get_movies_with_actors" in result["cases"]
+    assert "models.add_movie" in result["cases"]
+    assert all(latency["p50"] <= latency["p99"] for latency in result["cases"].values())
+
+    restored = db.get_pool()
+    assert (restored.database, restored.max_size, restored.timeout) == (pool.database, pool.max_size, pool.timeout)
+    with db.get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM movies").fetchone()[0] == 0
+
+
+def test_compare_reports_regressions():
+    """Test that only cases slower than the threshold are reported."""
+    baseline = {"scales": {"1000": {"cases": {"fast": {"p95": 1.0}, "slow": {"p95": 1.0}}}}}
+    current = {"scales": {"1000": {"cases": {"fast": {"p95": 1.1}, "slow": {"p95": 2.0}}}}}
+    assert compare(baseline, current, threshold=0.25) == [("1000", "slow", 1.0, 2.0)]
@@ -0,0 +1,97 @@
+"""
+Test suite for the moviebase result caches.
+"""
+
+import pytest
+
+from homework_10.cache import LRUCache, QueryCache, query_cache
+from homework_10.db import get_connection
+from homework_10.models import add_actor, add_movie
+from homework_10.queries import (get_all_movies_and_actors, get_movie_count_by_genre, get_movies_with_actors,
+                                 get_unique_genres)
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """Test that the oldest untouched entry is evicted first and counted."""
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats() == {"hits": 2, "misses": 1, "evictions": 1, "expirations": 0, "size": 2}
+
+
+def test_lru_cache_expires_entries():
+    """Test that entries older than the TTL are not served."""
+    now = [0.0]
+    cache = LRUCache(maxsize=10, ttl=5, clock=lambda: now[0])
+    cache.put("a", 1)
+    now[0] = 4.9
+    assert cache.get("a") == 1
+    now[0] = 5.0
+    assert cache.get("a", "gone") == "gone"
+    assert cache.stats()["expirations"] == 1
+
+
+def test_query_cache_invalidates_by_table():
+    """Test that bumping one table only drops results that depend on it."""
+    cache = QueryCache()
+    calls = []
+
+    @cache.cached("movies")
+    def movies():
+        calls.append("movies")
+        return ["Heat"]
+
+    @cache.cached("actors")
+    def actors():
+        calls.append("actors")
+        return ["Al Pacino"]
+
+    movies(), actors(), movies(), actors()
+    cache.invalidate("actors")
+    movies(), actors()
+    assert calls == ["movies", "actors", "actors"]
+
+
+def test_queries_are_served_from_cache_until_a_write(pool):
+    """Test that model writes invalidate cached query results."""
+    add_movie("Heat", 1995, "Crime", ["Al Pacino"])
+    before = query_cache.stats()
+    assert get_movie_count_by_genre() == get_movie_count_by_genre() == [("Crime", 1)]
+    assert query_cache.stats()["hits"] == before["hits"] + 1
+
+    add_actor("Val Kilmer", 1959)
+    assert get_movie_count_by_genre() == [("Crime", 1)]
+    assert query_cache.stats()["hits"] == before["hits"] + 2
+    assert "Val Kilmer" in get_all_movies_and_actors()
+
+    add_movie("Alien", 1979, "Sci-Fi", ["Sigourney Weaver"])
+    assert get_movie_count_by_genre() == [("Crime", 1), ("Sci-Fi", 1)]
+
+
+def test_rolled_back_write_keeps_cache(pool):
+    """Test that a write rolled back by its transaction does not invalidate anything."""
+    generation = query_cache.generation("movies")
+    with pytest.raises(RuntimeError):
+        with get_connection():
+            add_movie("Ghost", 1990, "Drama", [])
+            raise RuntimeError("rollback")
+    assert query_cache.generation("movies") == generation
+
+
+def test_rolled_back_rows_are_never_cached(pool):
+    """Test that results read inside a write transaction are not cached and see its own writes."""
+    add_movie("Heat", 1995, "Crime", ["Al Pacino"])
+    assert get_unique_genres() == ["Crime"]
+    with pytest.raises(RuntimeError):
+        with get_connection():
+            add_movie("Ghost", 1990, "Drama", ["Patrick Swayze"])
+            assert "Drama" in get_unique_genres()
+            assert "Ghost" in [row.title for row in get_movies_with_actors()]
+            raise RuntimeError("rollback")
+
+    assert get_unique_genres() == ["Crime"]
+    assert [row.title for row in get_movies_with_actors()] == ["Heat"]
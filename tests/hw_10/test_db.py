@@ -0,0 +1,110 @@
+"""
+Test suite for the moviebase connection pool.
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from homework_10 import db
+from homework_10.db import PoolExhaustedError, get_connection, get_read_pool
+
+
+def test_connection_is_reused(pool):
+    """Test that a released connection is handed out again instead of opening a new one."""
+    with get_connection() as first:
+        pass
+    with get_connection() as second:
+        pass
+    assert first is second
+    assert pool.stats()["created"] == 1
+
+
+def test_nested_checkout_shares_connection(pool):
+    """Test that nested checkouts in one thread get the same connection and transaction."""
+    with get_connection() as outer:
+        outer.execute("INSERT INTO actors (name, birth_year) VALUES ('Nested', 1980)")
+        with get_connection() as inner:
+            assert inner is outer
+            assert inner.execute("SELECT COUNT(*) FROM actors").fetchone()[0] == 1
+    assert pool.stats()["in_use"] == 0
+
+
+def test_rollback_on_error(pool):
+    """Test that an exception inside the outermost checkout rolls the transaction back."""
+    with pytest.raises(RuntimeError):
+        with get_connection() as conn:
+            conn.execute("INSERT INTO actors (name, birth_year) VALUES ('Ghost', 1980)")
+            raise RuntimeError("boom")
+    with get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM actors").fetchone()[0] == 0
+
+
+def test_pool_exhaustion_is_counted(pool):
+    """Test that waiting for a connection beyond max_size times out and is recorded."""
+    release = threading.Event()
+    borrowed = threading.Barrier(3)
+
+    def hold():
+        with get_connection():
+            borrowed.wait()
+            release.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    borrowed.wait()
+    try:
+        with pytest.raises(PoolExhaustedError):
+            with get_connection():
+                pass
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+
+    stats = pool.stats()
+    assert stats["exhausted"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["created"] == 2
+
+
+def test_broken_connection_is_replaced(pool):
+    """Test that a connection failing the health check is discarded on checkout."""
+    with get_connection() as conn:
+        pass
+    conn.close()
+    with get_connection() as fresh:
+        assert fresh is not conn
+        assert fresh.execute("SELECT 1").fetchone() == (1,)
+    assert pool.stats()["discarded"] == 1
+
+
+def test_read_only_connections_refuse_writes(pool):
+    """Test that read-only checkouts come from their own pool of tuned, write-protected connections."""
+    with get_connection(read_only=True) as conn:
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+        assert conn.execute("PRAGMA mmap_size").fetchone()[0] > 0
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO actors (name, birth_year) VALUES ('Reader', 1980)")
+    assert get_read_pool().stats()["created"] == 1
+    assert pool.stats()["created"] == 1
+
+
+def test_read_only_checkout_sees_own_writes(pool):
+    """Test that a read inside a write transaction uses the writer's connection."""
+    with get_connection() as writer:
+        writer.execute("INSERT INTO actors (name, birth_year) VALUES ('Uncommitted', 1980)")
+        with get_connection(read_only=True) as reader:
+            assert reader is writer
+        with get_read_pool().connection() as other:
+            assert other.execute("SELECT COUNT(*) FROM actors").fetchone()[0] == 0
+
+
+def test_close_pools_forgets_closed_pools(pool):
+    """Test that get_pool() does not hand out a pool closed by close_pools()."""
+    reader = get_read_pool()
+    db.close_pools()
+    assert db.get_pool() is not pool
+    assert get_read_pool() is not reader
@@ -0,0 +1,51 @@
+"""
+Test suite for the parallel TSV importer.
+"""
+
+import gzip
+
+import pytest
+
+from homework_10.importer import import_tsv, parse_chunk, read_chunks
+from homework_10.queries import get_movie_count_by_genre, get_movies_with_actors
+
+IMDB_HEADER = ["tconst", "titleType", "primaryTitle", "originalTitle", "isAdult", "startYear", "endYear",
+               "runtimeMinutes", "genres"]
+
+
+def test_parse_chunk_reads_imdb_columns():
+    """Test that IMDb column names, \\N values and title types are understood."""
+    lines = ["tt1\tmovie\tHeat\tHeat\t0\t1995\t\\N\t170\tCrime,Drama\n",
+             "tt2\ttvEpisode\tPilot\tPilot\t0\t2000\t\\N\t20\tDrama\n",
+             "tt3\tmovie\tUntitled\tUntitled\t0\t\\N\t\\N\t90\tDrama\n",
+             "tt4\tmovie\tAlien\tAlien\t0\t1979\t\\N\t117\t\\N\n"]
+    movies, rejected = parse_chunk(IMDB_HEADER, lines)
+    assert movies == [{"title": "Heat", "release_year": 1995, "genre": "Crime", "actors": []},
+                      {"title": "Alien", "release_year": 1979, "genre": "Unknown", "actors": []}]
+    assert rejected == 1
+
+
+def test_read_chunks_rejects_unknown_header(tmp_path):
+    """Test that a file without title and year columns is refused before any work starts."""
+    path = tmp_path / "bad.tsv"
+    path.write_text("name\tyear\nHeat\t1995\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        read_chunks(str(path), 10)
+
+
+def test_import_tsv_loads_through_writer_process(pool, tmp_path):
+    """Test that parsed chunks are committed by the writer process and progress is reported."""
+    path = tmp_path / "movies.tsv.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        file.write("title\trelease_year\tgenre\tactors\n")
+        for number in range(25):
+            file.write(f"Movie {number}\t{1990 + number}\tDrama\tActor {number % 3}, Actor X\n")
+        file.write("Broken\tsoon\tDrama\t\n")
+    reports = []
+
+    stats = import_tsv(str(path), workers=2, batch_size=10, progress=reports.append)
+
+    assert (stats["rows"], stats["rejected"]) == (25, 1)
+    assert len(reports) == 3
+    assert get_movie_count_by_genre() == [("Drama", 25)]
+    assert ("Movie 0", "Actor 0, Actor X") in get_movies_with_actors()
@@ -0,0 +1,120 @@
+"""
+Test suite for the moviebase model functions.
+"""
+
+import pytest
+
+from homework_10.db import get_connection
+from homework_10.models import actor_id_cache, add_actor, add_movie, add_movies_bulk, get_actor_id, \
+    rebuild_cast_lists
+from homework_10.moviebase import read_movies
+from homework_10.queries import MovieActors, get_movies_with_actors
+
+
+def cast_of(title):
+    """Returns the sorted actor names of a movie."""
+    with get_connection() as conn:
+        rows = conn.execute("""
+            SELECT actors.name FROM movies
+            JOIN movie_cast ON movie_cast.movie_id = movies.id
+            JOIN actors ON actors.id = movie_cast.actor_id
+            WHERE movies.title = ?""", (title,)).fetchall()
+    return sorted(row[0] for row in rows)
+
+
+def test_add_movie_creates_missing_actors(pool):
+    """Test that add_movie links existing actors and creates unknown ones."""
+    add_actor("Al Pacino", 1940)
+    add_movie("Heat", 1995, "Crime", ["Al Pacino", "Robert De Niro"])
+    assert cast_of("Heat") == ["Al Pacino", "Robert De Niro"]
+    assert get_actor_id("Robert De Niro") is not None
+
+
+def test_add_movies_bulk(pool):
+    """Test that the bulk loader inserts every movie with its cast and reuses known actors."""
+    add_actor("Keanu Reeves", 1964)
+    known_id = get_actor_id("Keanu Reeves")
+    movies = [{"title": f"Movie {i}", "release_year": 2000 + i % 20, "genre": "Action",
+               "actors": ["Keanu Reeves", f"Extra {i % 3}", f"Extra {i % 3}"]} for i in range(25)]
+
+    stats = add_movies_bulk(movies, batch_size=10)
+
+    assert stats["rows"] == 25
+    assert stats["rows_per_second"] > 0
+    assert cast_of("Movie 24") == ["Extra 0", "Keanu Reeves"]
+    assert get_actor_id("Keanu Reeves") == known_id
+    with get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM actors").fetchone()[0] == 4
+        assert conn.execute("SELECT COUNT(*) FROM movie_cast").fetchone()[0] == 50
+
+
+def test_add_movies_bulk_rejects_bad_records(pool):
+    """Test that a malformed record raises TypeError and leaves its chunk unwritten."""
+    with pytest.raises(TypeError):
+        add_movies_bulk([{"title": "Broken", "release_year": "1999", "genre": "Drama", "actors": []}])
+    with get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM movies").fetchone()[0] == 0
+
+
+def test_read_movies_from_csv(tmp_path):
+    """Test that CSV rows are converted to movie dictionaries."""
+    path = tmp_path / "movies.csv"
+    path.write_text('title,release_year,genre,actors\nHeat,1995,Crime,"Al Pacino, Robert De Niro"\n')
+    assert list(read_movies(str(path))) == [
+        {"title": "Heat", "release_year": 1995, "genre": "Crime", "actors": ["Al Pacino", "Robert De Niro"]}
+    ]
+
+
+def test_add_actor_rejects_duplicate_name(pool):
+    """Test that actor names are unique."""
+    add_actor("Al Pacino", 1940)
+    with pytest.raises(ValueError):
+        add_actor("Al Pacino", 1940)
+
+
+def test_cast_lists_are_stored_with_movies(pool):
+    """Test that add_movie and the bulk loader keep the denormalized cast list."""
+    add_movie("Heat", 1995, "Crime", ["Al Pacino", "Robert De Niro"])
+    add_movie("Koyaanisqatsi", 1982, "Documentary", [])
+    add_movies_bulk([{"title": "Ronin", "release_year": 1998, "genre": "Crime", "actors": ["Robert De Niro"]}])
+    assert get_movies_with_actors() == [MovieActors("Heat", "Al Pacino, Robert De Niro"),
+                                        MovieActors("Ronin", "Robert De Niro")]
+
+
+def test_rebuild_cast_lists_repairs_stale_rows(pool):
+    """Test that the offline rebuild recomputes cast lists changed behind the models' back."""
+    add_movie("Heat", 1995, "Crime", ["Al Pacino", "Robert De Niro"])
+    add_actor("Val Kilmer", 1959)
+    with get_connection() as conn:
+        conn.execute("""INSERT INTO movie_cast (movie_id, actor_id)
+                        SELECT movies.id, actors.id FROM movies, actors
+                        WHERE movies.title = 'Heat' AND actors.name = 'Val Kilmer'""")
+        conn.execute("UPDATE movies SET cast_text = NULL")
+    assert rebuild_cast_lists() == 1
+    assert get_movies_with_actors() == [MovieActors("Heat", "Al Pacino, Robert De Niro, Val Kilmer")]
+
+
+def test_add_movie_resolves_cached_actors_without_queries(pool):
+    """Test that known actors are taken from the name cache instead of being selected one by one."""
+    add_movie("Heat", 1995, "Crime", ["Al Pacino", "Robert De Niro"])
+    statements = []
+    with get_connection() as conn:
+        conn.set_trace_callback(statements.append)
+        add_movie("The Irishman", 2019, "Crime", ["Al Pacino", "Robert De Niro", "Joe Pesci"])
+        conn.set_trace_callback(None)
+    assert sum("FROM actors" in statement for statement in statements) == 2
+    assert cast_of("The Irishman") == ["Al Pacino", "Joe Pesci", "Robert De Niro"]
+
+
+def test_actor_id_cache_ignores_rolled_back_inserts(pool):
+    """Test that ids of actors inserted by a rolled back transaction never reach the cache."""
+    size = len(actor_id_cache)
+    with pytest.raises(RuntimeError):
+        with get_connection():
+            add_actor("Ghost", 1960)
+            assert get_actor_id("Ghost") is not None
+            raise RuntimeError("rollback")
+    assert len(actor_id_cache) == size
+    assert get_actor_id("Ghost") is None
+    add_actor("Ghost", 1960)
+    assert get_actor_id("Ghost") is not None
@@ -0,0 +1,201 @@
+"""
+Test suite for the moviebase query functions.
+"""
+
+import threading
+
+import pytest
+
+from homework_10.db import fts5_available, get_connection, get_read_pool, has_search_index, migrate
+from homework_10.models import add_movie
+from homework_10.queries import GenreCount, MovieActors, get_average_age_by_genre, get_movie_count_by_genre, \
+    get_movies_page, get_movies_with_actors, get_movies_with_age, get_unique_genres, iter_movies_with_age, search_movies
+from homework_10.utils import movie_age
+
+
+@pytest.fixture
+def movies(pool):
+    """
+    Adds a few movies to the database.
+    """
+    add_movie("Star Wars", 1977, "Sci-Fi", ["Mark Hamill", "Harrison Ford"])
+    add_movie("Star Trek", 2009, "Sci-Fi", ["Chris Pine"])
+    add_movie("The Lone Star", 1996, "Drama", ["Chris Cooper"])
+    add_movie("Heat", 1995, "Crime", ["Al Pacino", "Robert De Niro"])
+    return pool
+
+
+def test_get_movies_with_actors_returns_typed_rows(movies):
+    """Test that queries return rows instead of printing them."""
+    rows = get_movies_with_actors()
+    assert rows[0] == MovieActors("Star Wars", "Mark Hamill, Harrison Ford")
+    assert rows[0].actors == "Mark Hamill, Harrison Ford"
+
+
+def test_get_movie_count_by_genre(movies):
+    """Test counting movies per genre."""
+    assert sorted(get_movie_count_by_genre()) == [
+        GenreCount("Crime", 1), GenreCount("Drama", 1), GenreCount("Sci-Fi", 2)]
+
+
+def recomputed_genre_stats():
+    """Aggregates genre figures straight from the base tables, the way the old queries did."""
+    with get_connection() as conn:
+        counts = dict(conn.execute("SELECT genre, COUNT(*) FROM movies GROUP BY genre").fetchall())
+        ages = dict(conn.execute("""
+            SELECT movies.genre, AVG(strftime('%Y', 'now') - actors.birth_year) FROM actors
+            JOIN movie_cast ON movie_cast.actor_id = actors.id
+            JOIN movies ON movies.id = movie_cast.movie_id
+            GROUP BY movies.genre""").fetchall())
+    return counts, ages
+
+
+def test_genre_stats_follow_changes(movies):
+    """Test that the genre_stats triggers keep the genre queries equal to a full recomputation."""
+    add_movie("Casino", 1995, "Crime", ["Robert De Niro", "Joe Pesci"])
+    with get_connection() as conn:
+        conn.execute("UPDATE actors SET birth_year = 1943 WHERE name = 'Robert De Niro'")
+        conn.execute("UPDATE actors SET birth_year = NULL WHERE name = 'Chris Pine'")
+        conn.execute("UPDATE movies SET genre = 'Space Opera' WHERE title = 'Star Wars'")
+        conn.execute("DELETE FROM movies WHERE title = 'The Lone Star'")
+        conn.execute("DELETE FROM actors WHERE name = 'Al Pacino'")
+
+    counts, ages = recomputed_genre_stats()
+    assert dict(get_movie_count_by_genre()) == counts
+    assert sorted(get_unique_genres()) == sorted(counts)
+    for genre in counts:
+        assert get_average_age_by_genre(genre) == pytest.approx(ages.get(genre))
+
+
+def test_get_average_age_by_genre_unknown(movies):
+    """Test that a genre without movies has no average age."""
+    assert get_average_age_by_genre("Western") is None
+
+
+def test_iter_movies_with_age_streams_in_batches(movies):
+    """Test that the iterator variant yields rows lazily and releases the connection when done."""
+    rows = iter_movies_with_age()
+    first = next(rows)
+    assert first.title == "Star Wars" and first.age > 40
+    assert get_read_pool().stats()["in_use"] == 1
+    assert len(list(rows)) == 3
+    assert get_read_pool().stats()["in_use"] == 0
+
+
+def test_interleaved_streams_use_separate_connections(movies):
+    """Test that finishing one stream does not release the connection another stream still reads from."""
+    outer, inner = iter_movies_with_age(), iter_movies_with_age()
+    next(outer)
+    next(inner)
+    assert get_read_pool().stats()["in_use"] == 2
+
+    assert len(list(outer)) == 3
+    assert get_read_pool().stats()["in_use"] == 1
+    assert len(list(inner)) == 3
+    assert get_read_pool().stats()["in_use"] == 0
+
+
+def test_stream_closed_from_another_thread(movies):
+    """Test that a stream closed by another thread returns its connection."""
+    rows = iter_movies_with_age()
+    next(rows)
+    closer = threading.Thread(target=rows.close)
+    closer.start()
+    closer.join()
+    assert get_read_pool().stats()["in_use"] == 0
+
+
+def test_stream_inside_write_transaction_sees_own_changes(movies):
+    """Test that a stream opened inside a write transaction includes its uncommitted rows."""
+    with get_connection() as conn:
+        conn.execute("INSERT INTO movies (title, release_year, genre) VALUES ('Uncommitted', 2000, 'Drama')")
+        rows = iter_movies_with_age()
+    assert "Uncommitted" in [row.title for row in rows]
+    assert get_read_pool().stats()["in_use"] == 0
+
+
+def test_movie_age_sql_view_matches_python_function(movies):
+    """Test that the SQL view and the deterministic movie_age() function agree."""
+    assert get_movies_with_age() == get_movies_with_age(validate=True)
+
+
+def test_movie_age_with_explicit_year():
+    """Test that passing the current year makes movie_age independent of the clock."""
+    assert movie_age(1977, 2000) == 23
+    with pytest.raises(TypeError):
+        movie_age(1977, "2000")
+
+
+@pytest.mark.skipif(not fts5_available(), reason="SQLite built without FTS5")
+def test_search_movies_matches_word_prefixes(movies):
+    """Test that every search word is matched as a prefix of a title word."""
+    assert search_movies("sta wa") == ["Star Wars"]
+
+
+@pytest.mark.skipif(not fts5_available(), reason="SQLite built without FTS5")
+def test_search_index_follows_title_updates(movies):
+    """Test that the full-text index is kept in sync with movies by triggers."""
+    with get_connection() as conn:
+        conn.execute("UPDATE movies SET title = 'Heat Wave' WHERE title = 'Heat'")
+        conn.execute("DELETE FROM movies WHERE title = 'Star Trek'")
+    assert search_movies("wave") == ["Heat Wave"]
+    assert search_movies("trek") == []
+
+
+def test_search_movies_respects_limit(movies):
+    """Test that no more than `limit` movies are returned."""
+    assert len(search_movies("star", limit=2)) == 2
+
+
+DROP_SEARCH_INDEX_SQL = """
+    DROP TRIGGER IF EXISTS movies_fts_insert;
+    DROP TRIGGER IF EXISTS movies_fts_delete;
+    DROP TRIGGER IF EXISTS movies_fts_update;
+    DROP TABLE IF EXISTS movies_fts;
+"""
+
+
+def test_search_movies_falls_back_to_like(movies):
+    """Test that searching still works without the full-text index."""
+    with get_connection() as conn:
+        conn.executescript(DROP_SEARCH_INDEX_SQL)
+    assert search_movies("lone") == ["The Lone Star"]
+
+
+@pytest.mark.skipif(not fts5_available(), reason="SQLite built without FTS5")
+def test_migrate_recreates_missing_search_index(movies):
+    """Test that migrating a database at version 2+ without the index (e.g. built without FTS5) creates it."""
+    with get_connection() as conn:
+        conn.executescript(DROP_SEARCH_INDEX_SQL)
+    assert not has_search_index()
+
+    with get_connection() as conn:
+        migrate(conn)
+    assert has_search_index()
+    assert search_movies("lone") == ["The Lone Star"]
+
+
+@pytest.mark.skipif(not fts5_available(), reason="SQLite built without FTS5")
+def test_search_index_probe_is_cached(movies):
+    """Test that the index lookup runs once per database, not on every search."""
+    assert has_search_index()
+    with get_connection() as conn:
+        conn.execute("DROP TABLE movies_fts")
+    assert has_search_index()
+
+
+def test_get_movies_page_walks_all_movies(movies):
+    """Test that following next_cursor visits every movie once and ends with None."""
+    titles, cursor = [], None
+    while True:
+        rows, cursor = get_movies_page(3, cursor)
+        titles.extend(title for _, title in rows)
+        if cursor is None:
+            break
+    assert titles == ["Star Wars", "Star Trek", "The Lone Star", "Heat"]
+
+
+def test_get_movies_page_rejects_bad_cursor(movies):
+    """Test that a tampered cursor raises ValueError."""
+    with pytest.raises(ValueError):
+        get_movies_page(3, "not-a-cursor")
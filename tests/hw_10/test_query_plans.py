@@ -0,0 +1,56 @@
+"""
+Test suite checking that every moviebase query is served by indexes (EXPLAIN QUERY PLAN).
+"""
+
+import pytest
+
+from homework_10 import queries
+from homework_10.db import SCHEMA_VERSION, check_query_plan, get_connection, get_schema_version, migrate
+from homework_10.models import ACTOR_ID_SQL, add_movies_bulk
+
+
+@pytest.fixture
+def catalogue(pool):
+    """
+    Loads a small catalogue and refreshes the planner statistics.
+    """
+    add_movies_bulk({"title": f"Movie {i}", "release_year": 1990 + i % 30, "genre": f"Genre {i % 12}",
+                     "actors": [f"Actor {i % 300}", f"Actor {(i * 7) % 300}"]} for i in range(2000))
+    with get_connection() as conn:
+        conn.execute("ANALYZE")
+    return pool
+
+
+@pytest.mark.parametrize("sql, params, allow_scan", [
+    (ACTOR_ID_SQL, ("Actor 1",), ()),
+    (queries.MOVIES_WITH_ACTORS_SQL, (), ("movies",)),
+    (queries.UNIQUE_GENRES_SQL, (), ("genre_stats",)),
+    (queries.MOVIE_COUNT_BY_GENRE_SQL, (), ("genre_stats",)),
+    (queries.AVERAGE_AGE_BY_GENRE_SQL, ("Genre 1",), ()),
+    (queries.SEARCH_MOVIES_LIKE_SQL, ("%movie%",), ("movies",)),
+    (queries.SEARCH_MOVIES_FTS_SQL, ('"movie"*', 20), ()),
+    (queries.MOVIES_WITH_LIMIT_SQL, (10, 0), ("movies",)),
+    (queries.MOVIES_PAGE_SQL, (1000, 10), ()),
+    (queries.ALL_MOVIES_AND_ACTORS_SQL, (), ("movies", "actors")),
+    (queries.MOVIES_WITH_AGE_SQL, (), ("movies",)),
+    (queries.MOVIES_WITH_AGE_UDF_SQL, (2025,), ("movies",)),
+])
+def test_query_uses_index(catalogue, sql, params, allow_scan):
+    """Test that a query only scans the tables it is meant to list in full."""
+    assert check_query_plan(sql, params, allow_scan) == []
+
+
+def test_migration_merges_duplicate_actors(pool):
+    """Test that migrating an old database merges duplicate actor names before adding the unique index."""
+    with get_connection() as conn:
+        conn.executescript("""
+            DROP INDEX idx_actors_name;
+            PRAGMA user_version = 0;
+            INSERT INTO movies (title, release_year, genre) VALUES ('Heat', 1995, 'Crime');
+            INSERT INTO actors (name, birth_year) VALUES ('Al Pacino', 1940), ('Al Pacino', 1940);
+            INSERT INTO movie_cast (movie_id, actor_id) VALUES (1, 1), (1, 2);
+        """)
+        assert migrate(conn) == SCHEMA_VERSION
+        assert get_schema_version(conn) == SCHEMA_VERSION
+        assert conn.execute("SELECT id FROM actors").fetchall() == [(1,)]
+        assert conn.execute("SELECT movie_id, actor_id FROM movie_cast").fetchall() == [(1, 1)]
@@ -0,0 +1,425 @@
+"""
+Shared fixtures for the homework_11 MongoDB repositories and Redis session manager.
+The repositories import each other as scripts, so their directory is put on the import path.
+Most MongoDB tests replace collections with in-memory doubles; those using the `mongo_server`
+fixture, like the Redis tests using `redis_server`, talk to a real server and are skipped without one.
+"""
+
+import asyncio
+import copy
+import operator
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from itertools import count
+
+import pymongo
+import pytest
+import redis
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "homework_11", "task_1_mongodb"))
+
+OPERATORS = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le,
+             "$ne": operator.ne, "$in": lambda value, options: value in options}
+
+
+def matches(document, query):
+    """Evaluates the subset of the MongoDB query language used by the repositories."""
+    for field, condition in (query or {}).items():
+        if field == "$and":
+            if not all(matches(document, part) for part in condition):
+                return False
+        elif isinstance(condition, dict) and all(name.startswith("$") for name in condition):
+            if field not in document or not all(OPERATORS[name](document[field], value)
+                                                for name, value in condition.items()):
+                return False
+        elif document.get(field) != condition:
+            return False
+    return True
+
+
+def to_int(value):
+    """$toInt: fails with ConversionFailure (241) on a non-numeric string, like the server."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise OperationFailure(f"Failed to parse number '{value}' in $convert", 241)
+
+
+EXPRESSIONS = {
+    "$gte": lambda left, right: left is not None and left >= right,
+    "$subtract": operator.sub,
+    "$multiply": operator.mul,
+    "$concat": lambda *parts: "".join(parts),
+    "$arrayElemAt": lambda array, index: array[index],
+    "$indexOfArray": lambda array, value: array.index(value) if value in array else -1,
+    "$toInt": to_int,
+}
+
+
+def evaluate(expression, document):
+    """Evaluates the subset of aggregation expressions used by the repositories against a document."""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return document.get(expression[1:])
+    if isinstance(expression, list):
+        return [evaluate(part, document) for part in expression]
+    if isinstance(expression, dict) and len(expression) == 1 and next(iter(expression)).startswith("$"):
+        name, arguments = next(iter(expression.items()))
+        if name == "$literal":
+            return arguments
+        if name == "$cond":
+            condition, then, otherwise = arguments
+            return evaluate(then if evaluate(condition, document) else otherwise, document)
+        arguments = evaluate(arguments, document)
+        return EXPRESSIONS[name](*(arguments if isinstance(arguments, list) else [arguments]))
+    if isinstance(expression, dict):
+        return {key: evaluate(value, document) for key, value in expression.items()}
+    return expression
+
+
+class FakeCursor:
+    """Iterable result of FakeCollection.find that counts the documents it hands out."""
+
+    def __init__(self, documents, collection):
+        """Wraps the matched documents of `collection`."""
+        self.documents = documents
+        self.collection = collection
+        self.closed = False
+
+    def __iter__(self):
+        """Yields the documents one by one."""
+        for document in self.documents:
+            self.collection.fetched += 1
+            yield document
+
+    def __enter__(self):
+        """Supports `with collection.find(...) as cursor:`."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Marks the cursor as closed."""
+        self.closed = True
+
+
+class FakeChangeStream:
+    """Change stream of a FakeCollection."""
+
+    def __init__(self, collection):
+        """Subscribes to the writes of `collection`."""
+        self.collection = collection
+        self.events = deque()
+        self.closed = False
+
+    def try_next(self):
+        """Returns the next change event, or None after a short wait."""
+        if self.closed:
+            raise OperationFailure("change stream closed")
+        if self.events:
+            return self.events.popleft()
+        time.sleep(0.005)
+        return None
+
+    def close(self):
+        """Unsubscribes from the collection."""
+        self.closed = True
+        self.collection.streams.remove(self)
+
+    def __enter__(self):
+        """Supports `with collection.watch() as stream:`."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Closes the stream."""
+        if not self.closed:
+            self.close()
+
+
+class FakeCollection:
+    """
+    In-memory, mongomock-style stand-in for a pymongo collection: supports the find, insert,
+    update, delete, bulk_write, index and change stream calls the repositories make.
+    A collection created with `change_streams=False` behaves like a standalone server and
+    refuses `watch()`.
+    """
+
+    def __init__(self, change_streams=True):
+        """Creates an empty collection."""
+        self.name = "fake"
+        self.change_streams = change_streams
+        self.streams = []
+        self.documents = []
+        self.finds = []
+        self.fetched = 0
+        self.indexes = []
+        self._ids = count(1)
+        self.lock = threading.RLock()
+
+    def insert_one(self, document):
+        """Stores a copy of the document, assigning an increasing integer id."""
+        with self.lock:
+            document.setdefault("_id", next(self._ids))
+            self.documents.append(dict(document))
+        self._notify("insert", document["_id"])
+        return InsertOneResult(document["_id"], True)
+
+    def insert_many(self, documents):
+        """Stores copies of the documents, assigning increasing integer ids."""
+        return InsertManyResult([self.insert_one(document).inserted_id for document in documents], True)
+
+    def find(self, query=None, projection=None, sort=None, skip=0, limit=0, batch_size=0):
+        """Filters, sorts, pages and projects the stored documents, recording the call."""
+        self.finds.append({"query": query, "sort": sort, "skip": skip, "limit": limit, "batch_size": batch_size})
+        with self.lock:
+            found = [dict(document) for document in self.documents if matches(document, query)]
+        for field, direction in reversed(sort or []):
+            found.sort(key=lambda document: document[field], reverse=direction < 0)
+        found = found[skip:skip + limit if limit else None]
+        if projection:
+            found = [{key: value for key, value in document.items()
+                      if projection.get(key, 1 if key == "_id" else 0)} for document in found]
+        return FakeCursor(found, self)
+
+    def find_one(self, query=None):
+        """Returns the first matching document or None."""
+        return next(iter(self.find(query, limit=1)), None)
+
+    def _notify(self, operation, document_id):
+        """Publishes a change event to the open change streams."""
+        for stream in list(self.streams):
+            stream.events.append({"operationType": operation, "documentKey": {"_id": document_id}})
+
+    def watch(self, max_await_time_ms=None):
+        """Opens a change stream, or fails like a standalone server."""
+        if not self.change_streams:
+            raise OperationFailure("The $changeStream stage is only supported on replica sets", 40573)
+        stream = FakeChangeStream(self)
+        self.streams.append(stream)
+        return stream
+
+    def update_one(self, query, update, upsert=False):
+        """Applies one update, see bulk_write."""
+        self.bulk_write([UpdateOne(query, update, upsert=upsert)])
+        return UpdateResult({"n": 1}, True)
+
+    def update_many(self, query, update):
+        """Applies an update to every matching document, one at a time."""
+        with self.lock:
+            ids = [document["_id"] for document in self.documents if matches(document, query)]
+        for document_id in ids:
+            self.update_one({"_id": document_id}, update)
+        return UpdateResult({"n": len(ids), "nModified": len(ids)}, True)
+
+    def delete_many(self, query):
+        """Removes every matching document."""
+        with self.lock:
+            deleted = [document for document in self.documents if matches(document, query)]
+            self.documents = [document for document in self.documents if not matches(document, query)]
+        for document in deleted:
+            self._notify("delete", document["_id"])
+        return DeleteResult({"n": len(deleted)}, True)
+
+    def bulk_write(self, requests, ordered=True):
+        """
+        Applies UpdateOne requests, atomically as a whole: $set, $inc and $setOnInsert updates,
+        or $set pipelines, inserting on upsert. A failing pipeline raises BulkWriteError
+        after the requests before it (ordered) or all other requests (unordered) were applied.
+        """
+        counts = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0,
+                  "upserted": [], "writeErrors": [], "writeConcernErrors": []}
+        with self.lock:
+            for index, request in enumerate(requests):
+                try:
+                    self._apply(request, counts)
+                except OperationFailure as e:
+                    counts["writeErrors"].append({"index": index, "code": e.code, "errmsg": str(e), "op": request})
+                    if ordered:
+                        break
+        if counts["writeErrors"]:
+            raise BulkWriteError(counts)
+        return BulkWriteResult(counts, True)
+
+    def _apply(self, request, counts):
+        """Applies one UpdateOne request and counts it."""
+        document = next((document for document in self.documents if matches(document, request._filter)), None)
+        upsert = document is None
+        if upsert:
+            if not request._upsert:
+                return
+            document = {key: value for key, value in request._filter.items() if not key.startswith("$")}
+        updated = dict(document)
+        if isinstance(request._doc, list):
+            for stage in request._doc:
+                updated.update(evaluate(stage["$set"], updated))
+        else:
+            if upsert:
+                updated.update(request._doc.get("$setOnInsert", {}))
+            updated.update(request._doc.get("$set", {}))
+            for field, amount in request._doc.get("$inc", {}).items():
+                updated[field] = updated.get(field, 0) + amount
+        if upsert:
+            self.insert_one(updated)
+            counts["nUpserted"] += 1
+            counts["upserted"].append({"index": len(counts["upserted"]), "_id": updated["_id"]})
+        else:
+            document.update(updated)
+            counts["nMatched"] += 1
+            counts["nModified"] += 1
+        self._notify("update", updated["_id"])
+
+    def aggregate(self, pipeline):
+        """Runs $match, $project and $group (with $sum and $push) stages over copies of the documents."""
+        with self.lock:
+            documents = [dict(document) for document in self.documents]
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if name == "$match":
+                documents = [document for document in documents if matches(document, spec)]
+            elif name == "$project":
+                documents = [{field: document.get(field) if value == 1 else evaluate(value, document)
+                              for field, value in spec.items() if value != 0} for document in documents]
+            elif name == "$group":
+                groups = {}
+                for document in documents:
+                    key = evaluate(spec["_id"], document)
+                    group = groups.setdefault(repr(key), {"_id": key})
+                    for field, accumulator in spec.items():
+                        if field == "_id":
+                            continue
+                        (operation, expression), = accumulator.items()
+                        value = evaluate(expression, document)
+                        if operation == "$sum":
+                            group[field] = group.get(field, 0) + value
+                        else:
+                            group.setdefault(field, []).append(value)
+                documents = list(groups.values())
+        return iter(documents)
+
+    def create_indexes(self, models):
+        """Records the key patterns of new indexes; existing ones are left alone."""
+        for model in models:
+            if model.document["key"] not in self.indexes:
+                self.indexes.append(dict(model.document["key"]))
+        return [model.document["name"] for model in models]
+
+
+class AsyncCollection:
+    """Motor-like collection whose methods are coroutines around an in-memory collection."""
+
+    def __init__(self, collection):
+        """Wraps `collection`."""
+        self.collection = collection
+        self.name = collection.name
+
+    def __getattr__(self, name):
+        """Returns an awaitable version of the wrapped collection's method."""
+        method = getattr(self.collection, name)
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(0)
+            return method(*args, **kwargs)
+        return call
+
+
+class QueryRecorder:
+    """
+    Collection double that records the filter and sort of every query instead of running it:
+    finds return no documents and writes return None. Aggregations are recorded by the
+    `$match` of their first stage, the part an index can serve.
+    """
+
+    def __init__(self, name):
+        """Starts without recorded queries."""
+        self.name = name
+        self.shapes = []
+
+    def find(self, query=None, *args, sort=None, **kwargs):
+        """Records a find and returns an empty cursor."""
+        self.shapes.append((query or {}, sort))
+        return nullcontext(iter(()))
+
+    def find_one(self, query=None, *args, sort=None, **kwargs):
+        """Records a find_one."""
+        self.shapes.append((query or {}, sort))
+
+    def aggregate(self, pipeline, **kwargs):
+        """Records the leading $match of a pipeline and returns no results."""
+        self.shapes.append((pipeline[0]["$match"] if pipeline and "$match" in pipeline[0] else {}, None))
+        return iter(())
+
+    def _write(self, query, *args, **kwargs):
+        """Records the filter of a write."""
+        self.shapes.append((query, None))
+
+    update_one = update_many = replace_one = delete_one = delete_many = _write
+
+
+def record_query_shapes(repository):
+    """
+    Calls the methods of the repository's QUERY_METHODS on a copy whose collection is a QueryRecorder
+    and returns the (filter, sort) pairs they issued; `_changed` is disabled, so nothing is written.
+    """
+    recorder = QueryRecorder(repository.collection_name)
+    probe = copy.copy(repository)
+    probe.collection = recorder
+    probe._changed = lambda: None
+    for name, args in repository.QUERY_METHODS:
+        result = getattr(probe, name)(*args)
+        if hasattr(result, "__next__"):
+            list(result)
+    return recorder.shapes
+
+
+@pytest.fixture
+def query_shapes():
+    """Records the query shapes of a repository's QUERY_METHODS, see `record_query_shapes`."""
+    return record_query_shapes
+
+
+@pytest.fixture
+def fake_collection():
+    """Empty in-memory collection."""
+    return FakeCollection()
+
+
+@pytest.fixture
+def new_collection():
+    """Factory of empty in-memory collections, for repositories using several collections."""
+    return FakeCollection
+
+
+@pytest.fixture
+def async_collection():
+    """Wraps in-memory collections for the asyncio repositories."""
+    return AsyncCollection
+
+
+@pytest.fixture
+def mongo_server():
+    """Skips the test unless a MongoDB server answers on the default URI."""
+    probe = pymongo.MongoClient("mongodb://localhost:27017/", serverSelectionTimeoutMS=300)
+    try:
+        probe.admin.command("ping")
+    except PyMongoError:
+        pytest.skip("MongoDB server is not available")
+    finally:
+        probe.close()
+
+
+@pytest.fixture
+def redis_server():
+    """Skips the test unless a Redis server answers on localhost:6379."""
+    probe = redis.Redis(socket_connect_timeout=0.3, retry=Retry(NoBackoff(), 0))
+    try:
+        probe.ping()
+    except redis.RedisError:
+        pytest.skip("Redis server is not available")
+    finally:
+        probe.close()
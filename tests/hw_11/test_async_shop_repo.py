@@ -0,0 +1,166 @@
+"""
+Test suite for the asyncio shop repositories.
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import async_repo
+from async_repo import AsyncBaseRepository, AsyncOrderRepository, get_async_client
+from base_repo import update_operation
+from order_repo import OrderRepository
+
+ORDERS = [
+    {"order_number": "ON_001", "client": "Frank Drebin", "date": datetime(2024, 3, 1, 9, 30), "total": 100,
+     "products": [{"name": "Whiskas", "quantity": 10, "price": 10}]},
+    {"order_number": "ON_002", "client": "Homer Simpson", "date": datetime(2024, 3, 1, 18, 0), "total": 40,
+     "products": [{"name": "Felix", "quantity": 5, "price": 8}]},
+]
+
+
+class AsyncCursor:
+    """Motor-like cursor over a list of documents."""
+
+    def __init__(self, documents):
+        self.documents = list(documents)
+        self.closed = False
+
+    async def to_list(self, length=None):
+        """Returns the next `length` documents."""
+        await asyncio.sleep(0)
+        batch, self.documents = self.documents[:length], self.documents[length:]
+        return batch
+
+    async def close(self):
+        """Marks the cursor as closed."""
+        self.closed = True
+
+
+class SlowAsyncCollection:
+    """Motor-like collection around an in-memory one that records how many calls overlap."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.running = 0
+        self.peak = 0
+        self.cursors = []
+
+    async def insert_one(self, document):
+        """Inserts after a short delay, tracking concurrent calls."""
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return self.collection.insert_one(document)
+
+    def find(self, query=None, projection=None, sort=None, limit=0, batch_size=0):
+        """Returns a cursor over the matching documents."""
+        cursor = AsyncCursor(self.collection.find(query, projection, sort=sort, limit=limit))
+        self.cursors.append(cursor)
+        return cursor
+
+
+def run(coroutine_function):
+    """Runs a coroutine function on a new loop and closes the loop's clients afterwards."""
+    async def main():
+        try:
+            return await coroutine_function()
+        finally:
+            async_repo.close_async_clients()
+    return asyncio.run(main())
+
+
+def test_repositories_share_client_per_loop():
+    """Test that repositories of one loop share a client, and another loop gets its own."""
+    async def clients():
+        first, second = AsyncOrderRepository(), AsyncOrderRepository()
+        assert first.client is second.client and first.limit is second.limit
+        client = get_async_client()[0]
+        async_repo.close_async_clients()
+        return client
+
+    assert asyncio.run(clients()) is not asyncio.run(clients())
+
+
+def test_concurrency_limit_bounds_operations_in_flight(fake_collection):
+    """Test that hundreds of concurrent inserts never exceed the configured limit."""
+    async def insert_concurrently():
+        async_repo.configure_async_client("mongodb://limited:27017/", max_concurrency=8)
+        repository = AsyncBaseRepository("shop_test", "items", "mongodb://limited:27017/")
+        repository.collection = SlowAsyncCollection(fake_collection)
+        await asyncio.gather(*(repository.insert_one({"sku": number}) for number in range(200)))
+        async_repo.close_async_clients()
+        return repository.collection.peak
+
+    assert asyncio.run(insert_concurrently()) == 8
+    assert len(fake_collection.documents) == 200
+
+
+def test_find_all_is_an_async_iterator(fake_collection):
+    """Test that find_all yields documents batch by batch and closes its cursor."""
+    fake_collection.insert_many([{"sku": number} for number in range(7)])
+
+    async def read_all():
+        repository = AsyncBaseRepository("shop_test", "items")
+        repository.collection = SlowAsyncCollection(fake_collection)
+        skus = [document["sku"] async for document in repository.find_all({"sku": {"$gte": 2}}, batch_size=2)]
+        async_repo.close_async_clients()
+        return skus, repository.collection.cursors[0].closed
+
+    assert asyncio.run(read_all()) == ([2, 3, 4, 5, 6], True)
+
+
+def test_async_orders_feed_the_rollups(new_collection, async_collection):
+    """Test that orders inserted asynchronously show up in the totals the sync repository reports."""
+    orders, daily_sales, client_totals = new_collection(), new_collection(), new_collection()
+
+    async def insert():
+        repository = AsyncOrderRepository()
+        repository.collection, repository.daily_sales, repository.client_totals = \
+            async_collection(orders), async_collection(daily_sales), async_collection(client_totals)
+        await repository.insert_many([dict(ORDERS[0])])
+        await repository.insert_one(dict(ORDERS[1]))
+
+    run(insert)
+    sync = OrderRepository()
+    sync.collection, sync.daily_sales, sync.client_totals = orders, daily_sales, client_totals
+    assert len(orders.documents) == 2
+    assert sync.get_client_total_from_rollups("Homer Simpson") == 40
+    assert sync.get_client_total_from_rollups("Frank Drebin") == 100
+    assert len(daily_sales.documents) == 2
+
+
+def test_async_orders_are_checked(new_collection, async_collection):
+    """Test that orders missing rollup fields are rejected before anything is inserted."""
+    orders = new_collection()
+
+    async def insert():
+        repository = AsyncOrderRepository()
+        repository.collection = async_collection(orders)
+        with pytest.raises(ValueError):
+            await repository.insert_one({"order_number": "ON_003", "date": datetime(2024, 3, 2)})
+        with pytest.raises(ValueError):
+            await repository.insert_many([dict(ORDERS[0]), {"order_number": "ON_003", "client": "Homer Simpson"}])
+
+    run(insert)
+    assert orders.documents == []
+
+
+def test_async_bulk_write_and_update_many(fake_collection, async_collection):
+    """Test that the async repository writes in chunks and updates many documents like the sync one."""
+    fake_collection.insert_many([{"sku": number, "stock": 0} for number in range(5)])
+
+    async def write():
+        repository = AsyncBaseRepository("shop_test", "items")
+        repository.collection = async_collection(fake_collection)
+        totals = await repository.bulk_write(
+            (update_operation({"sku": number}, {"$set": {"stock": number}}) for number in range(5)), chunk_size=2)
+        updated = await repository.update_many({"stock": {"$gte": 3}}, {"sale": True})
+        return totals, updated.modified_count
+
+    totals, modified = run(write)
+    assert (totals["matched"], totals["failed"]) == (5, 0)
+    assert modified == 2
+    assert [document["stock"] for document in fake_collection.documents] == [0, 1, 2, 3, 4]
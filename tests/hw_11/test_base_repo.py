@@ -0,0 +1,123 @@
+"""
+Test suite for the batched bulk writes of BaseRepository.
+"""
+
+import pytest
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import AutoReconnect, BulkWriteError
+from pymongo.results import BulkWriteResult
+
+from base_repo import BaseRepository, Resendable, is_idempotent, update_operation
+from product_repo import ProductRepository
+
+
+class ScriptedCollection:
+    """Collection double whose bulk_write records each round trip and fails as scripted."""
+
+    name = "items"
+
+    def __init__(self, failures=()):
+        self.calls = []
+        self.failures = list(failures)
+
+    def bulk_write(self, requests, ordered=True):
+        self.calls.append((list(requests), ordered))
+        failure = self.failures.pop(0) if self.failures else None
+        if failure is not None:
+            raise failure
+        return BulkWriteResult({"nMatched": len(requests), "nModified": len(requests)}, True)
+
+
+def bulk_error(errors, matched=0):
+    """Builds a BulkWriteError from (operation index, error code) pairs."""
+    return BulkWriteError({"nMatched": matched, "nModified": matched,
+                           "writeErrors": [{"index": index, "code": code, "errmsg": "failed"} for index, code in errors]})
+
+
+@pytest.fixture
+def repository():
+    """Repository whose collection is a ScriptedCollection."""
+    repo = BaseRepository("shop_test", "items")
+    repo.collection = ScriptedCollection()
+    return repo
+
+
+def updates(count):
+    """Builds `count` idempotent update operations."""
+    return [update_operation({"sku": number}, {"$set": {"stock": number}}) for number in range(count)]
+
+
+def test_bulk_write_sends_one_round_trip_per_chunk(repository):
+    """Test that operations are split into chunks of the requested size."""
+    totals = repository.bulk_write(updates(25), chunk_size=10, ordered=False)
+    assert [len(ops) for ops, _ in repository.collection.calls] == [10, 10, 5]
+    assert all(ordered is False for _, ordered in repository.collection.calls)
+    assert totals["matched"] == 25 and totals["failed"] == 0
+
+
+def test_bulk_write_retries_transient_failures_only(repository, monkeypatch):
+    """Test that unordered writes resend only the operations that failed transiently."""
+    monkeypatch.setattr("base_repo.time.sleep", lambda seconds: None)
+    operations = updates(5)
+    repository.collection.failures = [bulk_error([(1, 112), (3, 11000)], matched=3)]
+    totals = repository.bulk_write(operations, ordered=False)
+    assert repository.collection.calls[1][0] == [operations[1].operation]
+    assert (totals["matched"], totals["failed"]) == (4, 1)
+
+
+def test_ordered_bulk_write_stops_at_permanent_failure(repository):
+    """Test that an ordered write does not send anything after a non-retryable error."""
+    repository.collection.failures = [bulk_error([(2, 11000)], matched=2)]
+    totals = repository.bulk_write(updates(15), chunk_size=5)
+    assert len(repository.collection.calls) == 1
+    assert (totals["matched"], totals["failed"]) == (2, 13)
+
+
+def test_ordered_bulk_write_resumes_after_reconnect(repository, monkeypatch):
+    """Test that a chunk lost to a connection error is sent again."""
+    monkeypatch.setattr("base_repo.time.sleep", lambda seconds: None)
+    repository.collection.failures = [AutoReconnect("primary stepped down")]
+    totals = repository.bulk_write([DeleteMany({"stock": 0})] + updates(2))
+    assert len(repository.collection.calls) == 2
+    assert totals["failed"] == 0
+
+
+def test_bulk_write_does_not_resend_increments_after_reconnect(repository, monkeypatch):
+    """Test that a chunk with $inc updates is not sent again when its outcome is unknown."""
+    monkeypatch.setattr("base_repo.time.sleep", lambda seconds: None)
+    repository.collection.failures = [AutoReconnect("connection reset")]
+    totals = repository.bulk_write(updates(2) + [UpdateOne({"sku": 9}, {"$inc": {"stock": -1}})])
+    assert len(repository.collection.calls) == 1
+    assert totals["failed"] == 3
+
+
+def test_is_idempotent():
+    """Test which write operations are safe to resend."""
+    assert is_idempotent(update_operation({"sku": 1}, {"$set": {"stock": 1}}, upsert=True))
+    assert is_idempotent(update_operation({"stock": 0}, {"$unset": {"sale": ""}}, many=True))
+    assert is_idempotent(DeleteMany({"stock": 0}))
+    assert is_idempotent(InsertOne({"sku": 1}))
+    assert is_idempotent(Resendable(ReplaceOne({"sku": 1}, {"sku": 1, "stock": 1})))
+    assert not is_idempotent(update_operation({"sku": 1}, {"$inc": {"stock": 1}}))
+    assert not is_idempotent(update_operation({"sku": 1}, [{"$set": {"stock": 1}}]))
+    assert not is_idempotent(UpdateOne({"sku": 1}, {"$set": {"stock": 1}}))
+    assert not is_idempotent(DeleteOne({"stock": 0}))
+
+
+def test_bulk_write_error_with_only_write_concern_errors(repository):
+    """Test that a write concern failure without write errors counts the writes as applied."""
+    repository.collection.failures = [BulkWriteError({"nMatched": 3, "nModified": 3, "writeErrors": [],
+                                                      "writeConcernErrors": [{"errmsg": "waiting for replication"}]})]
+    totals = repository.bulk_write(updates(3))
+    assert (totals["matched"], totals["failed"]) == (3, 0)
+
+
+def test_update_stock_many_builds_unordered_updates(new_collection):
+    """Test that stock updates for many products become chunked bulk writes."""
+    products = ProductRepository()
+    products.collection, products.versions = ScriptedCollection(), new_collection()
+    products.update_stock_many({f"SKU-{number}": number for number in range(2500)})
+    assert [len(ops) for ops, _ in products.collection.calls] == [1000, 1000, 500]
+    assert products.catalogue_version() == 1
+    with pytest.raises(ValueError):
+        products.update_stock_many({"SKU-1": -1})
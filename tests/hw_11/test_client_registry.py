@@ -0,0 +1,73 @@
+"""
+Test suite for the process-wide MongoClient registry.
+"""
+
+import pytest
+
+import client_registry
+from order_repo import OrderRepository
+from product_repo import ProductRepository
+
+OTHER_URI = "mongodb://localhost:27018/"
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    """Closes every registered client after a test."""
+    yield
+    client_registry.close_all()
+
+
+def test_repositories_share_one_client():
+    """Test that repositories for the same URI share one client and its pool."""
+    products, orders = ProductRepository(), OrderRepository()
+    assert products.client is orders.client
+    assert ProductRepository(OTHER_URI).client is not products.client
+
+
+def test_configure_client_applies_pool_options():
+    """Test that pool options are used by the next client of the URI."""
+    first = client_registry.get_client(OTHER_URI)
+    client_registry.configure_client(OTHER_URI, max_pool_size=7, min_pool_size=2, wait_queue_timeout=0.5)
+    client = client_registry.get_client(OTHER_URI)
+    assert client is not first
+    assert client.options.pool_options.max_pool_size == 7
+    assert client.options.pool_options.min_pool_size == 2
+    assert client.options.pool_options.wait_queue_timeout == 0.5
+    with pytest.raises(ValueError):
+        client_registry.configure_client(OTHER_URI, max_pool_size=1, min_pool_size=2)
+
+
+def test_pool_metrics_count_checkouts():
+    """Test that the pool listener derives sockets in use from checkout events."""
+    metrics = client_registry.PoolMetrics()
+    for _ in range(3):
+        metrics.connection_created(None)
+        metrics.connection_checked_out(None)
+    metrics.connection_checked_in(None)
+    metrics.connection_check_out_failed(None)
+    stats = metrics.stats()
+    assert (stats["open"], stats["in_use"], stats["checkout_failed"]) == (3, 2, 1)
+    assert client_registry.pool_stats("mongodb://unused:27017/") == {}
+
+
+def test_repositories_follow_reconfigured_client():
+    """Test that a repository uses the replacement client after configure_client and close_all."""
+    products = ProductRepository(OTHER_URI)
+    first = products.client
+    client_registry.configure_client(OTHER_URI, max_pool_size=5)
+    assert products.client is not first
+    assert products.client.options.pool_options.max_pool_size == 5
+    assert products.collection.database.client is products.client
+    assert products.versions.database.client is products.client
+
+    client_registry.close_all()
+    assert products.collection.database.client is client_registry.get_client(OTHER_URI)
+
+
+def test_assigned_collection_overrides_lookup(fake_collection):
+    """Test that assigning a collection (e.g. a test double) replaces the per-access lookup."""
+    orders = OrderRepository()
+    orders.daily_sales = fake_collection
+    assert orders.daily_sales is fake_collection
+    assert orders.client_totals.name == "client_totals"
@@ -0,0 +1,115 @@
+"""
+Test suite for the streaming and keyset-paginated reads of the repositories.
+"""
+
+from datetime import datetime, timedelta
+from itertools import islice
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from base_repo import BaseRepository
+from order_repo import OrderRepository
+
+
+@pytest.fixture
+def repository(fake_collection):
+    """Repository over 12 in-memory documents with ids 1..12."""
+    fake_collection.insert_many([{"sku": number, "stock": number % 3} for number in range(12)])
+    repo = BaseRepository("shop_test", "items")
+    repo.collection = fake_collection
+    return repo
+
+
+def test_iter_find_streams_with_cursor_options(repository):
+    """Test that iter_find forwards its options and yields documents lazily."""
+    documents = repository.iter_find({"stock": 0}, {"sku": 1, "_id": 0}, sort=[("sku", -1)],
+                                     skip=1, limit=2, batch_size=50)
+    assert repository.collection.fetched == 0
+    assert next(documents) == {"sku": 6}
+    assert repository.collection.fetched == 1
+    assert list(documents) == [{"sku": 3}]
+    assert repository.collection.finds[0]["batch_size"] == 50
+
+
+def test_find_all_still_returns_a_list(repository):
+    """Test that find_all keeps its behaviour on top of the iterator."""
+    assert len(repository.find_all({"stock": {"$gte": 1}})) == 8
+    with pytest.raises(TypeError):
+        repository.find_all("stock")
+
+
+def test_iter_by_id_walks_pages_in_id_order(repository):
+    """Test that keyset pagination visits every document once, one query per page."""
+    ids = [document["_id"] for document in repository.iter_by_id(page_size=5)]
+    assert ids == list(range(1, 13))
+    assert len(repository.collection.finds) == 3
+    assert repository.collection.finds[1]["query"] == {"$and": [{}, {"_id": {"$gt": 5}}]}
+
+
+def test_iter_by_id_resumes_after_id(repository):
+    """Test that a walk can be resumed from the last seen _id with a filter."""
+    documents = repository.iter_by_id({"stock": 1}, page_size=2, after_id=4)
+    assert [document["sku"] for document in documents] == [4, 7, 10]
+    with pytest.raises(ValueError):
+        repository.iter_by_id(projection={"_id": 0})
+
+
+class FailingCursor:
+    """Cursor that hands out some documents and then loses the connection."""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __iter__(self):
+        yield from self.documents
+        raise AutoReconnect("connection reset")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+def test_iter_find_raises_when_cursor_fails_midway(repository, monkeypatch):
+    """Test that a cursor failing after some documents raises instead of ending quietly."""
+    monkeypatch.setattr(repository.collection, "find", lambda *args, **kwargs: FailingCursor([{"sku": 1}]))
+    documents = repository.iter_find()
+    assert next(documents) == {"sku": 1}
+    with pytest.raises(AutoReconnect):
+        next(documents)
+    with pytest.raises(AutoReconnect):
+        repository.find_all()
+
+
+def test_find_all_is_empty_when_query_fails_at_once(repository, monkeypatch):
+    """Test that a query failing before any document keeps the print-and-empty behaviour."""
+    monkeypatch.setattr(repository.collection, "find", lambda *args, **kwargs: FailingCursor([]))
+    assert repository.find_all() == []
+
+
+def test_iter_by_id_raises_when_a_later_page_fails(repository, monkeypatch):
+    """Test that keyset pagination does not stop silently when a page after the first fails."""
+    find = repository.collection.find
+    calls = []
+
+    def find_then_fail(query=None, *args, **kwargs):
+        calls.append(query)
+        return find(query, *args, **kwargs) if len(calls) == 1 else FailingCursor([])
+
+    monkeypatch.setattr(repository.collection, "find", find_then_fail)
+    documents = repository.iter_by_id(page_size=5)
+    assert [document["_id"] for document in islice(documents, 5)] == [1, 2, 3, 4, 5]
+    with pytest.raises(AutoReconnect):
+        next(documents)
+
+
+def test_get_recent_orders_streams_newest_first(fake_collection):
+    """Test that recent orders are filtered by date and sorted newest first."""
+    now = datetime.today()
+    fake_collection.insert_many([{"order_number": f"ON_{days}", "date": now - timedelta(days=days)}
+                                 for days in (40, 2, 10)])
+    orders = OrderRepository()
+    orders.collection = fake_collection
+    assert [order["order_number"] for order in orders.get_recent_orders()] == ["ON_2", "ON_10"]
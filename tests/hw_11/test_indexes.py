@@ -0,0 +1,75 @@
+"""
+Test suite for the declared indexes of the shop repositories and the COLLSCAN check.
+"""
+
+from datetime import datetime
+
+import pymongo
+import pytest
+
+from base_repo import collscan_stages
+from order_repo import OrderRepository
+from product_repo import ProductRepository
+
+REPOSITORIES = [ProductRepository, OrderRepository]
+
+
+def test_collscan_stages_walks_winning_plan_only():
+    """Test that nested COLLSCAN stages are found and rejected plans are ignored."""
+    plan = {"queryPlanner": {
+        "winningPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN", "filter": {"stock": 0}}},
+        "rejectedPlans": [{"stage": "COLLSCAN"}]}}
+    assert collscan_stages(plan) == [{"stage": "COLLSCAN", "filter": {"stock": 0}}]
+    indexed = {"queryPlanner": {"winningPlan": {"stage": "OR", "inputStages": [{"stage": "IXSCAN"}]}}}
+    assert collscan_stages(indexed) == []
+
+
+def test_query_shapes_come_from_repository_methods(query_shapes):
+    """Test that the checked queries are the ones the repository methods issue."""
+    assert query_shapes(ProductRepository()) == [({"name": "Whiskas"}, None), ({"category": "Cat Food"}, None),
+                                                 ({"name": "Whiskas"}, None), ({"stock": 0}, None)]
+
+    orders = query_shapes(OrderRepository())
+    assert [sort for _, sort in orders] == [[("date", pymongo.DESCENDING)], None, None]
+    assert list(orders[0][0]["date"]) == ["$gt"]
+    assert orders[1][0] == {"date": {"$gte": datetime(2024, 1, 1), "$lte": datetime(2024, 1, 10)}}
+    assert orders[2][0] == {"client": "Homer Simpson"}
+
+
+def test_query_shapes_do_not_touch_the_repository(fake_collection, query_shapes):
+    """Test that deriving the shapes neither writes nor replaces the repository's collection."""
+    repository = ProductRepository()
+    repository.collection = fake_collection
+    fake_collection.insert_one({"name": "Felix", "stock": 0})
+
+    assert query_shapes(repository)
+    assert repository.collection is fake_collection
+    assert len(fake_collection.documents) == 1
+
+
+@pytest.mark.parametrize("repository_class", REPOSITORIES)
+def test_ensure_indexes_creates_declared_indexes(repository_class, fake_collection, new_collection):
+    """Test that the declared indexes are created once, however often ensure_indexes runs."""
+    repository = repository_class()
+    repository.collection = fake_collection
+    if isinstance(repository, OrderRepository):
+        repository.daily_sales = new_collection()
+    assert repository.ensure_indexes()[:len(repository.INDEXES)] == [index.document["name"]
+                                                                      for index in repository.INDEXES]
+    assert repository.ensure_indexes()
+    assert len(fake_collection.indexes) == len(repository.INDEXES)
+
+
+@pytest.mark.parametrize("repository_class", REPOSITORIES)
+def test_declared_indexes_on_server(repository_class, mongo_server, query_shapes):
+    """Test the query plans on a real server, if one is running."""
+    repository = repository_class()
+    test_db = repository.client["my_shop_test"]
+    repository.collection = test_db[repository.collection.name]
+    if isinstance(repository, OrderRepository):
+        repository.daily_sales = test_db[repository.daily_sales.name]
+    try:
+        repository.ensure_indexes()
+        assert repository.collscan_queries(query_shapes(repository)) == []
+    finally:
+        repository.client.drop_database("my_shop_test")
@@ -0,0 +1,159 @@
+"""
+Test suite for atomic order placement in OrderRepository.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from order_repo import InsufficientStockError, OrderRepository
+
+CONCURRENT_ORDERS = 1000
+# Loose floor on placement throughput, far below what either run reaches; catches e.g. a lock held across orders.
+MIN_ORDERS_PER_SECOND = 50
+PRODUCTS = [
+    {"name": "Whiskas", "price": 10, "stock": 500},
+    {"name": "Friskies", "price": 9, "stock": 20},
+    {"name": "Felix", "price": 8, "stock": 0},
+]
+
+
+@pytest.fixture
+def shop(new_collection):
+    """OrderRepository whose orders, rollups, products and catalogue versions live in memory."""
+    repository = OrderRepository()
+    repository.collection, repository.daily_sales, repository.client_totals, repository.products = \
+        new_collection(), new_collection(), new_collection(), new_collection()
+    repository.catalogue_versions = new_collection()
+    repository.products.insert_many([dict(product) for product in PRODUCTS])
+    return repository
+
+
+def stock(repository, name):
+    """Returns the stock of a product."""
+    return repository.products.find_one({"name": name})["stock"]
+
+
+def catalogue_version(repository):
+    """Returns the catalogue version the order repository bumped."""
+    document = repository.catalogue_versions.find_one({"_id": repository.products.name})
+    return document["version"] if document else 0
+
+
+def place_concurrently(repository, orders, label):
+    """
+    Places (client, items) orders from many threads and prints the throughput.
+    Returns (placed orders, rejections, orders per second); rejected orders count as handled.
+    """
+    def place(order):
+        try:
+            return repository.place_order(*order)
+        except InsufficientStockError:
+            return None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=64) as pool:
+        results = list(pool.map(place, orders))
+    seconds = time.perf_counter() - started
+    placed = [result for result in results if result is not None]
+    rate = len(orders) / seconds
+    print(f"\n{label:<12}{len(orders):>6} orders in {seconds:.2f}s: {rate:.0f} orders/sec")
+    return placed, len(results) - len(placed), rate
+
+
+def test_place_order_decrements_stock_and_prices_on_server(shop):
+    """Test that an order takes its units out of stock and gets prices and total from the products."""
+    order = shop.place_order("Homer Simpson", {"Whiskas": 3, "Friskies": 2}, "ON_100")
+
+    assert order["total"] == 48
+    assert sorted((line["name"], line["quantity"], line["price"]) for line in order["products"]) == \
+        [("Friskies", 2, 9), ("Whiskas", 3, 10)]
+    assert (stock(shop, "Whiskas"), stock(shop, "Friskies")) == (497, 18)
+    assert shop.find_one({"order_number": "ON_100"})["client"] == "Homer Simpson"
+    assert shop.get_client_total_from_rollups("Homer Simpson") == 48
+    assert catalogue_version(shop) == 1
+
+
+def test_place_order_rejects_oversell_and_restocks(shop):
+    """Test that a short line rejects the order and puts back the lines already taken."""
+    with pytest.raises(InsufficientStockError) as error:
+        shop.place_order("Homer Simpson", {"Whiskas": 5, "Friskies": 21, "Felix": 1})
+
+    assert error.value.product_name == "Friskies"
+    assert (stock(shop, "Whiskas"), stock(shop, "Friskies"), stock(shop, "Felix")) == (500, 20, 0)
+    assert shop.collection.documents == []
+    assert catalogue_version(shop) == 1
+
+
+def test_place_order_accepts_write_concern_errors(shop, monkeypatch):
+    """Test that an order whose decrements were applied but not acknowledged by the write concern is placed."""
+    bulk_write = shop.products.bulk_write
+
+    def unacknowledged(requests, ordered=True):
+        bulk_write(requests, ordered=ordered)
+        raise BulkWriteError({"writeErrors": [], "writeConcernErrors": [{"code": 64, "errmsg": "waiting"}]})
+
+    monkeypatch.setattr(shop.products, "bulk_write", unacknowledged)
+    order = shop.place_order("Homer Simpson", {"Whiskas": 3})
+
+    assert order["total"] == 30
+    assert stock(shop, "Whiskas") == 497
+
+
+def test_place_order_rejects_unknown_product(shop):
+    """Test that an unknown product is rejected without being created."""
+    with pytest.raises(InsufficientStockError):
+        shop.place_order("Homer Simpson", {"Whiskas": 1, "Catnip": 1})
+
+    assert shop.products.find_one({"name": "Catnip"}) is None
+    assert stock(shop, "Whiskas") == 500
+
+
+def test_place_order_invalid_input(shop):
+    """Test that invalid clients and items are rejected before touching the stock."""
+    with pytest.raises(TypeError):
+        shop.place_order(42, {"Whiskas": 1})
+    with pytest.raises(TypeError):
+        shop.place_order("Homer Simpson", [("Whiskas", 1)])
+    with pytest.raises(ValueError):
+        shop.place_order("Homer Simpson", {"Whiskas": 0})
+
+
+def test_concurrent_orders_never_oversell(shop):
+    """
+    Test the order logic with 1000 concurrent orders for 500 units: exactly 500 are placed.
+    The in-memory collection applies bulk writes under a lock, so this checks place_order and
+    the compensation, not the server's atomicity, and its throughput is that of the Python
+    code alone; the server test below checks both against MongoDB.
+    """
+    orders = [(f"client {number}", {"Whiskas": 1}) for number in range(CONCURRENT_ORDERS)]
+
+    placed, rejected, rate = place_concurrently(shop, orders, "in-memory")
+
+    assert rate > MIN_ORDERS_PER_SECOND
+    assert (len(placed), rejected) == (500, 500)
+    assert stock(shop, "Whiskas") == 0
+    assert len(shop.collection.documents) == 500
+
+
+def test_concurrent_orders_on_server(mongo_server):
+    """Test 1000 concurrent orders against a live server: no oversell, throughput reported."""
+    shop = OrderRepository()
+    test_db = shop.client["my_shop_test"]
+    shop.collection, shop.daily_sales, shop.client_totals, shop.products = \
+        test_db["orders"], test_db["daily_product_sales"], test_db["client_totals"], test_db["products"]
+    shop.catalogue_versions = test_db["catalogue_versions"]
+    try:
+        shop.products.insert_many([dict(product) for product in PRODUCTS])
+        orders = [(f"client {number}", {"Friskies": 1, "Whiskas": 1}) for number in range(CONCURRENT_ORDERS)]
+
+        placed, rejected, rate = place_concurrently(shop, orders, "server")
+
+        assert rate > MIN_ORDERS_PER_SECOND
+        assert (len(placed), rejected) == (20, 980)
+        assert (stock(shop, "Friskies"), stock(shop, "Whiskas")) == (0, 480)
+        assert shop.collection.count_documents({}) == 20
+    finally:
+        shop.client.drop_database("my_shop_test")
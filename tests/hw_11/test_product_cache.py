@@ -0,0 +1,138 @@
+"""
+Test suite for the product read-through cache and its invalidation.
+"""
+
+import asyncio
+import inspect
+import time
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+import async_repo
+import homework_10.cache
+from async_repo import AsyncProductRepository
+from product_cache import LRUCache, ProductCache
+from product_repo import ProductRepository
+
+PRODUCTS = [
+    {"name": "Whiskas", "price": 10, "category": "Cat Food", "stock": 100},
+    {"name": "Pedigree", "price": 14, "category": "Dog Food", "stock": 50},
+    {"name": "Felix", "price": 8, "category": "Cat Food", "stock": 45},
+]
+
+
+def make_products(new_collection, change_streams):
+    """ProductRepository over in-memory collections filled with PRODUCTS."""
+    products = ProductRepository()
+    products.collection, products.versions = new_collection(change_streams), new_collection()
+    products.collection.insert_many([dict(product) for product in PRODUCTS])
+    return products
+
+
+def wait_for(condition, timeout=2.0):
+    """Polls `condition` until it holds or the timeout passes."""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def unreachable(*args, **kwargs):
+    """Stands in for a collection method while the server cannot be reached."""
+    raise AutoReconnect("connection lost")
+
+
+def test_lru_cache_evicts_and_expires():
+    """Test that the least recently used entry is evicted and old entries expire."""
+    now = [0.0]
+    cache = LRUCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    now[0] = 10
+    assert cache.get("a") is None
+
+
+def test_lru_cache_is_the_homework_10_one():
+    """Test that the copied LRUCache has not drifted from the one in homework_10.cache."""
+    assert inspect.getsource(LRUCache) == inspect.getsource(homework_10.cache.LRUCache)
+
+
+def test_lookups_are_served_from_cache(new_collection):
+    """Test that repeated lookups reach the collection once."""
+    cache = ProductCache(make_products(new_collection, change_streams=True))
+    assert cache.get_by_name("Felix")["price"] == 8
+    assert [product["name"] for product in cache.get_by_category("Cat Food")] == ["Whiskas", "Felix"]
+    finds = len(cache.repository.collection.finds)
+    cache.get_by_name("Felix")
+    cache.get_by_category("Cat Food")
+    assert len(cache.repository.collection.finds) == finds
+    assert cache.stats()["hits"] == 2
+
+
+def test_failed_loads_are_raised_not_cached(new_collection, monkeypatch):
+    """Test that a database error reaches the caller and the next lookup tries again."""
+    cache = ProductCache(make_products(new_collection, change_streams=True))
+    collection = cache.repository.collection
+    for method in ("find_one", "find"):
+        monkeypatch.setattr(collection, method, unreachable)
+    with pytest.raises(AutoReconnect):
+        cache.get_by_name("Felix")
+    with pytest.raises(AutoReconnect):
+        cache.get_by_category("Cat Food")
+    assert cache.stats()["size"] == 0
+
+    monkeypatch.undo()
+    assert cache.get_by_name("Felix")["price"] == 8
+    assert len(cache.get_by_category("Cat Food")) == 2
+
+
+def test_cached_products_cannot_be_changed_by_callers(new_collection):
+    """Test that callers get copies, so changing a result leaves the cached products alone."""
+    cache = ProductCache(make_products(new_collection, change_streams=True))
+    cache.get_by_name("Felix")["price"] = 0
+    cache.get_by_category("Cat Food")[1]["price"] = 0
+    assert cache.get_by_name("Felix")["price"] == 8
+    assert cache.get_by_category("Cat Food")[1]["price"] == 8
+
+
+@pytest.mark.parametrize("change_streams, mode", [(True, "change_stream"), (False, "polling")])
+def test_writes_invalidate_cache(new_collection, change_streams, mode):
+    """Test that a write is noticed through the change stream or, on a standalone server, by polling."""
+    products = make_products(new_collection, change_streams)
+    cache = ProductCache(products, poll_interval=0.01)
+    assert cache.start() == mode
+    try:
+        assert cache.get_by_name("Felix")["stock"] == 45
+        time.sleep(0.05)
+        products.update_stock("Felix", 0)
+        assert wait_for(lambda: cache.get_by_name("Felix")["stock"] == 0)
+        assert cache.stats()["invalidations"] >= 1
+    finally:
+        cache.stop()
+
+
+def test_async_writes_invalidate_polling_cache(new_collection, async_collection):
+    """Test that a stock update through the async repository is noticed by a polling cache."""
+    products = make_products(new_collection, change_streams=False)
+    cache = ProductCache(products, poll_interval=0.01)
+
+    async def update_stock():
+        repository = AsyncProductRepository()
+        repository.collection, repository.versions = \
+            async_collection(products.collection), async_collection(products.versions)
+        await repository.update_stock("Felix", 0)
+        async_repo.close_async_clients()
+
+    assert cache.start() == "polling"
+    try:
+        assert cache.get_by_name("Felix")["stock"] == 45
+        time.sleep(0.05)
+        asyncio.run(update_stock())
+        assert products.catalogue_version() == 1
+        assert wait_for(lambda: cache.get_by_name("Felix")["stock"] == 0)
+    finally:
+        cache.stop()
@@ -0,0 +1,78 @@
+"""
+Test suite for the sales rollups maintained by OrderRepository.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from order_repo import OrderRepository
+
+ORDERS = [
+    {"order_number": "ON_001", "client": "Frank Drebin", "date": datetime(2024, 3, 1, 9, 30), "total": 136,
+     "products": [{"name": "Whiskas", "quantity": 10, "price": 10}, {"name": "Friskies", "quantity": 4, "price": 9}]},
+    {"order_number": "ON_002", "client": "Homer Simpson", "date": datetime(2024, 3, 1, 18, 0), "total": 140,
+     "products": [{"name": "Whiskas", "quantity": 10, "price": 10}, {"name": "Felix", "quantity": 5, "price": 8}]},
+    {"order_number": "ON_003", "client": "Homer Simpson", "date": datetime(2024, 3, 2, 12, 0), "total": 50,
+     "products": [{"name": "Whiskas", "quantity": 5, "price": 10}]},
+]
+
+
+@pytest.fixture
+def orders(new_collection):
+    """OrderRepository whose orders and rollups live in memory."""
+    repository = OrderRepository()
+    repository.collection, repository.daily_sales, repository.client_totals = \
+        new_collection(), new_collection(), new_collection()
+    return repository
+
+
+def test_inserted_orders_update_rollups(orders):
+    """Test that inserts add up per product and day and per client."""
+    orders.insert_many([dict(order) for order in ORDERS[:2]])
+    orders.insert_one(dict(ORDERS[2]))
+
+    whiskas = orders.daily_sales.find_one({"_id": {"day": datetime(2024, 3, 1), "product": "Whiskas"}})
+    assert (whiskas["quantity"], whiskas["revenue"], whiskas["day"]) == (20, 200, datetime(2024, 3, 1))
+    assert len(orders.daily_sales.documents) == 4
+    assert orders.get_client_total_from_rollups("Homer Simpson") == 190
+    assert orders.client_totals.find_one({"_id": "Homer Simpson"})["orders"] == 2
+    assert orders.get_client_total_from_rollups("Nobody") == 0.0
+
+
+@pytest.mark.parametrize("order", [
+    {"order_number": "ON_004", "date": datetime(2024, 3, 2)},
+    {"order_number": "ON_005", "client": "Homer Simpson", "date": "2024-03-02"},
+    {"order_number": "ON_006", "client": "Homer Simpson", "date": datetime(2024, 3, 2),
+     "products": [{"name": "Whiskas", "quantity": 1}]},
+])
+def test_orders_without_rollup_fields_are_rejected(orders, order):
+    """Test that orders the rollups cannot be keyed by are rejected before anything is inserted."""
+    with pytest.raises(ValueError):
+        orders.insert_one(dict(order))
+    with pytest.raises(ValueError):
+        orders.insert_many([dict(ORDERS[0]), dict(order)])
+
+    assert orders.collection.documents == []
+    assert orders.daily_sales.documents == [] and orders.client_totals.documents == []
+
+
+def test_rollups_match_raw_aggregation_on_server(mongo_server):
+    """Test that incremental and rebuilt rollups agree with the aggregation over orders."""
+    orders = OrderRepository()
+    test_db = orders.client["my_shop_test"]
+    orders.collection, orders.daily_sales, orders.client_totals = \
+        test_db["orders"], test_db["daily_product_sales"], test_db["client_totals"]
+    try:
+        orders.insert_many([dict(order) for order in ORDERS])
+        start, end = datetime(2024, 3, 1), datetime(2024, 3, 2, 23, 59)
+        expected = sorted((row["_id"], row["total_sold"]) for row in orders.get_sales_info(start, end))
+        incremental = sorted((row["_id"], row["total_sold"]) for row in orders.get_sales_from_rollups(start, end))
+        orders.ensure_indexes()
+        orders.rebuild_rollups()
+        assert "day_1_product_1" in orders.daily_sales.index_information()
+        rebuilt = sorted((row["_id"], row["total_sold"]) for row in orders.get_sales_from_rollups(start, end))
+        assert incremental == rebuilt == expected
+        assert orders.get_client_total_from_rollups("Homer Simpson") == 190
+    finally:
+        orders.client.drop_database("my_shop_test")
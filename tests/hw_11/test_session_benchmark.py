@@ -0,0 +1,14 @@
+"""
+Test suite for the session storage benchmark.
+"""
+
+from homework_11.task_1_redis.benchmark import run_mode
+
+
+def test_run_mode_reports_every_case(redis_server):
+    """Test that a small run measures every case and cleans up its sessions."""
+    results = run_mode("hash", sessions=20, touches=2)
+
+    assert set(results) == {"create", "touch", "read", "read_field"}
+    assert results["touch"]["ops"] == 40
+    assert all(result["ops_per_second"] > 0 and result["bytes_in_per_op"] > 0 for result in results.values())
@@ -0,0 +1,209 @@
+"""
+Test suite for the batched and scripted operations of SessionManager.
+"""
+
+import pytest
+from redis import WatchError
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+
+from homework_11.task_1_redis.session_model import TRANSACTION_RETRIES, SessionManager
+
+
+@pytest.fixture(params=["json", "hash"])
+def sessions(request, redis_server):
+    """SessionManager in each storage mode on the local server; removes the sessions it created."""
+    manager = SessionManager(storage=request.param)
+    created = []
+    original = manager.create_session
+
+    def create_session(user_id):
+        token = original(user_id)
+        created.append(token)
+        return token
+
+    manager.create_session = create_session
+    yield manager
+    if created:
+        manager.redis.delete(*created)
+    manager.redis.close()
+
+
+def test_batch_methods_reject_invalid_tokens():
+    """Test that batch methods require a list of strings."""
+    manager = SessionManager()
+    for method in (manager.get_sessions, manager.touch_sessions, manager.delete_sessions):
+        with pytest.raises(TypeError):
+            method("token")
+        with pytest.raises(TypeError):
+            method(["token", 1])
+
+
+def test_invalid_storage_and_fields():
+    """Test that unknown storage modes, non-list fields and empty fields are rejected."""
+    with pytest.raises(ValueError):
+        SessionManager(storage="xml")
+    with pytest.raises(TypeError):
+        SessionManager().get_session("token", "last_activity")
+    for storage in ("json", "hash"):
+        with pytest.raises(ValueError):
+            SessionManager(storage=storage).get_session("token", [])
+
+
+def test_batch_methods_without_server():
+    """Test that batch methods report empty results when Redis is unreachable."""
+    manager = SessionManager(redis_port=1)
+    manager.redis.set_retry(Retry(NoBackoff(), 0))
+
+    assert manager.get_sessions(["a", "b"]) == {"a": None, "b": None}
+    assert manager.touch_sessions(["a"]) == 0
+    assert manager.delete_sessions(["a"]) == 0
+    assert manager.update_session("a") == "Failed to update last activity timestamp."
+
+
+class ContendedPipeline:
+    """Pipeline on a hash session that another client changes before every EXEC."""
+
+    def __init__(self):
+        """Starts without attempts."""
+        self.attempts = 0
+
+    def __enter__(self):
+        """Supports `with redis.pipeline() as pipe:`."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Nothing to release."""
+
+    def watch(self, key):
+        """Counts an attempt."""
+        self.attempts += 1
+
+    def type(self, key):
+        """Reports a hash session."""
+        return "hash"
+
+    def multi(self):
+        """Starts the transaction."""
+
+    def hset(self, key, field, value):
+        """Queues the field update."""
+
+    def expire(self, key, seconds):
+        """Queues the expiry."""
+
+    def execute(self):
+        """Fails like EXEC after the watched key changed."""
+        raise WatchError("Watched variable changed.")
+
+
+def test_update_session_transaction_gives_up(monkeypatch):
+    """Test that a session changed before every EXEC is retried a bounded number of times."""
+    manager = SessionManager()
+    pipeline = ContendedPipeline()
+    monkeypatch.setattr(manager.redis, "pipeline", lambda: pipeline)
+
+    assert manager.update_session_transaction("token") == "Failed to update last activity timestamp."
+    assert pipeline.attempts == TRANSACTION_RETRIES
+
+
+def test_update_session_script_touches_atomically(sessions):
+    """Test that the scripted update changes last_activity and refreshes the TTL."""
+    token = sessions.create_session("user1")
+    before = sessions.get_session(token)
+    sessions.redis.expire(token, 10)
+
+    assert sessions.update_session(token) == f"Session {token} was successfully updated."
+    after = sessions.get_session(token)
+    assert after["last_activity"] >= before["last_activity"]
+    assert (after["user_id"], after["login_time"]) == ("user1", before["login_time"])
+    assert sessions.redis.ttl(token) > 10
+    assert sessions.update_session("missing") == "Session missing was not found."
+
+
+def test_update_session_transaction(sessions):
+    """Test the WATCH/MULTI variant of the update."""
+    token = sessions.create_session("user1")
+
+    assert sessions.update_session_transaction(token) == f"Session {token} was successfully updated."
+    assert sessions.get_session(token)["user_id"] == "user1"
+    assert sessions.update_session_transaction("missing") == "Session missing was not found."
+
+
+def test_batch_get_touch_delete(sessions):
+    """Test that batch methods handle many sessions and skip missing ones."""
+    tokens = [sessions.create_session(f"user{number}") for number in range(1200)]
+
+    found = sessions.get_sessions(tokens + ["missing"])
+    assert found["missing"] is None
+    assert [found[token]["user_id"] for token in tokens[:3]] == ["user0", "user1", "user2"]
+    assert sessions.touch_sessions(tokens + ["missing"]) == 1200
+    assert sessions.delete_sessions(tokens + ["missing"]) == 1200
+    assert set(sessions.get_sessions(tokens).values()) == {None}
+
+
+def test_get_session_fields(sessions):
+    """Test that selected fields are returned, missing ones as None."""
+    token = sessions.create_session("user1")
+
+    assert sessions.get_session(token, ["user_id", "nickname"]) == {"user_id": "user1", "nickname": None}
+    assert sessions.get_session("missing", ["user_id"]) is None
+
+
+def test_hash_storage_writes_fields(redis_server):
+    """Test that hash storage keeps sessions as hashes and updates only last_activity."""
+    manager = SessionManager(storage="hash")
+    token = manager.create_session("user1")
+    try:
+        manager.redis.hset(token, "last_activity", "old")
+        manager.redis.hset(token, "login_time", "kept")
+
+        manager.update_session(token)
+        assert manager.redis.type(token) == "hash"
+        assert manager.redis.hget(token, "last_activity") != "old"
+        assert manager.redis.hget(token, "login_time") == "kept"
+        assert manager.redis.ttl(token) > 0
+    finally:
+        manager.redis.delete(token)
+
+
+def test_hash_storage_reads_and_migrates_json_sessions(redis_server):
+    """Test that hash storage reads JSON sessions and converts them keeping the TTL."""
+    legacy = SessionManager()
+    manager = SessionManager(storage="hash")
+    tokens = [legacy.create_session(f"user{number}") for number in range(3)]
+    try:
+        assert manager.get_session(tokens[0])["user_id"] == "user0"
+        assert manager.get_session(tokens[0], ["user_id"]) == {"user_id": "user0"}
+        assert [session["user_id"] for session in manager.get_sessions(tokens).values()] == \
+            ["user0", "user1", "user2"]
+
+        assert manager.update_session(tokens[0]) == f"Session {tokens[0]} was successfully updated."
+        assert manager.redis.type(tokens[0]) == "hash"
+        assert manager.migrate_sessions(tokens) == 2
+        assert manager.migrate_sessions(tokens) == 0
+        assert {manager.redis.type(token) for token in tokens} == {"hash"}
+        assert manager.get_session(tokens[2])["user_id"] == "user2"
+        assert 0 < manager.redis.ttl(tokens[2]) <= legacy.session_expiry
+    finally:
+        manager.redis.delete(*tokens)
+
+
+def test_json_storage_reads_and_touches_hash_sessions(redis_server):
+    """Test that JSON storage keeps working on sessions a hash storage instance already converted."""
+    manager = SessionManager()
+    converted = SessionManager(storage="hash")
+    tokens = [manager.create_session(f"user{number}") for number in range(3)]
+    try:
+        assert converted.migrate_sessions(tokens[:2]) == 2
+
+        assert manager.get_session(tokens[0])["user_id"] == "user0"
+        assert manager.get_session(tokens[0], ["user_id"]) == {"user_id": "user0"}
+        assert [session["user_id"] for session in manager.get_sessions(tokens + ["missing"]).values()
+                if session] == ["user0", "user1", "user2"]
+        assert manager.update_session(tokens[1]) == f"Session {tokens[1]} was successfully updated."
+        assert manager.touch_sessions(tokens) == 3
+        assert manager.redis.type(tokens[1]) == "hash"
+        assert 0 < manager.redis.ttl(tokens[1]) <= manager.session_expiry
+    finally:
+        manager.redis.delete(*tokens)